@@ -2,46 +2,75 @@
 # -*- coding: utf-8 -*-
 
 import json
+import time
 import argparse
+from functools import partial
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-from src.downloader      import download_year
 from src.extractor       import extract_awards
-from src.parser          import parse_all
-from src.export_awards import main as export_awards
-from src.mappings        import build_maps
+from src.ingest          import ingest
+from src.export_awards   import AwardCsvWriter
+from src.mappings        import MapBuilder
 from src.aggregator      import (
-    build_hierarchy,
+    VIEWS,
+    VIEW_NOTES,
+    HierarchyBuilder,
     make_brief,
     sort_hierarchy,
     sort_hierarchy_by_year
 )
 from src.taxonomy        import generate_taxonomy
-from src.visualize       import run_visualization
-from src.mission_scraper import scrape_missions
+from src.serialize       import write_tree
+from src.cube            import write_cube
+from src.pipeline        import Pipeline, Stage
+from src.snapshots       import SNAPSHOT_DIR, refresh_snapshots, save_snapshot
 
-DATA_DIR    = Path("data/awards")
-OUTPUT_DIR  = Path("outputs")
+DATA_DIR     = Path("data/awards")
+CACHE_DIR    = Path("data/cache/parse")
+OUTPUT_DIR   = Path("outputs")
+STATE_PATH   = OUTPUT_DIR / ".pipeline_state.json"
+REPORT_PATH  = OUTPUT_DIR / "run_report.json"
+PROFILE_DIR  = OUTPUT_DIR / "profiles"
+CUBE_DIR     = OUTPUT_DIR / "cube"
+INDEX_DIR    = OUTPUT_DIR / "index"
+SRC_DIR      = Path(__file__).parent / "src"
+
+EXPORT_FORMATS = ("csv", "parquet", "sqlite")
+
+STAGES = ["download", "extract", "repack", "ingest", "index", "taxonomy", "visualize", "missionscrape", "usage"]
+
+# --compact-outputs: streamable / gzipped siblings of research*.json
+COMPACT_NAMES = ["research.ndjson.gz", "research_brief.min.json.gz"]
 
 MAX_DL_WORKERS      = 5
 MAX_EXTRACT_WORKERS = 3
 MAX_PARSE_WORKERS   = None  # uses os.cpu_count()
 
 def download_all(years):
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with ThreadPoolExecutor(max_workers=MAX_DL_WORKERS) as exe:
-        futures = {exe.submit(download_year, y, DATA_DIR): y for y in years}
-        for fut in tqdm(as_completed(futures), total=len(futures), desc="Downloading"):
-            year = futures[fut]
-            try:
-                fut.result()
-            except Exception as e:
-                print(f"[Error] downloading {year}: {e}")
+    from src.downloader import download_years  # requests is only needed here
+
+    bar = tqdm(total=len(years), desc="Downloading")
+
+    def on_done(year, result):
+        bar.update(1)
+        if isinstance(result, Exception):
+            print(f"[Error] downloading {year}: {result}")
+
+    results = download_years(years, DATA_DIR, concurrency=MAX_DL_WORKERS, on_done=on_done)
+    bar.close()
+    ok = [r for r in results.values() if not isinstance(r, Exception)]
+    return {
+        "items":   len(ok),
+        "errors":  len(results) - len(ok),
+        "workers": MAX_DL_WORKERS,
+    }
 
 def extract_all():
     zips = list(DATA_DIR.glob("*.zip"))
+    size = sum(zp.stat().st_size for zp in zips)  # extraction deletes the ZIPs
+    errors = 0
     with ThreadPoolExecutor(max_workers=MAX_EXTRACT_WORKERS) as exe:
         futures = {exe.submit(extract_awards, zp, DATA_DIR): zp for zp in zips}
         for fut in tqdm(as_completed(futures), total=len(futures), desc="Extracting"):
@@ -49,99 +78,405 @@ def extract_all():
             try:
                 fut.result()
             except Exception as e:
+                errors += 1
                 print(f"[Error] extracting {zp.name}: {e}")
+    return {
+        "items":      len(zips) - errors,
+        "errors":     errors,
+        "bytes_read": size,
+        "workers":    MAX_EXTRACT_WORKERS,
+    }
 
-def main():
-    parser = argparse.ArgumentParser(description="NSF Awards Pipeline")
-    parser.add_argument("start",                type=int, help="start year (e.g. 1960)")
-    parser.add_argument("end",                  type=int, help="end year   (e.g. 2025)")
-    parser.add_argument("--skip-download",      action="store_true", help="skip downloading zips")
-    parser.add_argument("--skip-extract",       action="store_true", help="skip extracting JSONs")
-    parser.add_argument("--skip-parse",         action="store_true", help="skip parsing JSONs")
-    parser.add_argument("--skip-mappings",      action="store_true", help="skip building abbreviation maps")
-    parser.add_argument("--skip-aggregate",     action="store_true", help="skip aggregation & writing research.json")
-    parser.add_argument("--skip-taxonomy",      action="store_true", help="skip taxonomy.json/tsv")
-    parser.add_argument("--skip-visualize",     action="store_true", help="skip plotting charts")
-    parser.add_argument("--skip-missionscrape", action="store_true", help="skip scraping division missions")
-    parser.add_argument("--skip-export", action="store_true", help="skip export")
-    parser.add_argument("--year-sort",          type=int, default=None,
-                        help="also write research_{year}.json sorted by that year's funding")
-    args = parser.parse_args()
+def run_repack(args, years=None):
+    from src.repack import repack_all
+    years = years or list(range(args.start, args.end + 1))
+    return repack_all(DATA_DIR, years, codec=args.repack_codec, max_workers=MAX_PARSE_WORKERS)
 
-    years = range(args.start, args.end + 1)
-    mapping_done = False
+def write_research(hier_builder: HierarchyBuilder, args):
+    """
+    research.json, the funding cube, research_brief.json and the optional
+    compact / year-sorted variants from a filled HierarchyBuilder.
+    """
+    hierarchy = hier_builder.build()
 
-    # 1) DOWNLOAD
-    if not args.skip_download:
-        download_all(years)
-    else:
-        print("Skipping download.")
+    sorted_full    = sort_hierarchy(hierarchy)
+    brief_unsorted = {d: make_brief(sub) for d, sub in hierarchy.items()}
+    sorted_brief   = sort_hierarchy(brief_unsorted)
 
-    # 2) EXTRACT
-    if not args.skip_extract:
-        extract_all()
-    else:
-        print("Skipping extract.")
+    write_tree(sorted_full, OUTPUT_DIR / "research.json")
+    print("✔ Wrote research.json")
+    write_cube(hier_builder.cube(), CUBE_DIR)
+    print(f"✔ Wrote {CUBE_DIR.name}/ (counts.npy, amounts.npy, nodes.json)")
+    write_tree(sorted_brief, OUTPUT_DIR / "research_brief.json")
+    print("✔ Wrote research_brief.json")
+
+    if args.compact_outputs:
+        for name, tree in zip(COMPACT_NAMES, (sorted_full, sorted_brief)):
+            write_tree(tree, OUTPUT_DIR / name)
+            print(f"✔ Wrote {name}")
+
+    if args.year_sort:
+        sr = sort_hierarchy_by_year(hierarchy, args.year_sort)
+        p = OUTPUT_DIR / f"research_{args.year_sort}.json"
+        write_tree(sr, p)
+        print(f"✔ Wrote {p.name}")
+
+    # obligation-year views, from the tables the same pass already grouped
+    for view in dict.fromkeys(args.funding_view):
+        tree = hier_builder.build(view)
+        write_tree(sort_hierarchy(tree), OUTPUT_DIR / f"research_{view}.json")
+        write_tree(sort_hierarchy({d: make_brief(sub) for d, sub in tree.items()}), OUTPUT_DIR / f"research_{view}_brief.json")
+        write_cube(hier_builder.cube(view), OUTPUT_DIR / f"cube_{view}", notes=VIEW_NOTES[view])
+        print(f"✔ Wrote research_{view}.json, research_{view}_brief.json and cube_{view}/")
 
-    # 3) PARSE
-    records = []
+def run_ingest(args):
+    """
+    One streaming pass decodes each award once and feeds the abbreviation
+    maps, the hierarchy buckets and the award export(s) together; then writes the
+    maps and research*.json.
+    """
+    map_builder  = None
+    hier_builder = None
+    csv_writer   = None
+    pq_writer    = None
+    db_writer    = None
     if not args.skip_parse:
-        records = parse_all(DATA_DIR, max_workers=MAX_PARSE_WORKERS)
+        if not args.skip_mappings:
+            map_builder = MapBuilder()
+        if not args.skip_aggregate:
+            hier_builder = HierarchyBuilder()
     else:
         print("Skipping parse.")
+    if not args.skip_export:
+        if "csv" in args.export_format:
+            csv_writer = AwardCsvWriter(OUTPUT_DIR / "awards.csv")
+        if "parquet" in args.export_format:
+            from src.export_parquet import AwardParquetWriter  # pyarrow is optional
+            pq_writer = AwardParquetWriter(OUTPUT_DIR / "awards_parquet")
+        if "sqlite" in args.export_format:
+            from src.export_sqlite import AwardSqliteWriter
+            db_writer = AwardSqliteWriter(OUTPUT_DIR / "awards.sqlite")
+    else:
+        print("Skipping award‐level export.")
+
+    record_sinks = [sink for sink in (map_builder, hier_builder) if sink is not None]
+    row_sinks    = [sink for sink in (csv_writer, pq_writer, db_writer) if sink is not None]
+    n_records    = 0
+    counters     = {}
+    if record_sinks or row_sinks:
+        n_records = ingest(
+            DATA_DIR, record_sinks, row_sinks,
+            max_workers=MAX_PARSE_WORKERS,
+            cache_dir=None if args.no_parse_cache else CACHE_DIR,
+            report=counters,
+            profile_dir=PROFILE_DIR if args.profile else None,
+            on_partials=partial(save_snapshot, SNAPSHOT_DIR) if map_builder and hier_builder else None,
+        )
+    for sink in row_sinks:
+        sink.close()
 
-    # 4) MAPPINGS
-    if not args.skip_mappings and records:
-        build_maps(records, str(OUTPUT_DIR))
-        mapping_done = True
+    # MAPPINGS
+    if map_builder is not None and n_records:
+        map_builder.write(str(OUTPUT_DIR))
     else:
         print("Skipping mappings.")
 
-    if not args.skip_export:
-        export_awards()
+    # AGGREGATION → research.json / research_brief.json
+    if hier_builder is not None and n_records:
+        write_research(hier_builder, args)
     else:
-        print("Skipping award‐level export.")
+        print("Skipping aggregation/research outputs.")
+    return counters
+
+def carry_missions(old_div_map: dict):
+    """
+    Put scraped missions back into a freshly written division_map.json.
+    """
+    path = OUTPUT_DIR / "division_map.json"
+    div_map = json.loads(path.read_text())
+    for name, entry in old_div_map.items():
+        if isinstance(entry, dict) and name in div_map:
+            div_map[name] = dict(entry, abbr=div_map[name])
+    path.write_text(json.dumps(div_map, indent=2))
+
+def run_refresh(args):
+    """
+    Re-parse only the --refresh years (downloading them if needed) plus any
+    year without a current snapshot, then rebuild maps, research*.json,
+    the cube and taxonomy.* from the merged per-year snapshots.
+
+    The rebuilt stages are recorded in the pipeline state: taxonomy always,
+    ingest when it exports nothing (awards.csv etc. need a full pass), so
+    the next normal run only redoes what the refresh did not.
+    """
+    years = sorted(set(args.refresh))
+    if not args.skip_download:
+        download_all(years)
+    if args.repack:
+        run_repack(args, years)
+    pipe = build_pipeline(args)
+    ingest_before = pipe.inputs_before("ingest")
+    div_map_path = OUTPUT_DIR / "division_map.json"
+    old_div_map  = json.loads(div_map_path.read_text()) if div_map_path.exists() else {}
+
+    map_builder, hier_builder, counters = refresh_snapshots(
+        DATA_DIR, SNAPSHOT_DIR,
+        years=range(args.start, args.end + 1),
+        force=years,
+        cache_dir=None if args.no_parse_cache else CACHE_DIR,
+        max_workers=MAX_PARSE_WORKERS,
+    )
+    map_builder.write(str(OUTPUT_DIR))
+    carry_missions(old_div_map)
+    write_research(hier_builder, args)
+    if args.skip_export:
+        pipe.record("ingest", ingest_before)
+    taxonomy_before = pipe.inputs_before("taxonomy")
+    generate_taxonomy(str(OUTPUT_DIR / "research.json"), str(OUTPUT_DIR))
+    pipe.record("taxonomy", taxonomy_before)
+    return counters
 
-    # 5) AGGREGATION → research.json / research_brief.json
-    if not args.skip_aggregate and records:
-        hierarchy = build_hierarchy(records)
+def run_visualize():
+    from src.visualize import run_visualization  # pandas / matplotlib are slow to import
+    run_visualization(str(OUTPUT_DIR / "research.json"), cube_dir=str(CUBE_DIR))
 
-        sorted_full    = sort_hierarchy(hierarchy)
-        brief_unsorted = {d: make_brief(sub) for d, sub in hierarchy.items()}
-        sorted_brief   = sort_hierarchy(brief_unsorted)
+def run_index():
+    from src.text_index import build_index
+    return build_index(DATA_DIR, INDEX_DIR, max_workers=MAX_PARSE_WORKERS)
 
-        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        (OUTPUT_DIR / "research.json").write_text(json.dumps(sorted_full, indent=2))
-        print("✔ Wrote research.json")
-        (OUTPUT_DIR / "research_brief.json").write_text(json.dumps(sorted_brief, indent=2))
-        print("✔ Wrote research_brief.json")
+def run_usage(args):
+    from src.usage import run_usage as join_usage
+    return join_usage(Path(args.usage), CUBE_DIR, OUTPUT_DIR, args.usage_start, args.usage_end)
 
+def run_missionscrape():
+    from src.mission_scraper import scrape_missions
+    return scrape_missions(str(OUTPUT_DIR))
+
+def build_pipeline(args) -> Pipeline:
+    """
+    Declare every stage with its inputs, outputs and parameters.
+    Each stage's own source files count as inputs, so code changes rerun it.
+    """
+    years    = range(args.start, args.end + 1)
+    research = OUTPUT_DIR / "research.json"
+    div_map  = OUTPUT_DIR / "division_map.json"
+    div_urls = OUTPUT_DIR / "division_urls.txt"
+    cube_files = [CUBE_DIR / n for n in ("nodes.json", "counts.npy", "amounts.npy")]
+
+    # a skipped ingest declares what it last wrote, so the pipeline can tell
+    # whether taxonomy / visualize / missionscrape would read stale files
+    ingest_skipped = args.skip_parse and args.skip_export
+    ingest_outputs = []
+    if ingest_skipped:
+        ingest_outputs += [OUTPUT_DIR / "directorate_map.json", div_map, OUTPUT_DIR / "program_map.json",
+                           div_urls, research, OUTPUT_DIR / "research_brief.json"] + cube_files
+    if not args.skip_parse and not args.skip_mappings:
+        ingest_outputs += [OUTPUT_DIR / "directorate_map.json", div_map,
+                           OUTPUT_DIR / "program_map.json", div_urls]
+    if not args.skip_parse and not args.skip_aggregate:
+        ingest_outputs += [research, OUTPUT_DIR / "research_brief.json"] + cube_files
+        if args.compact_outputs:
+            ingest_outputs += [OUTPUT_DIR / n for n in COMPACT_NAMES]
         if args.year_sort:
-            sr = sort_hierarchy_by_year(hierarchy, args.year_sort)
-            p = OUTPUT_DIR / f"research_{args.year_sort}.json"
-            p.write_text(json.dumps(sr, indent=2))
-            print(f"✔ Wrote {p.name}")
-    else:
-        print("Skipping aggregation/research outputs.")
+            ingest_outputs.append(OUTPUT_DIR / f"research_{args.year_sort}.json")
+        for view in args.funding_view:
+            ingest_outputs += [OUTPUT_DIR / f"research_{view}.json", OUTPUT_DIR / f"research_{view}_brief.json",
+                               OUTPUT_DIR / f"cube_{view}" / "nodes.json"]
+    if not args.skip_export and "csv" in args.export_format:
+        ingest_outputs.append(OUTPUT_DIR / "awards.csv")
+    if not args.skip_export and "parquet" in args.export_format:
+        ingest_outputs.append(OUTPUT_DIR / "awards_parquet" / "_common_metadata")
+    if not args.skip_export and "sqlite" in args.export_format:
+        ingest_outputs.append(OUTPUT_DIR / "awards.sqlite")
 
-    # 6) TAXONOMY
-    if not args.skip_taxonomy:
-        generate_taxonomy(str(OUTPUT_DIR / "research.json"), str(OUTPUT_DIR))
-    else:
-        print("Skipping taxonomy.")
+    pipe = Pipeline(STATE_PATH, profile_dir=PROFILE_DIR if args.profile else None)
+    pipe.add(Stage(
+        "download", lambda: download_all(years),
+        outputs=[DATA_DIR],
+        params={"years": [args.start, args.end]},
+        always=True,  # only fetches years that are missing
+    ))
+    pipe.add(Stage(
+        "extract", extract_all,
+        inputs=[DATA_DIR, SRC_DIR / "extractor.py"],
+        after=["download"],
+    ))
+    pipe.add(Stage(
+        "repack", lambda: run_repack(args),
+        inputs=[DATA_DIR, SRC_DIR / "repack.py", SRC_DIR / "sources.py"],
+        params={"codec": args.repack_codec},
+        after=["download", "extract"],
+    ))
+    pipe.add(Stage(
+        "ingest", lambda: run_ingest(args),
+        inputs=[DATA_DIR] + [SRC_DIR / f for f in (
+            "sources.py", "parser.py", "records.py", "parse_cache.py", "ingest.py",
+            "export_awards.py", "mappings.py", "aggregator.py", "serialize.py", "cube.py", "export_parquet.py",
+            "export_sqlite.py", "snapshots.py")],
+        outputs=ingest_outputs,
+        params={
+            "parse":     not args.skip_parse,
+            "mappings":  not args.skip_mappings,
+            "aggregate": not args.skip_aggregate,
+            "export":    not args.skip_export and sorted(args.export_format),
+            "year_sort": args.year_sort,
+            "compact":   args.compact_outputs,
+            "views":     sorted(set(args.funding_view)),
+        },
+        after=["download", "extract", "repack"],
+    ))
+    pipe.add(Stage(
+        "index", run_index,
+        inputs=[DATA_DIR] + [SRC_DIR / f for f in ("sources.py", "decode.py", "text_index.py")],
+        outputs=[INDEX_DIR / "index.json"],
+        after=["download", "extract", "repack"],
+    ))
+    pipe.add(Stage(
+        "taxonomy", lambda: generate_taxonomy(str(research), str(OUTPUT_DIR)),
+        inputs=[research, SRC_DIR / "taxonomy.py", SRC_DIR / "serialize.py"],
+        outputs=[OUTPUT_DIR / "taxonomy.json", OUTPUT_DIR / "taxonomy.tsv"],
+        after=["ingest"],
+    ))
+    pipe.add(Stage(
+        "visualize", run_visualize,
+        inputs=[research] + cube_files + [SRC_DIR / f for f in ("visualize.py", "serialize.py", "cube.py")],
+        after=["ingest"],
+        main_thread=True,
+    ))
+    pipe.add(Stage(
+        "missionscrape", run_missionscrape,
+        inputs=[div_map, div_urls, SRC_DIR / "mission_scraper.py"],
+        outputs=[div_map],
+        after=["ingest"],
+    ))
+    pipe.add(Stage(
+        "usage", lambda: run_usage(args),
+        inputs=([Path(args.usage)] if args.usage else []) + cube_files + [
+            SRC_DIR / f for f in ("usage.py", "cube.py", "serialize.py")],
+        outputs=[OUTPUT_DIR / "usage.csv", OUTPUT_DIR / "usage.json"],
+        params={"start": args.usage_start, "end": args.usage_end},
+        after=["ingest"],
+    ))
+    return pipe
 
-    # 7) VISUALIZE
-    if not args.skip_visualize:
-        run_visualization(str(OUTPUT_DIR / "research.json"))
-    else:
-        print("Skipping visualization.")
+def print_report(report: dict):
+    """
+    One line per stage that ran: wall / CPU time, peak RSS, throughput, errors.
+    """
+    for name, r in report.items():
+        line = (f"[report] {name:<13} {r['wall_s']:8.2f}s wall {r['cpu_s']:8.2f}s cpu "
+                f"{r['peak_rss_mb']:8.1f} MB peak")
+        if r.get("items_per_s"):
+            line += f"  {r['items']:,} items ({r['items_per_s']:,.0f}/s)"
+        if r.get("errors") or r.get("skipped"):
+            line += f"  errors={r.get('errors', 0)} skipped={r.get('skipped', 0)}"
+        print(line)
 
-    # 8) MISSION SCRAPE
-    if mapping_done and not args.skip_missionscrape:
-        scrape_missions(str(OUTPUT_DIR))
-    else:
-        print("Skipping mission scraping.")
+def export_formats(value: str) -> set:
+    formats = set()
+    for f in value.split(","):
+        f = f.strip()
+        if f == "both":
+            formats |= {"csv", "parquet"}
+        elif f in EXPORT_FORMATS:
+            formats.add(f)
+        else:
+            raise argparse.ArgumentTypeError(f"unknown export format {f!r} (choose from {', '.join(EXPORT_FORMATS)}, both)")
+    return formats
+
+def main():
+    parser = argparse.ArgumentParser(description="NSF Awards Pipeline")
+    parser.add_argument("start",                type=int, help="start year (e.g. 1960)")
+    parser.add_argument("end",                  type=int, help="end year   (e.g. 2025)")
+    parser.add_argument("--skip-download",      action="store_true", help="skip downloading zips")
+    parser.add_argument("--extract",            action="store_true",
+                        help="unpack year ZIPs into data/awards/{year}/ (by default awards are read from the ZIPs)")
+    parser.add_argument("--skip-extract",       action="store_true", help="skip extracting JSONs")
+    parser.add_argument("--repack",             action="store_true",
+                        help="repack year folders / ZIPs into data/awards/{year}.jsonl.zst shards (see src/repack.py)")
+    parser.add_argument("--repack-codec",       choices=["zst", "gz"], default=None,
+                        help="shard compression (default: zst if zstandard is installed, else gz)")
+    parser.add_argument("--skip-parse",         action="store_true", help="skip parsing JSONs")
+    parser.add_argument("--no-parse-cache",     action="store_true",
+                        help="re-decode every award instead of reusing data/cache/parse/")
+    parser.add_argument("--skip-mappings",      action="store_true", help="skip building abbreviation maps")
+    parser.add_argument("--skip-aggregate",     action="store_true", help="skip aggregation & writing research.json")
+    parser.add_argument("--skip-taxonomy",      action="store_true", help="skip taxonomy.json/tsv")
+    parser.add_argument("--skip-visualize",     action="store_true", help="skip plotting charts")
+    parser.add_argument("--skip-missionscrape", action="store_true", help="skip scraping division missions")
+    parser.add_argument("--skip-export", action="store_true", help="skip export")
+    parser.add_argument("--export-format",      type=export_formats, default={"csv"},
+                        help="award-level export(s), comma-separated: csv (awards.csv), parquet "
+                             "(awards_parquet/, needs pyarrow), sqlite (awards.sqlite); both = csv,parquet")
+    parser.add_argument("--index",              action="store_true",
+                        help="build the title/abstract search index in outputs/index/ (see src/text_index.py)")
+    parser.add_argument("--usage",              default=None, metavar="LABELS",
+                        help="join a classification results JSONL onto funding → outputs/usage.csv / usage.json")
+    parser.add_argument("--usage-start",        type=int, default=None, help="first funding year for --usage (default: all)")
+    parser.add_argument("--usage-end",          type=int, default=None, help="last funding year for --usage (default: all)")
+    parser.add_argument("--year-sort",          type=int, default=None,
+                        help="also write research_{year}.json sorted by that year's funding")
+    parser.add_argument("--funding-view",       action="append", default=[], choices=VIEWS[1:],
+                        help="also write research_{view}.json / _brief.json / cube_{view}/ by fiscal obligation "
+                             "year: obligation (full amounts) or apportioned (amounts split across program elements; "
+                             "award counts are not apportioned); repeatable")
+    parser.add_argument("--compact-outputs",    action="store_true",
+                        help="also write research.ndjson.gz and research_brief.min.json.gz")
+    parser.add_argument("--refresh",            type=int, action="append", default=[], metavar="YEAR",
+                        help="re-parse only YEAR (repeatable) and rebuild research*.json / maps / taxonomy "
+                             "from per-year snapshots in data/cache/snapshots/")
+    parser.add_argument("--force",              action="append", default=[], choices=STAGES,
+                        help="rerun a stage even if its inputs are unchanged (repeatable)")
+    parser.add_argument("--force-all",          action="store_true", help="rerun every stage")
+    parser.add_argument("--profile",            action="store_true",
+                        help="cProfile each stage into outputs/profiles/{stage}.prof / .txt")
+    parser.add_argument("--report",             default=str(REPORT_PATH),
+                        help="where to write the per-stage run report (default: outputs/run_report.json)")
+    parser.add_argument("--jobs",               type=int, default=3,
+                        help="max stages to run concurrently (default: 3)")
+    args = parser.parse_args()
+
+    skip = set()
+    if args.skip_download:
+        skip.add("download")
+    if not args.extract or args.skip_extract:
+        skip.add("extract")
+    if not args.repack:
+        skip.add("repack")
+    if args.skip_parse and args.skip_export:
+        skip.add("ingest")
+    if not args.index:
+        skip.add("index")
+    if args.skip_taxonomy:
+        skip.add("taxonomy")
+    if args.skip_visualize:
+        skip.add("visualize")
+    if args.skip_missionscrape:
+        skip.add("missionscrape")
+    if not args.usage:
+        skip.add("usage")
+
+    if args.refresh:
+        outside = sorted({y for y in args.refresh if not args.start <= y <= args.end})
+        if outside:
+            parser.error(f"--refresh {', '.join(map(str, outside))} is outside {args.start}..{args.end}; "
+                         f"widen START/END to include it")
+        t0 = time.perf_counter()
+        run_refresh(args)
+        print(f"Done: refreshed {sorted(set(args.refresh))} in {time.perf_counter() - t0:.1f}s.")
+        return
+
+    pipe   = build_pipeline(args)
+    force  = STAGES if args.force_all else args.force
+    t0     = time.perf_counter()
+    status = pipe.run(skip=skip, force=force, max_workers=args.jobs)
+    pipe.write_report(Path(args.report), status, time.perf_counter() - t0)
+    print_report(pipe.report)
+    print(f"✔ Wrote run report to {args.report}")
 
+    if any(s in ("failed", "blocked") for s in status.values()):
+        print("Done with errors: " + ", ".join(f"{k}={v}" for k, v in status.items()))
+        raise SystemExit(1)
     print("Done.")
 
 if __name__ == "__main__":
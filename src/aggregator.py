@@ -1,5 +1,10 @@
-from collections import OrderedDict, defaultdict
-from typing import List, Dict
+from collections import OrderedDict
+from typing import Iterable, List, Dict, Optional
+
+import numpy as np
+
+from src.cube import FundingCube, cube_from_levels
+from src.records import RecordStore
 
 def make_metrics(years_dict: Dict[int, Dict[str, float]]) -> OrderedDict:
     """
@@ -16,42 +21,243 @@ def make_metrics(years_dict: Dict[int, Dict[str, float]]) -> OrderedDict:
         m[f"amt_awarded_{y}"] = years_dict[y]["amt"]
     return m
 
-def build_hierarchy(records: List[Dict]) -> Dict[str, Dict]:
+# Hierarchy levels, each keyed by a prefix of these record dimensions
+LEVEL_DIMS = ("directorate", "division", "program")
+
+# Funding views, all aggregated in the same pass:
+#   award        award-file year; the full tot_intn_awd_amt on every program element
+#   obligation   fiscal obligation year (oblg_fy); the full obligated amount on every program element
+#   apportioned  fiscal obligation year; each obligation split evenly across the award's program elements
+# Counts are never apportioned: in every view they are program records with
+# money in the year, so an award with three programs counts three times.
+VIEWS = ("award", "obligation", "apportioned")
+
+# nodes.json "notes" written with each view's cube
+VIEW_NOTES = {
+    "award":       {"counts": "program records in the award-file year"},
+    "obligation":  {"counts": "program records with an obligation in the fiscal year"},
+    "apportioned": {"counts": "program records with an obligation in the fiscal year (not apportioned)",
+                    "amounts": "obligations split evenly across each award's program elements"},
+}
+
+class HierarchyBuilder:
     """
-    Two-pass aggregation:
-      1) bucket by (year → {count, amt}) at program, division, directorate
-      2) assemble nested dict with metrics at each level
+    Streaming, vectorized form of build_hierarchy.
+
+    add() takes batches of records (a RecordStore or record dicts), re-codes
+    directorate/division/program into one shared vocabulary and reduces
+    each batch to per-(node, year) count/amount rows at every level with
+    bincount. build() merges those small partial tables into dense
+    node × year matrices and emits the nested metrics dict; no per-record
+    Python work happens outside the batch group-bys.
+
+    The obligation rows are grouped alongside, so build() / cube() can
+    emit any of VIEWS from the same builder.
     """
-    prog_buckets = defaultdict(lambda: defaultdict(lambda: {"count":0, "amt":0.0}))
-    div_buckets  = defaultdict(lambda: defaultdict(lambda: {"count":0, "amt":0.0}))
-    dir_buckets  = defaultdict(lambda: defaultdict(lambda: {"count":0, "amt":0.0}))
 
-    dir_to_divs  = defaultdict(set)
-    div_to_progs = defaultdict(set)
+    def __init__(self):
+        self.vocab: Dict[str, List[str]]      = {dim: [] for dim in LEVEL_DIMS}
+        self._index: Dict[str, Dict[str,int]] = {dim: {} for dim in LEVEL_DIMS}
+        # level depth → list of (keys, years, counts, sums) partial tables
+        self._parts: Dict[int, list] = {depth: [] for depth in (1, 2, 3)}
+        # level depth → list of (keys, fiscal years, counts, sums, apportioned sums)
+        self._oparts: Dict[int, list] = {depth: [] for depth in (1, 2, 3)}
+        self._merged: Dict[str, tuple] = {}
+
+    def __getstate__(self):
+        # partial builders travel back from parse workers; skip the index
+        return self.vocab, self._parts, self._oparts
+
+    def __setstate__(self, state):
+        self.vocab, self._parts, self._oparts = state
+        self._merged = {}
+        self._index = {dim: {v: i for i, v in enumerate(self.vocab[dim])} for dim in LEVEL_DIMS}
+
+    def _encode(self, dim: str, values: List[str]) -> np.ndarray:
+        index, vocab = self._index[dim], self.vocab[dim]
+        codes = []
+        for v in values:
+            c = index.get(v)
+            if c is None:
+                c = index[v] = len(vocab)
+                vocab.append(v)
+            codes.append(c)
+        return np.array(codes, dtype=np.int64)
+
+    def add(self, records: Iterable[Dict]):
+        """
+        Group one batch by (year → count, amt) at directorate, division and program.
+        """
+        if not isinstance(records, RecordStore):
+            store = RecordStore()
+            store.extend(records)
+            records = store
+        if not len(records):
+            return
+
+        remap = {dim: self._encode(dim, records.vocab[dim]) for dim in LEVEL_DIMS}
+        for depth in (1, 2, 3):
+            dims = LEVEL_DIMS[:depth]
+            keys, years, counts, sums = records.group_by(dims)
+            keys = np.stack([remap[dim][keys[:, i]] for i, dim in enumerate(dims)], axis=1)
+            self._parts[depth].append((keys, years, counts, sums))
+            keys, *rest = records.group_obligations(dims)
+            keys = np.stack([remap[dim][keys[:, i]] for i, dim in enumerate(dims)], axis=1)
+            self._oparts[depth].append((keys, *rest))
+        self._merged = {}
+
+    def merge(self, other: "HierarchyBuilder"):
+        """
+        Fold in a partial builder (e.g. one year aggregated inside a
+        parse worker): only its small per-(node, year) tables are re-coded.
+        """
+        remap = {dim: self._encode(dim, other.vocab[dim]) for dim in LEVEL_DIMS}
+        for depth in (1, 2, 3):
+            for mine, theirs in ((self._parts, other._parts), (self._oparts, other._oparts)):
+                for keys, *rest in theirs[depth]:
+                    keys = np.stack([remap[dim][keys[:, i]] for i, dim in enumerate(LEVEL_DIMS[:depth])], axis=1)
+                    mine[depth].append((keys, *rest))
+        self._merged = {}
 
-    for r in records:
-        y, d, v, p, amt = r["year"], r["directorate"], r["division"], r["program"], r["amount"]
-        dir_to_divs[d].add(v)
-        div_to_progs[(d,v)].add(p)
+    def _tables(self, depth: int, view: str) -> list:
+        """
+        One level's partial (keys, years, counts, amounts) tables for a view.
+        """
+        if view == "award":
+            return self._parts[depth]
+        if view == "obligation":
+            return [p[:4] for p in self._oparts[depth]]
+        if view == "apportioned":
+            return [p[:3] + p[4:] for p in self._oparts[depth]]
+        raise ValueError(f"Unknown funding view {view!r} (choose from {', '.join(VIEWS)})")
 
-        prog_buckets[(d,v,p)][y]["count"] += 1
-        prog_buckets[(d,v,p)][y]["amt"]   += amt
+    def _level(self, depth: int, year_col: Dict[int, int], view: str = "award"):
+        """
+        Merge one level's partial tables. Returns node keys (in first-seen
+        order), dense counts / amounts matrices of shape (node, year) and
+        each node's year columns in the order its years were first seen.
+        """
+        parts  = self._tables(depth, view)
+        keys   = np.concatenate([p[0] for p in parts])
+        years  = np.concatenate([p[1] for p in parts])
+        counts = np.concatenate([p[2] for p in parts])
+        sums   = np.concatenate([p[3] for p in parts])
 
-        div_buckets[(d,v)][y]["count"] += 1
-        div_buckets[(d,v)][y]["amt"]   += amt
+        flat = np.zeros(len(keys), dtype=np.int64)
+        for i, dim in enumerate(LEVEL_DIMS[:depth]):
+            flat = flat * max(len(self.vocab[dim]), 1) + keys[:, i]
+        _, first, inverse = np.unique(flat, return_index=True, return_inverse=True)
+        order = np.argsort(first, kind="stable")
+        rank  = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        node  = rank[inverse]
 
-        dir_buckets[(d,)][y]["count"] += 1
-        dir_buckets[(d,)][y]["amt"]   += amt
+        n_nodes, n_years = len(order), len(year_col)
+        col  = np.array([year_col[y] for y in years.tolist()], dtype=np.int64)
+        cell = node * n_years + col
+        cnt  = np.bincount(cell, weights=counts, minlength=n_nodes * n_years)
+        amt  = np.bincount(cell, weights=sums,   minlength=n_nodes * n_years)
+        if view == "apportioned":
+            amt = amt.round(2)  # drop the float noise of fractional shares
 
-    hierarchy: Dict[str, Dict] = {}
-    for d in dir_to_divs:
-        # directorate
-        hierarchy[d] = make_metrics(dir_buckets[(d,)])
-        for v in dir_to_divs[d]:
-            hierarchy[d][v] = make_metrics(div_buckets[(d,v)])
-            for p in div_to_progs[(d,v)]:
-                hierarchy[d][v][p] = make_metrics(prog_buckets[(d,v,p)])
-    return hierarchy
+        # partial rows are in first-appearance order, so a cell's first row
+        # orders a node's years as make_metrics' years_dict would hold them
+        cells, cell_first = np.unique(cell, return_index=True)
+        seen_at = np.full(n_nodes * n_years, len(cell), dtype=np.int64)
+        seen_at[cells] = cell_first
+        year_order = np.argsort(seen_at.reshape(n_nodes, n_years), axis=1, kind="stable")
+        return (keys[first[order]],
+                cnt.reshape(n_nodes, n_years).astype(np.int64),
+                amt.reshape(n_nodes, n_years),
+                year_order)
+
+    def _levels(self, view: str = "award"):
+        """
+        Descending year list and every level's (keys, counts, amounts),
+        merged once per view and reused by build() and cube().
+        """
+        if view not in self._merged:
+            all_years = np.unique(np.concatenate([p[1] for p in self._tables(1, view)]))[::-1].tolist()
+            year_col  = {y: i for i, y in enumerate(all_years)}
+            self._merged[view] = all_years, {depth: self._level(depth, year_col, view) for depth in (1, 2, 3)}
+        return self._merged[view]
+
+    def build(self, view: str = "award") -> Dict[str, Dict]:
+        """
+        Assemble nested dict with metrics at each level, for one of VIEWS.
+        """
+        if not self._parts[1]:
+            return {}
+
+        all_years, levels = self._levels(view)
+        metrics = {depth: metrics_matrix(cnt, amt, all_years, year_order)
+                   for depth, (_, cnt, amt, year_order) in levels.items()}
+
+        dv, vv, pv = (self.vocab[dim] for dim in LEVEL_DIMS)
+        hierarchy: Dict[str, Dict] = {}
+        for (dc,), m in zip(levels[1][0].tolist(), metrics[1]):
+            # directorate
+            hierarchy[dv[dc]] = m
+        for (dc, vc), m in zip(levels[2][0].tolist(), metrics[2]):
+            hierarchy[dv[dc]][vv[vc]] = m
+        for (dc, vc, pc), m in zip(levels[3][0].tolist(), metrics[3]):
+            hierarchy[dv[dc]][vv[vc]][pv[pc]] = m
+        return hierarchy
+
+    def cube(self, view: str = "award") -> Optional[FundingCube]:
+        """
+        The same per-(node, year) totals as a dense FundingCube, or None
+        if nothing was added.
+        """
+        if not self._parts[1]:
+            return None
+        all_years, levels = self._levels(view)
+        return cube_from_levels(all_years, levels, self.vocab, LEVEL_DIMS)
+
+def metrics_matrix(
+    counts: np.ndarray,
+    amounts: np.ndarray,
+    years: List[int],
+    year_order: Optional[np.ndarray] = None,
+) -> List[OrderedDict]:
+    """
+    Vectorized make_metrics for a whole level: counts / amounts are
+    (node, year) matrices with year columns in descending order. Years a
+    node never saw (count 0) are omitted, exactly as in make_metrics.
+
+    Aggregate amounts are added one year at a time in year_order (per
+    node, the columns in first-seen order), the order make_metrics sums
+    them in, so fractional totals round the same way.
+    """
+    agg_n = counts.sum(axis=1).tolist()
+    ordered = amounts if year_order is None else np.take_along_axis(amounts, year_order, axis=1)
+    agg_a = np.zeros(len(amounts))
+    for col in ordered.T:
+        agg_a += col
+    agg_a = agg_a.tolist()
+    cnt_rows, amt_rows, seen_rows = counts.tolist(), amounts.tolist(), (counts > 0).tolist()
+    out = []
+    for n_tot, a_tot, cnt, amt, seen in zip(agg_n, agg_a, cnt_rows, amt_rows, seen_rows):
+        m = OrderedDict()
+        m["num_awards_aggregate"]  = n_tot
+        m["amt_awarded_aggregate"] = a_tot
+        for y, c, a, s in zip(years, cnt, amt, seen):
+            if s:
+                m[f"num_awards_{y}"] = c
+                m[f"amt_awarded_{y}"] = a
+        out.append(m)
+    return out
+
+def build_hierarchy(records: Iterable[Dict]) -> Dict[str, Dict]:
+    """
+    Vectorized aggregation:
+      1) group by (year → {count, amt}) at program, division, directorate
+      2) assemble nested dict with metrics at each level
+    records may be a list of record dicts or a RecordStore.
+    """
+    builder = HierarchyBuilder()
+    builder.add(records)
+    return builder.build()
 
 def make_brief(node: Dict) -> Dict:
     """
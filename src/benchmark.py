@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import platform
+import argparse
+import contextlib
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from src.sources import count_awards, find_sources
+from src.ingest import ingest_source
+from src.records import RecordStore
+from src.mappings import MapBuilder
+from src.aggregator import HierarchyBuilder, make_brief, sort_hierarchy
+from src.serialize import write_tree
+from src.cube import write_cube
+from src.taxonomy import generate_taxonomy
+from src.export_awards import AwardCsvWriter
+from src.decode import available_backends
+from src.measure import Measure
+from src.synthetic import generate
+
+BENCH_DIR = Path("data/bench")
+
+# scale → (years, awards per year)
+SCALES = {
+    "small":  (3, 500),
+    "medium": (5, 5000),
+    "large":  (10, 20000),
+}
+STAGES = ["parse", "maps", "aggregate", "serialize", "taxonomy", "export"]
+
+# a stage regresses when it is this much slower / bigger than the baseline
+# *and* past an absolute floor (so timer noise on tiny stages is ignored)
+TOLERANCE     = 0.20
+MIN_WALL_S    = 0.05
+MIN_RSS_MB    = 5.0
+
+def corpus(scale: str, bench_dir: Path = BENCH_DIR, programs: int = 3, abstract_words: int = 250, seed: int = 0) -> Path:
+    """
+    The synthetic corpus for a scale, generated on first use and reused
+    while its parameters (recorded in manifest.json) are unchanged.
+    """
+    years, awards = SCALES[scale]
+    params = {"years": years, "awards": awards, "programs": programs,
+              "abstract_words": abstract_words, "seed": seed}
+    data_dir = bench_dir / scale / "awards"
+    manifest = bench_dir / scale / "manifest.json"
+    if manifest.exists() and json.loads(manifest.read_text()) == params:
+        return data_dir
+
+    first = 2000
+    generate(data_dir, range(first, first + years), awards, programs, abstract_words, "zip", seed)
+    manifest.write_text(json.dumps(params))
+    return data_dir
+
+def _stage_parse(ctx: Dict) -> Dict:
+    store = RecordStore()
+    for source in ctx["sources"]:
+        records, _, _ = ingest_source(source, with_records=True, with_rows=False, cache_dir=None)
+        store.merge(records)
+    ctx["store"] = store
+    return {"items": ctx["n_awards"], "bytes_read": ctx["bytes_in"]}
+
+def _stage_maps(ctx: Dict) -> Dict:
+    builder = MapBuilder()
+    builder.add(ctx["store"])
+    builder.write(str(ctx["out_dir"]))
+    return {"items": len(ctx["store"])}
+
+def _stage_aggregate(ctx: Dict) -> Dict:
+    builder = HierarchyBuilder()
+    builder.add(ctx["store"])
+    hierarchy = builder.build()
+    ctx["cube"]  = builder.cube()
+    ctx["full"]  = sort_hierarchy(hierarchy)
+    ctx["brief"] = sort_hierarchy({d: make_brief(sub) for d, sub in hierarchy.items()})
+    return {"items": len(ctx["store"])}
+
+def _stage_serialize(ctx: Dict) -> Dict:
+    out = ctx["out_dir"]
+    paths = [out / "research.json", out / "research_brief.json", out / "research.ndjson.gz"]
+    write_tree(ctx["full"], paths[0])
+    write_tree(ctx["brief"], paths[1])
+    write_tree(ctx["full"], paths[2])
+    write_cube(ctx["cube"], out / "cube")
+    written = sum(p.stat().st_size for p in paths)
+    written += sum(p.stat().st_size for p in (out / "cube").iterdir())
+    return {"items": len(ctx["cube"]), "bytes_written": written}
+
+def _stage_taxonomy(ctx: Dict) -> Dict:
+    generate_taxonomy(str(ctx["out_dir"] / "research.json"), str(ctx["out_dir"]))
+    return {"items": len(ctx["cube"]), "bytes_read": (ctx["out_dir"] / "research.json").stat().st_size}
+
+def _stage_export(ctx: Dict) -> Dict:
+    out_path = ctx["out_dir"] / "awards.csv"
+    writer = AwardCsvWriter(out_path)
+    for source in ctx["sources"]:
+        _, rows, _ = ingest_source(source, with_records=False, with_rows=True, cache_dir=None)
+        writer.add(rows)
+    writer.close()
+    return {"items": writer.rows, "bytes_read": ctx["bytes_in"], "bytes_written": out_path.stat().st_size}
+
+STAGE_FUNCS: Dict[str, Callable[[Dict], Dict]] = {
+    "parse":     _stage_parse,
+    "maps":      _stage_maps,
+    "aggregate": _stage_aggregate,
+    "serialize": _stage_serialize,
+    "taxonomy":  _stage_taxonomy,
+    "export":    _stage_export,
+}
+
+def run_scale(data_dir: Path, out_dir: Path, stages: List[str] = STAGES, repeat: int = 1) -> Dict[str, Dict]:
+    """
+    Time each stage in-process and single-threaded (so numbers measure the
+    code, not the worker count), feeding each stage the previous one's
+    output. With repeat > 1 the fastest run is kept.
+    """
+    sources = find_sources(data_dir)
+    ctx = {
+        "sources":  sources,
+        "out_dir":  out_dir,
+        "n_awards": sum(count_awards(s) for s in sources),
+        "bytes_in": sum(s.stat().st_size for s in sources),
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # later stages need earlier outputs even when only they are timed
+    needed = STAGES[: max(STAGES.index(s) for s in stages) + 1]
+    results: Dict[str, Dict] = {}
+    for name in needed:
+        best = None
+        for _ in range(repeat if name in stages else 1):
+            with contextlib.redirect_stdout(io.StringIO()), Measure() as m:
+                info = STAGE_FUNCS[name](ctx)
+            r = dict(m.result(), **info)
+            if best is None or r["wall_s"] < best["wall_s"]:
+                best = r
+        if name in stages:
+            best["items_per_s"] = round(best["items"] / best["wall_s"], 1) if best["wall_s"] else None
+            if best.get("bytes_read"):
+                best["read_mb_per_s"] = round(best["bytes_read"] / 2**20 / best["wall_s"], 1) if best["wall_s"] else None
+            results[name] = best
+    return results
+
+def compare(results: Dict, baseline: Dict, tolerance: float = TOLERANCE) -> List[str]:
+    """
+    Regression messages for every scale/stage slower or hungrier than the
+    baseline by more than `tolerance` (and the absolute floors).
+    """
+    flags = []
+    for scale, stages in results.items():
+        for stage, r in stages.items():
+            b = baseline.get(scale, {}).get(stage)
+            if not b:
+                continue
+            if r["wall_s"] > b["wall_s"] * (1 + tolerance) and r["wall_s"] - b["wall_s"] > MIN_WALL_S:
+                flags.append(f"{scale}/{stage}: wall {b['wall_s']:.3f}s → {r['wall_s']:.3f}s "
+                             f"(+{(r['wall_s'] / b['wall_s'] - 1) * 100:.0f}%)")
+            growth, b_growth = r["rss_growth_mb"], b["rss_growth_mb"]
+            if growth > b_growth * (1 + tolerance) and growth - b_growth > MIN_RSS_MB:
+                flags.append(f"{scale}/{stage}: RSS growth {b_growth:.1f} MB → {growth:.1f} MB")
+    return flags
+
+def environment() -> Dict:
+    return {
+        "python":   platform.python_version(),
+        "platform": platform.platform(),
+        "cpus":     os.cpu_count(),
+        "json":     available_backends(),
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="Stage-level benchmarks on synthetic NSF corpora")
+    p.add_argument("--scales",         nargs="+", choices=list(SCALES), default=["small", "medium"])
+    p.add_argument("--stages",         nargs="+", choices=STAGES, default=STAGES)
+    p.add_argument("--repeat",         type=int, default=3, help="runs per stage; the fastest is kept")
+    p.add_argument("--bench-dir",      default=str(BENCH_DIR), help="corpora and outputs (default: data/bench)")
+    p.add_argument("--abstract-words", type=int, default=250)
+    p.add_argument("--programs",       type=int, default=3)
+    p.add_argument("--baseline",       default=None,
+                   help="baseline results to compare against (default: BENCH_DIR/baseline.json)")
+    p.add_argument("--save-baseline",  action="store_true", help="store these results as the new baseline")
+    p.add_argument("--tolerance",      type=float, default=TOLERANCE,
+                   help="allowed slowdown / RSS growth before flagging (default: 0.20)")
+    p.add_argument("--out",            default=None, help="also write results JSON here")
+    args = p.parse_args()
+
+    bench_dir = Path(args.bench_dir)
+    results: Dict[str, Dict] = {}
+    for scale in args.scales:
+        data_dir = corpus(scale, bench_dir, args.programs, args.abstract_words)
+        print(f"[{scale}] {SCALES[scale][0]} years × {SCALES[scale][1]} awards")
+        results[scale] = run_scale(data_dir, bench_dir / scale / "outputs", args.stages, args.repeat)
+        for stage, r in results[scale].items():
+            print(f"  {stage:<10} {r['wall_s']:8.3f}s wall  {r['cpu_s']:8.3f}s cpu  "
+                  f"{r['items_per_s'] or 0:>12,.0f} items/s  peak {r['peak_rss_mb']:7.1f} MB "
+                  f"(+{r['rss_growth_mb']:.1f})")
+
+    report = {"environment": environment(), "results": results}
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print(f"✔ Wrote {args.out}")
+
+    baseline_path = Path(args.baseline) if args.baseline else bench_dir / "baseline.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"✔ Saved baseline to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one.")
+        return
+
+    flags = compare(results, json.loads(baseline_path.read_text())["results"], args.tolerance)
+    if flags:
+        print("Regressions against baseline:")
+        for f in flags:
+            print(f"  ✘ {f}")
+        raise SystemExit(1)
+    print("✔ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import hashlib
+import importlib
+import json
+import random
+import re
+import sqlite3
+import time
+import argparse
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from tqdm import tqdm
+
+from src.http_client import RETRY_STATUSES, backoff_delay
+
+PROMPTS_DIR = Path("prompts")
+CACHE_PATH  = Path("data/cache/classify.sqlite")
+OUT_PATH    = Path("outputs/classifications.jsonl")
+
+TEMPLATES = ("screener", "classification", "research_mode", "research_action")
+LEVELS    = ("directorate", "division", "program")
+FACETS    = ("research_mode", "research_action")
+
+# Answers are short except the classification scratchpad
+MAX_TOKENS = {"screener": 10, "classification": 400, "research_mode": 20, "research_action": 20}
+STOP       = ["</answer>"]
+
+MAX_RETRIES = 6
+
+# Templates without a {conversation} slot (the facets) are asked after
+# the same opening exchange the screener uses
+PREAMBLE = [
+    ("user",      "The following is a conversation between an AI assistant and a user:\n{conversation}"),
+    ("assistant", "I understand."),
+]
+
+Turns = List[Tuple[str, str]]
+
+def load_templates(prompts_dir: Path = PROMPTS_DIR) -> Dict[str, Turns]:
+    """
+    Split each prompts/*.md transcript into (role, text) turns at its
+    `Human:` / `Assistant:` markers. Placeholders are filled per turn, so
+    conversation text can never be mistaken for a turn boundary.
+    """
+    templates = {}
+    for name in TEMPLATES:
+        raw = (prompts_dir / f"{name}.md").read_text()
+        parts = re.split(r"^(Human|Assistant):", raw, flags=re.M)
+        turns: Turns = []
+        for marker, text in zip(parts[1::2], parts[2::2]):
+            role = "user" if marker == "Human" else "assistant"
+            text = text.strip()
+            if turns and turns[-1][0] == role:
+                turns[-1] = (role, turns[-1][1] + "\n\n" + text)
+            else:
+                turns.append((role, text))
+        if not any("{conversation}" in t for _, t in turns):
+            turns = PREAMBLE + turns
+        templates[name] = turns
+    return templates
+
+def template_options(turns: Turns) -> List[str]:
+    """
+    The quoted option names a facet template lists (`- "DATA_ANALYSIS": ...`).
+    """
+    return re.findall(r'^- "([A-Z_]+)"', "\n".join(t for _, t in turns), flags=re.M)
+
+def render(turns: Turns, **values: str) -> Turns:
+    """
+    Fill {name} placeholders in one pass, so substituted text (a
+    conversation quoting "{options_str}") is never scanned again;
+    unknown placeholders are left as they are.
+    """
+    fill = lambda m: values.get(m.group(1), m.group(0))
+    return [(role, re.sub(r"\{(\w+)\}", fill, text)) for role, text in turns]
+
+def prompt_text(turns: Turns) -> str:
+    return "\n\n".join(f"{'Human' if r == 'user' else 'Assistant'}: {t}" for r, t in turns)
+
+def conversation_text(conv: Dict) -> str:
+    """
+    {"conversation": "..."} as is, or {"messages": [{"role", "content"}, ...]}
+    flattened to "User: ..." / "AI: ..." lines.
+    """
+    if isinstance(conv.get("conversation"), str):
+        return conv["conversation"]
+    lines = []
+    for m in conv.get("messages") or []:
+        who = "User" if m.get("role") in ("user", "human") else "AI"
+        content = m.get("content")
+        if isinstance(content, list):
+            content = "\n".join(c.get("text", "") for c in content if isinstance(c, dict))
+        lines.append(f"{who}: {content}")
+    return "\n\n".join(lines)
+
+def parse_answer(text: str) -> str:
+    """
+    The text inside the last <answer> tag; with the tag prefilled (or cut
+    by the stop sequence) whatever precedes `</answer>`.
+    """
+    if "<answer>" in text:
+        text = text.rsplit("<answer>", 1)[1]
+    return text.split("</answer>", 1)[0].strip().strip('"').strip()
+
+def match_option(answer: str, options: List[str]) -> Optional[str]:
+    if answer in options:
+        return answer
+    folded = {o.casefold().strip(): o for o in options}
+    return folded.get(answer.casefold().lstrip("- ").strip())
+
+class RetryableError(Exception):
+    """
+    A transient backend failure (throttling, overload, connection reset),
+    carrying the server's Retry-After if it sent one.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[str] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class StubBackend:
+    """
+    Deterministic local backend for testing the runner: answers "Yes" to
+    the screener, picks the classification option sharing the most words
+    with the conversation and a hash-chosen facet. `latency` and
+    `fail_rate` simulate a remote model.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+        self.name      = "stub"
+        self.latency   = latency
+        self.fail_rate = fail_rate
+        self.rng       = random.Random(seed)
+
+    async def complete(self, turns: Turns, max_tokens: int) -> Dict:
+        from src.retrieval import analyze
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            raise RetryableError("stub: simulated overload")
+
+        prompt = prompt_text(turns)
+        last   = turns[-1][1] if turns[-1][0] == "user" else turns[-2][1]
+        convo  = set(analyze(turns[0][1]))
+        if "<question>" in last:
+            answer = "Yes"
+        elif "list of scientific domains" in last:
+            options = last.split("before you answer.", 1)[1].split("What is the answer?", 1)[0]
+            options = [o for o in options.strip().splitlines() if o.strip()]
+            answer  = max(options, key=lambda o: len(convo & set(analyze(o))))
+        else:
+            options = template_options(turns)
+            answer  = options[int(hashlib.md5(turns[0][1].encode()).hexdigest(), 16) % len(options)]
+        return {
+            "text":          f"{answer}</answer>",
+            "input_tokens":  len(prompt) // 4,
+            "output_tokens": len(answer) // 4 + 1,
+        }
+
+class AnthropicBackend:
+    """
+    Messages API backend (`pip install anthropic`, ANTHROPIC_API_KEY set).
+    A trailing assistant turn is sent as prefill; SDK retries are off so
+    the runner's backoff and rate limit are the only ones in play.
+    """
+
+    def __init__(self, model: str):
+        try:
+            import anthropic
+        except ImportError:
+            raise ImportError("The anthropic backend needs the anthropic SDK: pip install anthropic")
+        self._anthropic = anthropic
+        self.client     = anthropic.AsyncAnthropic(max_retries=0)
+        self.model      = model
+        self.name       = f"anthropic:{model}"
+
+    async def complete(self, turns: Turns, max_tokens: int) -> Dict:
+        anthropic = self._anthropic
+        messages  = [{"role": r, "content": t.rstrip()} for r, t in turns]
+        try:
+            resp = await self.client.messages.create(
+                model=self.model, max_tokens=max_tokens, temperature=0,
+                messages=messages, stop_sequences=STOP,
+            )
+        except anthropic.APIConnectionError as e:
+            raise RetryableError(str(e))
+        except anthropic.APIStatusError as e:
+            if e.status_code in RETRY_STATUSES or e.status_code >= 500:
+                raise RetryableError(str(e), e.response.headers.get("retry-after"))
+            raise
+        return {
+            "text":          "".join(b.text for b in resp.content if b.type == "text"),
+            "input_tokens":  resp.usage.input_tokens,
+            "output_tokens": resp.usage.output_tokens,
+        }
+
+def make_backend(spec: str, **stub_kwargs):
+    """
+      stub                     StubBackend
+      anthropic:MODEL          AnthropicBackend(MODEL)
+      package.module:factory   factory() → object with .name and async .complete(turns, max_tokens)
+    """
+    if spec == "stub":
+        return StubBackend(**stub_kwargs)
+    if spec.startswith("anthropic:"):
+        return AnthropicBackend(spec.split(":", 1)[1])
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown backend {spec!r}: use stub, anthropic:MODEL or module:factory")
+    return getattr(importlib.import_module(module), attr)()
+
+class ResponseCache:
+    """
+    Completed model calls in SQLite, keyed by a hash of backend name,
+    max_tokens and the rendered prompt. Each response is committed as soon
+    as it arrives (WAL, so commits are cheap), so a crash or re-run never
+    pays for a finished call twice.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, text TEXT, input_tokens INTEGER, output_tokens INTEGER, created REAL)"
+        )
+        self.db.commit()
+
+    @staticmethod
+    def key(backend: str, turns: Turns, max_tokens: int) -> str:
+        h = hashlib.sha256(f"{backend}\0{max_tokens}\0".encode())
+        h.update(prompt_text(turns).encode())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.db.execute(
+            "SELECT text, input_tokens, output_tokens FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"text": row[0], "input_tokens": row[1], "output_tokens": row[2]}
+
+    def put(self, key: str, completion: Dict):
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (key, completion["text"], completion.get("input_tokens"), completion.get("output_tokens"), time.time()),
+        )
+        self.db.commit()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+class RateLimiter:
+    """
+    Token bucket: at most `rate` acquisitions per second on average, with
+    bursts of up to `burst`. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate    = rate
+        self.burst   = burst or max(1, int(rate))
+        self.tokens  = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock   = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens  = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class Classifier:
+    """
+    Runs the screener → directorate → division → program chain, then both
+    facets in parallel, for one conversation at a time per caller.
+
+    Every model call goes through the cache; identical prompts already in
+    flight are shared rather than sent twice. At most `concurrency` calls
+    are outstanding, each started under the rate limiter and retried with
+    exponential backoff on RetryableError. A level with a single option is
+    answered without a call.
+    """
+
+    def __init__(
+        self,
+        backend,
+        templates: Dict[str, Turns],
+        taxonomy: Dict[str, Dict[str, List[str]]],
+        cache: ResponseCache,
+        concurrency: int = 16,
+        rate: Optional[float] = None,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = 1.0,
+        retriever=None,
+        k: Optional[Dict[str, int]] = None,
+    ):
+        self.backend      = backend
+        self.templates    = templates
+        self.taxonomy     = taxonomy
+        self.cache        = cache
+        self.semaphore    = asyncio.Semaphore(concurrency)
+        self.limiter      = RateLimiter(rate) if rate else None
+        self.max_retries  = max_retries
+        self.backoff_base = backoff_base
+        self.retriever    = retriever
+        self.k            = k
+        self.facet_options = {f: template_options(templates[f]) for f in FACETS}
+        self.stats: Counter = Counter()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _complete(self, turns: Turns, max_tokens: int) -> Dict:
+        async with self.semaphore:
+            for attempt in range(self.max_retries + 1):
+                if self.limiter:
+                    await self.limiter.acquire()
+                try:
+                    return await self.backend.complete(turns, max_tokens)
+                except RetryableError as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(backoff_delay(attempt, base=self.backoff_base, retry_after=e.retry_after))
+
+    async def call(self, turns: Turns, max_tokens: int) -> Dict:
+        key = self.cache.key(self.backend.name, turns, max_tokens)
+        hit = self.cache.get(key)
+        if hit is not None:
+            self.stats["cached"] += 1
+            return hit
+        if key in self._inflight:
+            self.stats["shared"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            completion = await self._complete(turns, max_tokens)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody shares it
+            raise
+        finally:
+            del self._inflight[key]
+        self.cache.put(key, completion)
+        fut.set_result(completion)
+        self.stats["calls"]         += 1
+        self.stats["input_tokens"]  += completion.get("input_tokens") or 0
+        self.stats["output_tokens"] += completion.get("output_tokens") or 0
+        return completion
+
+    async def choose(self, template: str, conversation: str, options: List[str]) -> Optional[str]:
+        if len(options) == 1:
+            self.stats["skipped_calls"] += 1
+            return options[0]
+        values = {"conversation": conversation}
+        if template == "classification":
+            values["options_str"] = "\n".join(options)
+        turns = render(self.templates[template], **values)
+        completion = await self.call(turns, MAX_TOKENS[template])
+        return match_option(parse_answer(completion["text"]), options)
+
+    def options(self, conversation: str, path: Tuple[str, ...], level: str) -> List[str]:
+        node = self.taxonomy
+        for name in path:
+            node = node[name]
+        children = list(node)
+        if self.retriever is None:
+            return children
+        shortlist = self.retriever.shortlist(conversation, level, self.k.get(level), within=path)
+        return [p[-1] for p, _ in shortlist] or children
+
+    async def classify(self, conv: Dict) -> Dict:
+        text   = conversation_text(conv)
+        result = {"id": conv.get("id")}
+        if "count" in conv:
+            result["count"] = conv["count"]  # cluster size from src/dedup.py
+        result["screened"] = await self.choose("screener", text, ["Yes", "No"]) == "Yes"
+        if not result["screened"]:
+            return result
+
+        path: Tuple[str, ...] = ()
+        for level in LEVELS:
+            options = self.options(text, path, level)
+            if not options:
+                break
+            pick = await self.choose("classification", text, options)
+            if pick is None:
+                result["error"] = f"unmatched {level} answer"
+                break
+            path += (pick,)
+            result[level] = pick
+
+        facets = await asyncio.gather(*(self.choose(f, text, self.facet_options[f]) for f in FACETS))
+        result.update(zip(FACETS, facets))
+        return result
+
+def completed_ids(out_path: Path) -> set:
+    """
+    Ids already written to out_path without an error (a torn last line
+    from a crash is ignored), so a re-run picks up where it stopped.
+    """
+    done = set()
+    if not out_path.exists():
+        return done
+    with open(out_path) as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue
+            if "error" not in r:
+                done.add(r.get("id"))
+    return done
+
+def iter_conversations(path: Path, limit: Optional[int] = None) -> Iterable[Dict]:
+    with open(path) as f:
+        for i, line in enumerate(f):
+            if limit is not None and i >= limit:
+                break
+            if line.strip():
+                conv = json.loads(line)
+                conv.setdefault("id", i)
+                yield conv
+
+async def run_batch(classifier: Classifier, in_path: Path, out_path: Path,
+                    workers: int = 32, limit: Optional[int] = None) -> Dict:
+    """
+    Stream conversations through `workers` concurrent classification
+    chains, appending one JSON line per conversation to out_path in
+    completion order. Conversations already completed there are skipped.
+    """
+    done  = completed_ids(out_path)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    counts = Counter()
+    t0 = time.perf_counter()
+
+    with open(out_path, "a") as out, tqdm(desc="Classifying", unit="conv") as bar:
+        async def producer():
+            for conv in iter_conversations(in_path, limit):
+                if conv["id"] in done:
+                    counts["resumed"] += 1
+                    continue
+                await queue.put(conv)
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def worker():
+            while True:
+                conv = await queue.get()
+                if conv is None:
+                    return
+                try:
+                    result = await classifier.classify(conv)
+                except Exception as e:
+                    result = {"id": conv["id"], "error": f"{type(e).__name__}: {e}"}
+                counts["errors" if "error" in result else "done"] += 1
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                bar.update()
+
+        await asyncio.gather(producer(), *(worker() for _ in range(workers)))
+
+    wall = time.perf_counter() - t0
+    n = counts["done"] + counts["errors"]
+    return dict(classifier.stats, **counts, wall_s=round(wall, 2),
+                conversations_per_s=round(n / wall, 1) if wall else None)
+
+def main():
+    p = argparse.ArgumentParser(description="Run the prompts/ classification chain over a JSONL of conversations")
+    p.add_argument("conversations", help='JSONL: {"id", "conversation": str} or {"id", "messages": [...]}')
+    p.add_argument("--out",          default=str(OUT_PATH))
+    p.add_argument("--backend",      default="stub", help="stub | anthropic:MODEL | package.module:factory")
+    p.add_argument("--concurrency",  type=int, default=16, help="max model calls in flight")
+    p.add_argument("--workers",      type=int, default=None,
+                   help="conversations in flight (default: 2 × concurrency, so cache hits keep calls saturated)")
+    p.add_argument("--rps",          type=float, default=None, help="max model calls started per second")
+    p.add_argument("--max-retries",  type=int, default=MAX_RETRIES)
+    p.add_argument("--cache",        default=str(CACHE_PATH))
+    p.add_argument("--prompts",      default=str(PROMPTS_DIR))
+    p.add_argument("--outputs",      default="outputs", help="directory with taxonomy.json")
+    p.add_argument("--shortlist",    action="store_true",
+                   help="offer only src/retrieval.py's top-k options at each level instead of every child")
+    p.add_argument("--limit",        type=int, default=None, help="only the first N conversations")
+    p.add_argument("--stub-latency", type=float, default=0.0, help="stub backend: seconds per call")
+    p.add_argument("--stub-fail",    type=float, default=0.0, help="stub backend: fraction of calls failing transiently")
+    args = p.parse_args()
+
+    backend  = make_backend(args.backend, latency=args.stub_latency, fail_rate=args.stub_fail) \
+        if args.backend == "stub" else make_backend(args.backend)
+    taxonomy = json.loads((Path(args.outputs) / "taxonomy.json").read_text())
+    retriever = None
+    if args.shortlist:
+        from src.retrieval import DEFAULT_K, Retriever
+        retriever = Retriever.from_outputs(Path(args.outputs))
+
+    cache = ResponseCache(Path(args.cache))
+
+    async def run():
+        classifier = Classifier(
+            backend, load_templates(Path(args.prompts)), taxonomy, cache,
+            concurrency=args.concurrency, rate=args.rps, max_retries=args.max_retries,
+            retriever=retriever, k=DEFAULT_K if args.shortlist else None,
+        )
+        return await run_batch(classifier, Path(args.conversations), Path(args.out),
+                               workers=args.workers or 2 * args.concurrency, limit=args.limit)
+
+    try:
+        stats = asyncio.run(run())
+    finally:
+        cache.close()
+
+    print(f"✔ Wrote {args.out}")
+    print(f"  {stats.get('done', 0)} classified, {stats.get('errors', 0)} errors, {stats.get('resumed', 0)} already done")
+    print(f"  {stats.get('calls', 0)} model calls, {stats.get('cached', 0)} cache hits, "
+          f"{stats.get('shared', 0)} shared, {stats.get('skipped_calls', 0)} skipped (single option), "
+          f"{stats.get('retries', 0)} retries")
+    print(f"  {stats.get('input_tokens', 0):,} input / {stats.get('output_tokens', 0):,} output tokens, "
+          f"{stats['conversations_per_s']} conversations/s")
+
+if __name__ == "__main__":
+    main()
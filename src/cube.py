@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Bump when the on-disk layout below changes
+CUBE_FORMAT = "funding-cube-v1"
+
+# outputs/cube/
+#   counts.npy    int64   (node, year)  number of awards
+#   amounts.npy   float64 (node, year)  awarded amount
+#   nodes.json    years (ascending) plus, per node row, its path
+#                 [directorate(, division(, program))] and parent row;
+#                 optional "notes" saying what counts / amounts hold
+CUBE_DIR = Path("outputs/cube")
+
+class FundingCube:
+    """
+    Dense node × year funding matrices for every hierarchy node.
+
+    Rows are in depth-first order (a directorate, then each of its
+    divisions followed by that division's programs), so every subtree is
+    one contiguous row range; columns are years in ascending order.
+    """
+
+    def __init__(
+        self,
+        counts: np.ndarray,
+        amounts: np.ndarray,
+        years: Sequence[int],
+        paths: List[Tuple[str, ...]],
+        parent: Sequence[int],
+    ):
+        self.counts  = counts
+        self.amounts = amounts
+        self.years   = np.asarray(years, dtype=np.int64)
+        self.paths   = [tuple(p) for p in paths]
+        self.parent  = np.asarray(parent, dtype=np.int64)
+        self.depth   = np.array([len(p) for p in self.paths], dtype=np.int64)
+        self._rows   = None
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def row(self, path: Sequence[str]) -> int:
+        """
+        Row index of a node path, e.g. ("Directorate for Geosciences",).
+        """
+        if self._rows is None:
+            self._rows = {p: i for i, p in enumerate(self.paths)}
+        return self._rows[tuple(path)]
+
+    def rows_at(self, depth: int) -> np.ndarray:
+        """
+        Row indices of every node at a depth (1 directorate, 2 division, 3 program).
+        """
+        return np.flatnonzero(self.depth == depth)
+
+    def year_col(self, year: int) -> int:
+        col = int(np.searchsorted(self.years, year))
+        if col >= len(self.years) or self.years[col] != year:
+            raise KeyError(year)
+        return col
+
+def cube_from_levels(
+    years_desc: List[int],
+    levels: dict,
+    vocab: dict,
+    dims: Sequence[str],
+) -> FundingCube:
+    """
+    Assemble a FundingCube from HierarchyBuilder level tables:
+    levels[depth] = (node keys, counts, amounts, ...) with year columns in
+    descending order, keys being codes into vocab[dims[i]].
+    """
+    n_years = len(years_desc)
+    paths: List[Tuple[str, ...]] = []
+    parent: List[int] = []
+    take: List[Tuple[int, int]] = []  # (depth, row within that level)
+
+    # children of each node, in first-seen order
+    children = {}
+    for depth in (1, 2, 3):
+        for i, key in enumerate(levels[depth][0].tolist()):
+            children.setdefault(tuple(key[:-1]), []).append((depth, i, tuple(key)))
+
+    def visit(key: Tuple[int, ...], parent_row: int):
+        for depth, i, child in children.get(key, ()):
+            row = len(paths)
+            paths.append(tuple(vocab[dims[j]][c] for j, c in enumerate(child)))
+            parent.append(parent_row)
+            take.append((depth, i))
+            visit(child, row)
+
+    visit((), -1)
+
+    counts  = np.zeros((len(paths), n_years), dtype=np.int64)
+    amounts = np.zeros((len(paths), n_years), dtype=np.float64)
+    take_arr = np.array(take, dtype=np.int64).reshape(-1, 2)
+    for depth in (1, 2, 3):
+        rows = np.flatnonzero(take_arr[:, 0] == depth)
+        src  = take_arr[rows, 1]
+        counts[rows]  = levels[depth][1][src]
+        amounts[rows] = levels[depth][2][src]
+
+    # flip to ascending years
+    return FundingCube(counts[:, ::-1].copy(), amounts[:, ::-1].copy(), years_desc[::-1], paths, parent)
+
+def write_cube(cube: FundingCube, out_dir: Path = CUBE_DIR, notes: Optional[dict] = None):
+    """
+    Write the cube as two .npy matrices and a nodes.json sidecar (with
+    `notes` on what the matrices hold, if given). nodes.json is replaced
+    last, so a reader never pairs it with half-written arrays from an
+    older run.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, arr in (("counts", cube.counts), ("amounts", cube.amounts)):
+        tmp = out_dir / f"{name}.npy.tmp"
+        with tmp.open("wb") as f:
+            np.save(f, np.ascontiguousarray(arr))
+        os.replace(tmp, out_dir / f"{name}.npy")
+
+    meta = {
+        "format": CUBE_FORMAT,
+        "years":  cube.years.tolist(),
+        "paths":  [list(p) for p in cube.paths],
+        "parent": cube.parent.tolist(),
+    }
+    if notes:
+        meta["notes"] = notes
+    tmp = out_dir / "nodes.json.tmp"
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, out_dir / "nodes.json")
+
+def load_cube(cube_dir: Path = CUBE_DIR, mmap: bool = True) -> FundingCube:
+    """
+    Open a cube written by write_cube. With mmap=True (the default) the
+    matrices are read-only memory maps: nothing is parsed and pages are
+    only read as they are touched.
+    """
+    cube_dir = Path(cube_dir)
+    meta = json.loads((cube_dir / "nodes.json").read_text())
+    if meta.get("format") != CUBE_FORMAT:
+        raise ValueError(f"{cube_dir} holds an unsupported cube format: {meta.get('format')}")
+    mode    = "r" if mmap else None
+    counts  = np.load(cube_dir / "counts.npy",  mmap_mode=mode)
+    amounts = np.load(cube_dir / "amounts.npy", mmap_mode=mode)
+    return FundingCube(counts, amounts, meta["years"], meta["paths"], meta["parent"])
+
+def find_cube(cube_dir: Path = CUBE_DIR) -> Optional[Path]:
+    """
+    cube_dir if it holds a complete cube, else None.
+    """
+    cube_dir = Path(cube_dir)
+    if all((cube_dir / n).exists() for n in ("nodes.json", "counts.npy", "amounts.npy")):
+        return cube_dir
+    return None
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+import argparse
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Top-level award fields each consumer reads. Anything else in the award
+# document (abstracts, PI lists, ...) is skipped by projecting decoders.
+PARSE_FIELDS = (
+    "org_dir_long_name", "org_div_long_name", "tot_intn_awd_amt",
+    "pgm_ele", "dir_abbr", "div_abbr", "oblg_fy",
+)
+EXPORT_FIELDS = (
+    "awd_id", "agcy_id", "tran_type", "awd_istr_txt", "awd_titl_txt",
+    "cfda_num", "org_code", "po_phone", "po_email", "po_sign_block_name",
+    "awd_eff_date", "awd_exp_date", "tot_intn_awd_amt", "awd_amount",
+    "awd_min_amd_letter_date", "awd_max_amd_letter_date", "awd_abstract_narration",
+    "awd_arra_amount", "dir_abbr", "org_dir_long_name", "div_abbr", "org_div_long_name",
+    "pgm_ele", "pgm_ref", "awd_agcy_code", "fund_agcy_code", "pi",
+    "inst", "perf_inst", "app_fund", "oblg_fy",
+)
+INDEX_FIELDS = (
+    "awd_id", "awd_titl_txt", "awd_abstract_narration",
+    "org_dir_long_name", "org_div_long_name", "pgm_ele",
+)
+
+# Preferred first; the stdlib decoder is always available.
+# AWARD_JSON_BACKEND=json (or orjson / msgspec) pins one.
+BACKENDS = ("msgspec", "orjson", "json")
+
+def available_backends() -> List[str]:
+    out = []
+    for name in BACKENDS:
+        try:
+            __import__(name)
+            out.append(name)
+        except ImportError:
+            pass
+    return out
+
+def fields_for(with_records: bool, with_rows: bool) -> Optional[Tuple[str, ...]]:
+    """
+    Union of the fields the requested consumers read (None = nothing).
+    """
+    fields: Dict[str, None] = {}
+    if with_records:
+        fields.update(dict.fromkeys(PARSE_FIELDS))
+    if with_rows:
+        fields.update(dict.fromkeys(EXPORT_FIELDS))
+    return tuple(fields) or None
+
+@lru_cache(maxsize=None)
+def make_decoder(fields: Optional[Tuple[str, ...]] = None, backend: Optional[str] = None) -> Callable[[bytes], Dict]:
+    """
+    A bytes → dict decoder for award documents that yields at least
+    `fields` (every field when None), with the same values json.loads gives;
+    absent fields stay absent, so data.get() behaves as before.
+
+      msgspec  decodes into a Struct of just those fields: skipped values
+               (abstracts, PI lists, ...) are validated but never turned
+               into Python objects
+      orjson   full decode, about twice as fast as the stdlib
+      json     stdlib full decode (projecting afterwards would only add work)
+    """
+    backend = backend or os.environ.get("AWARD_JSON_BACKEND") or available_backends()[0]
+
+    if backend == "msgspec" and fields is not None:
+        import msgspec
+        View = msgspec.defstruct(
+            "AwardView", [(f, Any, msgspec.UNSET) for f in fields],
+            omit_defaults=True,
+        )
+        decoder = msgspec.json.Decoder(View)
+        unset   = msgspec.UNSET
+
+        def decode(raw: bytes) -> Dict:
+            view = decoder.decode(raw)
+            out = {}
+            for f in fields:
+                v = getattr(view, f)
+                if v is not unset:
+                    out[f] = v
+            return out
+        return decode
+
+    if backend == "msgspec":
+        import msgspec
+        loads = msgspec.json.decode
+    elif backend == "orjson":
+        import orjson
+        loads = orjson.loads
+    elif backend == "json":
+        loads = json.loads
+    else:
+        raise ValueError(f"Unknown JSON backend: {backend}")
+
+    return loads
+
+def read_blobs(source: Path, limit: Optional[int] = None) -> List[Tuple[bytes, int]]:
+    """
+    (raw bytes, year) for the awards in one source, read up front so
+    benchmarks time decoding only.
+    """
+    from src.sources import award_year, iter_award_paths
+
+    blobs = []
+    for award in iter_award_paths(source):
+        if limit is not None and len(blobs) >= limit:
+            break
+        blobs.append((award.read_bytes(), award_year(award)))
+    return blobs
+
+def bench(blobs: List[Tuple[bytes, int]], repeat: int = 3) -> List[Dict]:
+    """
+    Time the parse path (decode + parse_award_data) per backend against
+    today's json.loads of the full document, and check every backend
+    yields the same records. Returns one result dict per backend.
+    """
+    from src.parser import parse_award_data
+
+    n_bytes = sum(len(b) for b, _ in blobs)
+
+    def run(decode):
+        out = []
+        for raw, year in blobs:
+            out.append(parse_award_data(decode(raw), year))
+        return out
+
+    variants = [("json (full, baseline)", json.loads)]
+    for name in available_backends():
+        label = "projected" if name == "msgspec" else "full"
+        variants.append((f"{name} ({label})", make_decoder(PARSE_FIELDS, name)))
+
+    expected = run(json.loads)
+    results  = []
+    for label, decode in variants:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            got = run(decode)
+            best = min(best, time.perf_counter() - t0)
+        results.append({
+            "decoder":      label,
+            "seconds":      best,
+            "awards_per_s": len(blobs) / best if best else 0.0,
+            "mb_per_s":     n_bytes / best / 1e6 if best else 0.0,
+            "same_output":  got == expected,
+        })
+    base = results[0]["seconds"]
+    for r in results:
+        r["speedup"] = base / r["seconds"] if r["seconds"] else 0.0
+    return results
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark projected award decoding against full json.loads")
+    p.add_argument("source", help="a year ZIP or extracted year folder, e.g. data/awards/2020.zip")
+    p.add_argument("--limit",  type=int, default=None, help="only the first N awards")
+    p.add_argument("--repeat", type=int, default=3)
+    args = p.parse_args()
+
+    blobs = read_blobs(Path(args.source), args.limit)
+    print(f"Benchmarking parse decoding on {len(blobs)} awards from {args.source}")
+    for r in bench(blobs, args.repeat):
+        print(f"  {r['decoder']:<24} {r['seconds']:8.3f}s  {r['awards_per_s']:>10,.0f} awards/s  "
+              f"{r['mb_per_s']:7.1f} MB/s  x{r['speedup']:.2f}  {'ok' if r['same_output'] else 'MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
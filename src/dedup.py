@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import zlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+from tqdm import tqdm
+
+import numpy as np
+
+from src.classify import conversation_text
+from src.ingest import bounded_map
+from src.text_index import TOKEN_RE
+
+DEDUP_DIR = Path("outputs/dedup")
+
+NUM_PERM   = 128     # MinHash permutations (signature width)
+BANDS      = 16      # LSH bands of NUM_PERM / BANDS rows: candidates from ~0.7 similarity
+SHINGLE    = 5       # words per shingle
+THRESHOLD  = 0.8     # estimated Jaccard needed to merge a candidate pair
+BATCH      = 2000    # conversations per worker task
+MAX_TOKENS = 20000   # words hashed per conversation
+BLOCK      = 65536   # shingles hashed at once (bounds the hash matrix to BLOCK × NUM_PERM)
+ROW_CHUNK  = 1 << 20 # signature rows read at once in the LSH pass
+
+# outputs/dedup/
+#   meta.json             input file, parameters, counts
+#   signatures.u32        uint32 [n, NUM_PERM] MinHash signatures (raw, memory-mapped)
+#   offsets.i64           int64 byte offset of each conversation's line in the input (raw, memory-mapped)
+#   ids.jsonl             conversation id per row; the 0-based input line number when the
+#                         line has no "id", as src/classify.py assigns it
+#   clusters.npy          int64 representative row per row (the cluster's first row)
+#   representatives.jsonl one input line per cluster, with "count" = cluster size and its id
+
+def perm_params(num_perm: int = NUM_PERM, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Multiply-shift hash functions h(x) = (a·x + b) >> 32 over uint64 (a odd):
+    one per permutation, vectorizable as a single broadcast multiply.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+def shingle_hashes(text: str, k: int = SHINGLE) -> np.ndarray:
+    """
+    Distinct 64-bit hashes of the k-word windows of a lower-cased text
+    (one window over all words when there are fewer than k).
+    """
+    toks = TOKEN_RE.findall(text.lower())[:MAX_TOKENS] or [""]
+    h = np.fromiter(map(zlib.crc32, map(str.encode, toks)), dtype=np.uint64, count=len(toks))
+    k = min(k, len(h))
+    out = np.zeros(len(h) - k + 1, dtype=np.uint64)
+    for j in range(k):
+        out = out * np.uint64(1000003) + h[j:j + len(out)]
+    return np.unique(out)
+
+def minhash(texts: List[str], a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    uint32 [len(texts), NUM_PERM] signatures: shingles of many texts are
+    hashed as one block matrix, then reduced to per-text minima.
+    """
+    sh   = [shingle_hashes(t) for t in texts]
+    lens = np.array([len(s) for s in sh])
+    sig  = np.empty((len(texts), len(a)), dtype=np.uint32)
+    i = 0
+    while i < len(texts):
+        j, total = i, 0
+        while j < len(texts) and (j == i or total + lens[j] <= BLOCK):
+            total += lens[j]
+            j += 1
+        H = np.concatenate(sh[i:j])[:, None]
+        M = ((H * a + b) >> np.uint64(32)).astype(np.uint32)
+        starts = np.concatenate([[0], np.cumsum(lens[i:j - 1])])
+        sig[i:j] = np.minimum.reduceat(M, starts, axis=0)
+        i = j
+    return sig
+
+def _signature_batch(batch: Tuple[List[Tuple[int, bytes]], int, int]) -> Tuple[List, np.ndarray]:
+    lines, num_perm, seed = batch
+    a, b = perm_params(num_perm, seed)
+    ids, texts = [], []
+    for line_no, raw in lines:
+        conv = json.loads(raw)
+        ids.append(conv.get("id", line_no))
+        texts.append(conversation_text(conv))
+    return ids, minhash(texts, a, b)
+
+def _read_batches(path: Path, size: int, offsets: BinaryIO) -> Iterator[List[Tuple[int, bytes]]]:
+    """
+    Non-empty JSONL lines with their line numbers, in batches, writing
+    each line's byte offset to `offsets` as int64.
+    """
+    batch, pos, batch_offsets = [], 0, []
+    with open(path, "rb") as f:
+        for line_no, line in enumerate(f):
+            if line.strip():
+                batch_offsets.append(pos)
+                batch.append((line_no, line))
+                if len(batch) >= size:
+                    offsets.write(np.array(batch_offsets, dtype=np.int64).tobytes())
+                    yield batch
+                    batch, batch_offsets = [], []
+            pos += len(line)
+    if batch:
+        offsets.write(np.array(batch_offsets, dtype=np.int64).tobytes())
+        yield batch
+
+def compute_signatures(in_path: Path, out_dir: Path, num_perm: int = NUM_PERM, seed: int = 1,
+                       max_workers: int = None) -> int:
+    """
+    Stream the conversations once, MinHash them in worker batches, and
+    append signatures / offsets / ids to out_dir. Memory stays at a few
+    batches.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as exe, \
+            open(out_dir / "signatures.u32", "wb") as sig_out, \
+            open(out_dir / "offsets.i64", "wb") as off_out, \
+            open(out_dir / "ids.jsonl", "w") as id_out, \
+            tqdm(desc="MinHash", unit="conv") as bar:
+        batches = ((lines, num_perm, seed) for lines in _read_batches(in_path, BATCH, off_out))
+        for ids, sig in bounded_map(exe, _signature_batch, batches, max_pending=2 * (max_workers or os.cpu_count())):
+            sig_out.write(sig.tobytes())
+            id_out.writelines(json.dumps(i) + "\n" for i in ids)
+            n += len(ids)
+            bar.update(len(ids))
+    return n
+
+def load_signatures(out_dir: Path, n: int, num_perm: int = NUM_PERM) -> np.ndarray:
+    return np.memmap(out_dir / "signatures.u32", dtype=np.uint32, mode="r", shape=(n, num_perm))
+
+def _find(parent: np.ndarray, x: np.ndarray) -> np.ndarray:
+    while True:
+        p = parent[x]
+        if np.array_equal(p, x):
+            return x
+        x = p
+
+def _union(parent: np.ndarray, i: np.ndarray, j: np.ndarray):
+    """
+    Vectorized union: roots always point at their smallest member, so
+    every cluster ends up rooted at its first row.
+    """
+    while len(i):
+        ri, rj = _find(parent, i), _find(parent, j)
+        diff = ri != rj
+        i, j = ri[diff], rj[diff]
+        np.minimum.at(parent, np.maximum(i, j), np.minimum(i, j))
+
+def cluster(sig: np.ndarray, bands: int = BANDS, threshold: float = THRESHOLD) -> np.ndarray:
+    """
+    Representative row per row. For each band, rows whose band values are
+    identical are candidates; each is merged with its bucket's first row
+    when their signatures agree on at least `threshold` of positions.
+    """
+    n, num_perm = sig.shape
+    rows   = num_perm // bands
+    parent = np.arange(n, dtype=np.int64)
+    for band in tqdm(range(bands), desc="LSH bands"):
+        keys = np.empty(n, dtype=np.uint64)
+        for c in range(0, n, ROW_CHUNK):
+            block = np.asarray(sig[c:c + ROW_CHUNK, band * rows:(band + 1) * rows], dtype=np.uint64)
+            h = np.full(len(block), 14695981039346656037, dtype=np.uint64)
+            for col in range(rows):
+                h = (h ^ block[:, col]) * np.uint64(1099511628211)
+            keys[c:c + ROW_CHUNK] = h
+        order = np.argsort(keys, kind="stable")
+        sk    = keys[order]
+        run   = np.flatnonzero(np.r_[True, sk[1:] != sk[:-1]])
+        lead  = np.repeat(run, np.diff(np.r_[run, n]))
+        dup   = np.flatnonzero(lead != np.arange(n))
+        if not len(dup):
+            continue
+        i, j = order[dup], order[lead[dup]]
+        keep = np.zeros(len(i), dtype=bool)
+        for c in range(0, len(i), ROW_CHUNK // 8):
+            s = slice(c, c + ROW_CHUNK // 8)
+            keep[s] = (np.asarray(sig[i[s]]) == np.asarray(sig[j[s]])).mean(axis=1) >= threshold
+        _union(parent, i[keep], j[keep])
+        # pointer jumping keeps trees shallow for the next band
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    return parent
+
+def _iter_ids(out_dir: Path) -> Iterator[object]:
+    with open(out_dir / "ids.jsonl") as f:
+        for line in f:
+            yield json.loads(line)
+
+def _id_key(conv_id) -> int:
+    """
+    64-bit key of a conversation id, so ids can be matched through numpy
+    arrays instead of a dict (1 and "1" stay distinct).
+    """
+    return int.from_bytes(hashlib.blake2b(json.dumps(conv_id).encode(), digest_size=8).digest(), "little")
+
+def write_representatives(in_path: Path, out_dir: Path, clusters: np.ndarray) -> int:
+    """
+    Copy one line per cluster (its first conversation) with "count" set
+    to the cluster size and "id" to its row's id, ready for
+    src/classify.py.
+    """
+    offsets = np.memmap(out_dir / "offsets.i64", dtype=np.int64, mode="r")
+    is_rep  = clusters == np.arange(len(clusters))
+    sizes   = np.bincount(clusters, minlength=len(clusters))
+    with open(in_path, "rb") as f, open(out_dir / "representatives.jsonl", "w") as out:
+        for row, conv_id in enumerate(_iter_ids(out_dir)):
+            if not is_rep[row]:
+                continue
+            f.seek(int(offsets[row]))
+            conv = json.loads(f.readline())
+            conv["id"]    = conv_id
+            conv["count"] = int(sizes[row])
+            out.write(json.dumps(conv) + "\n")
+    return int(is_rep.sum())
+
+def dedup(in_path: Path, out_dir: Path = DEDUP_DIR, num_perm: int = NUM_PERM, bands: int = BANDS,
+          threshold: float = THRESHOLD, seed: int = 1, max_workers: int = None) -> Dict:
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    n = compute_signatures(in_path, out_dir, num_perm, seed, max_workers)
+    clusters = cluster(load_signatures(out_dir, n, num_perm), bands, threshold)
+    np.save(out_dir / "clusters.npy", clusters)
+    n_reps = write_representatives(in_path, out_dir, clusters)
+
+    meta = {
+        "input":           str(in_path),
+        "conversations":   n,
+        "clusters":        n_reps,
+        "num_perm":        num_perm,
+        "bands":           bands,
+        "shingle":         SHINGLE,
+        "threshold":       threshold,
+        "seed":            seed,
+    }
+    (out_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+    print(f"✔ {n} conversations → {n_reps} clusters ({1 - n_reps / max(n, 1):.1%} saved) → {out_dir}/representatives.jsonl")
+    return meta
+
+def expand(results_path: Path, out_dir: Path, out_path: Path) -> int:
+    """
+    Fan representative results back out: one line per original
+    conversation, carrying its representative's labels and a
+    "representative" id. (Metrics can use the "count" on each
+    representative result instead and skip this.)
+
+    Representatives are matched to results through sorted arrays of id
+    keys and result byte offsets, so memory is a few arrays of one entry
+    per row, not a dict of every result.
+    """
+    clusters = np.load(out_dir / "clusters.npy")
+    reps     = np.flatnonzero(clusters == np.arange(len(clusters)))
+    rep_keys = np.fromiter((_id_key(i) for row, i in enumerate(_iter_ids(out_dir)) if clusters[row] == row),
+                           dtype=np.uint64, count=len(reps))
+    by_key   = np.argsort(rep_keys, kind="stable")
+    sorted_keys = rep_keys[by_key]
+
+    # byte offset of the (last) result line per representative, -1 if none
+    result_at = np.full(len(reps), -1, dtype=np.int64)
+    with open(results_path, "rb") as f:
+        pos = 0
+        for line in f:
+            if line.strip():
+                key = np.uint64(_id_key(json.loads(line).get("id")))
+                k = np.searchsorted(sorted_keys, key)
+                if k < len(sorted_keys) and sorted_keys[k] == key:
+                    result_at[by_key[k]] = pos
+            pos += len(line)
+
+    written = 0
+    with open(results_path, "rb") as res, open(out_path, "w") as out:
+        for row, conv_id in enumerate(_iter_ids(out_dir)):
+            at = result_at[np.searchsorted(reps, clusters[row])]
+            if at < 0:
+                continue
+            res.seek(int(at))
+            r = json.loads(res.readline())
+            r = dict(r, id=conv_id, representative=r.get("id"))
+            r.pop("count", None)
+            out.write(json.dumps(r) + "\n")
+            written += 1
+    print(f"✔ Wrote {written} conversation results to {out_path}")
+    return written
+
+def main():
+    p = argparse.ArgumentParser(description="MinHash/LSH near-duplicate clustering of conversations")
+    p.add_argument("--dedup-dir", default=str(DEDUP_DIR))
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="cluster a conversations JSONL and write representatives.jsonl")
+    r.add_argument("conversations")
+    r.add_argument("--num-perm",  type=int,   default=NUM_PERM)
+    r.add_argument("--bands",     type=int,   default=BANDS)
+    r.add_argument("--threshold", type=float, default=THRESHOLD)
+    r.add_argument("--seed",      type=int,   default=1)
+    r.add_argument("--workers",   type=int,   default=None)
+
+    e = sub.add_parser("expand", help="fan classified representatives back out to every conversation")
+    e.add_argument("results", help="src/classify.py output for representatives.jsonl")
+    e.add_argument("--out",   default="outputs/classifications_all.jsonl")
+    args = p.parse_args()
+
+    out_dir = Path(args.dedup_dir)
+    if args.cmd == "run":
+        dedup(Path(args.conversations), out_dir, args.num_perm, args.bands, args.threshold, args.seed, args.workers)
+    else:
+        expand(Path(args.results), out_dir, Path(args.out))
+
+if __name__ == "__main__":
+    main()
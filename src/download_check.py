@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import gzip
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from src.downloader import CHUNK_SIZE, download_years
+
+# scenario → what the stand-in server answers to the n-th request for it
+#   flaky    503, then 429 (Retry-After: 0), then the ZIP
+#   resume   the ZIP cut off halfway, then the rest as a 206 to the Range request
+#   corrupt  200 with bytes that are not a ZIP, every time
+#   gzip     the ZIP sent with Content-Encoding: gzip (Content-Length counts gzip bytes)
+SCENARIOS = ("flaky", "resume", "corrupt", "gzip")
+ETAG = '"award-zip-1"'
+
+def sample_zip(awards: int = 50) -> bytes:
+    """
+    A valid year ZIP of award JSON files, stored uncompressed and padded
+    with random bytes to a few chunks, so a transfer cut off halfway has
+    already written whole chunks to the part file.
+    """
+    pad = max(1, 3 * CHUNK_SIZE // awards)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(awards):
+            zf.writestr(f"{2000000 + i}.json", b'{"awd_id": "%d", "pad": "%s"}' % (2000000 + i, os.urandom(pad).hex().encode()))
+    return buf.getvalue()
+
+class StandIn(ThreadingHTTPServer):
+    """
+    Local HTTP server playing the NSF download endpoint at
+    /{scenario}/{year}; records every request's path and headers.
+    """
+
+    def __init__(self, body: bytes):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.body = body
+        self.requests: Dict[str, List[Dict[str, str]]] = {s: [] for s in SCENARIOS}
+        self.lock = threading.Lock()
+
+    def url_template(self, scenario: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/{scenario}/{{year}}"
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str] = None, cut: int = None):
+        self.send_response(status)
+        for k, v in {"Content-Length": str(len(body)), "ETag": ETAG, **(headers or {})}.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body[:cut])  # HTTP/1.0: the connection closes after this
+
+    def do_GET(self):
+        server   = self.server
+        scenario = self.path.strip("/").split("/")[0]
+        with server.lock:
+            seen = server.requests.setdefault(scenario, [])
+            n = len(seen)
+            seen.append(dict(self.headers))
+        body = server.body
+
+        if scenario == "flaky" and n == 0:
+            self._send(503, b"busy")
+        elif scenario == "flaky" and n == 1:
+            self._send(429, b"slow down", {"Retry-After": "0"})
+        elif scenario == "resume" and n == 0:
+            self._send(200, body, cut=len(body) // 2)
+        elif scenario == "resume" and self.headers.get("Range") and self.headers.get("If-Range") == ETAG:
+            start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            self._send(206, body[start:], {"Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}"})
+        elif scenario == "corrupt":
+            self._send(200, b"PK\x03\x04" + b"\0" * 1000)
+        elif scenario == "gzip":
+            self._send(200, gzip.compress(body), {"Content-Encoding": "gzip"})
+        else:
+            self._send(200, body)
+
+def run_checks(max_retries: int = 3) -> Dict[str, str]:
+    """
+    Download one year per scenario from the stand-in server into a
+    temporary directory; returns {scenario: "" if as expected, else why not}.
+    """
+    body   = sample_zip()
+    server = StandIn(body)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    failures: Dict[str, str] = {}
+    try:
+        for scenario in SCENARIOS:
+            with tempfile.TemporaryDirectory() as tmp:
+                data_dir = Path(tmp)
+                result = download_years([2000], data_dir, url_template=server.url_template(scenario),
+                                        max_retries=max_retries, backoff_base=0.0)[2000]
+                failures[scenario] = CHECKS[scenario](result, data_dir, body, server.requests[scenario])
+    finally:
+        server.shutdown()
+        server.server_close()
+    return failures
+
+def _got_zip(result, data_dir: Path, body: bytes) -> str:
+    if isinstance(result, Exception):
+        return f"failed: {result!r}"
+    if result.read_bytes() != body:
+        return "downloaded bytes differ from the served ZIP"
+    if list(data_dir.glob("*.part*")):
+        return "part files left behind"
+    return ""
+
+def _check_flaky(result, data_dir, body, requests) -> str:
+    return _got_zip(result, data_dir, body) or ("" if len(requests) == 3 else f"{len(requests)} requests, expected 3")
+
+def _check_resume(result, data_dir, body, requests) -> str:
+    problem = _got_zip(result, data_dir, body)
+    if problem:
+        return problem
+    if len(requests) != 2:
+        return f"{len(requests)} requests, expected 2"
+    rng = requests[1].get("Range") or ""
+    start = int(rng[len("bytes="):].rstrip("-") or 0) if rng.startswith("bytes=") else 0
+    return "" if 0 < start <= len(body) // 2 else f"second request sent Range {rng!r}"
+
+def _check_corrupt(result, data_dir, body, requests) -> str:
+    if not isinstance(result, Exception):
+        return "corrupt ZIP was accepted"
+    if list(data_dir.iterdir()):
+        return f"left {[p.name for p in data_dir.iterdir()]}"
+    return "" if len(requests) > 1 else "corrupt ZIP was not retried"
+
+def _check_gzip(result, data_dir, body, requests) -> str:
+    return _got_zip(result, data_dir, body)
+
+CHECKS: Dict[str, Callable] = {
+    "flaky":   _check_flaky,
+    "resume":  _check_resume,
+    "corrupt": _check_corrupt,
+    "gzip":    _check_gzip,
+}
+
+def main():
+    p = argparse.ArgumentParser(description="Exercise the downloader against a local HTTP stand-in "
+                                            "(retries, Range resume, corrupt ZIPs, gzip transfer encoding)")
+    p.add_argument("--max-retries", type=int, default=3)
+    args = p.parse_args()
+
+    failures = run_checks(args.max_retries)
+    for scenario, problem in failures.items():
+        print(f"{'✘' if problem else '✔'} {scenario:<8} {problem}")
+    if any(failures.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
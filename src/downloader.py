@@ -1,18 +1,205 @@
-import requests
+import asyncio
+import json
+import os
+import zipfile
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Union
 
-def download_year(year: int, data_dir: Path) -> Path:
+import requests
+
+from src.http_client import (
+    RETRY_STATUSES,
+    TIMEOUT,
+    RetryableStatus,
+    backoff_delay,
+    make_session,
+)
+from src.sources import SHARD_SUFFIXES, shard_index_path
+
+NSF_URL = "https://www.nsf.gov/awardsearch/download?DownloadFileName={year}&All=true&isJson=true"
+
+CHUNK_SIZE  = 1024 * 1024
+MAX_RETRIES = 5
+
+def is_valid_zip(path: Path) -> bool:
     """
-    Downloads the NSF awards ZIP for a given year if not already present.
+    True if path parses as a ZIP: the end-of-central-directory record and
+    the central directory are intact. A truncated download fails this.
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            zf.infolist()
+        return True
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+def present_source(data_dir: Path, year: int) -> Optional[Path]:
+    """
+    The year's extracted folder or repacked shard, if there is one. Both
+    replace the ZIP they were made from, so the year is already present.
+    """
+    folder = data_dir / str(year)
+    if folder.is_dir():
+        return folder
+    for suffix in SHARD_SUFFIXES:
+        shard = data_dir / f"{year}{suffix}"
+        if shard.exists() and shard_index_path(shard).exists():
+            return shard
+    return None
+
+def _fetch_once(session: requests.Session, url: str, part: Path) -> None:
+    """
+    One HTTP attempt, resuming part if it already has bytes. The validator
+    from the first response (ETag / Last-Modified) is kept next to the part
+    file and sent as If-Range, so a changed file restarts from zero instead
+    of being spliced.
+    """
+    meta_path = part.with_name(part.name + ".json")
+    meta = {}
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text())
+        except ValueError:
+            meta = {}
+
+    have = part.stat().st_size if part.exists() else 0
+    headers = {}
+    validator = meta.get("etag") or meta.get("last_modified")
+    if have and validator:
+        headers["Range"]    = f"bytes={have}-"
+        headers["If-Range"] = validator
+
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as resp:
+        if resp.status_code == 416:
+            # nothing left to fetch: the part file already holds every byte
+            return
+        if resp.status_code in RETRY_STATUSES:
+            raise RetryableStatus(resp.status_code, resp.headers.get("Retry-After"))
+        resp.raise_for_status()
+
+        if resp.status_code == 206:
+            mode = "ab"
+        else:
+            mode = "wb"  # server ignored the range (or the file changed)
+            meta = {
+                "etag":          resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+            meta_path.write_text(json.dumps(meta))
+
+        with open(part, mode) as out:
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                out.write(chunk)
+
+        # with a Content-Encoding, Content-Length counts the encoded bytes,
+        # not the decoded ones written to part; the ZIP check still catches
+        # a truncated transfer
+        expected = resp.headers.get("Content-Length")
+        encoded  = resp.headers.get("Content-Encoding", "identity").lower() != "identity"
+        if expected is not None and not encoded:
+            got = part.stat().st_size - (have if mode == "ab" else 0)
+            if got != int(expected):
+                raise IOError(f"short read: {got} of {expected} bytes")
+
+async def download_year_async(
+    year: int,
+    data_dir: Path,
+    session: requests.Session,
+    semaphore: asyncio.Semaphore,
+    url_template: str = NSF_URL,
+    max_retries: int = MAX_RETRIES,
+    backoff_base: float = 1.0,
+) -> Path:
+    """
+    Download one year's ZIP into data_dir/{year}.zip, unless the year is
+    already there as a ZIP, an extracted folder or a repacked shard.
+
+    Bytes land in {year}.zip.part and resume with an HTTP Range request
+    after a failure; transient errors (timeouts, 429, 5xx) are retried with
+    exponential backoff. The ZIP is published with an atomic rename only
+    once its central directory validates, so {year}.zip is never truncated.
     """
-    url  = f"https://www.nsf.gov/awardsearch/download?DownloadFileName={year}&All=true&isJson=true"
     dest = data_dir / f"{year}.zip"
     if dest.exists():
-        return dest
-
-    resp = requests.get(url, stream=True)
-    resp.raise_for_status()
-    with open(dest, "wb") as out:
-        for chunk in resp.iter_content(chunk_size=1024*1024):
-            out.write(chunk)
-    return dest
+        if is_valid_zip(dest):
+            return dest
+        dest.unlink()  # truncated file from an older, non-atomic download
+    present = present_source(data_dir, year)
+    if present is not None:
+        return present
+
+    part = data_dir / f"{year}.zip.part"
+    meta = part.with_name(part.name + ".json")
+    url  = url_template.format(year=year)
+
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            try:
+                await asyncio.to_thread(_fetch_once, session, url, part)
+                if not is_valid_zip(part):
+                    # complete but corrupt: start over rather than resume
+                    part.unlink(missing_ok=True)
+                    meta.unlink(missing_ok=True)
+                    raise IOError(f"{part.name} is not a valid ZIP")
+                os.replace(part, dest)
+                meta.unlink(missing_ok=True)
+                return dest
+            except requests.HTTPError:
+                raise  # 4xx other than 429: retrying will not help
+            except (RetryableStatus, OSError) as e:
+                # OSError covers requests' connection / timeout / chunked
+                # errors as well as short reads and corrupt archives
+                if attempt == max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(
+                    attempt, base=backoff_base, retry_after=getattr(e, "retry_after", None)
+                ))
+
+async def download_years_async(
+    years: Iterable[int],
+    data_dir: Path,
+    concurrency: int = 5,
+    url_template: str = NSF_URL,
+    max_retries: int = MAX_RETRIES,
+    backoff_base: float = 1.0,
+    on_done: Optional[Callable[[int, Union[Path, Exception]], None]] = None,
+) -> Dict[int, Union[Path, Exception]]:
+    """
+    Download many years over one pooled session with at most `concurrency`
+    transfers in flight. Returns {year: Path or the exception it failed with}.
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    results: Dict[int, Union[Path, Exception]] = {}
+
+    with make_session(pool_size=concurrency) as session:
+        async def one(year: int):
+            try:
+                results[year] = await download_year_async(
+                    year, data_dir, session, semaphore,
+                    url_template=url_template,
+                    max_retries=max_retries,
+                    backoff_base=backoff_base,
+                )
+            except Exception as e:
+                results[year] = e
+            if on_done:
+                on_done(year, results[year])
+
+        await asyncio.gather(*(one(y) for y in years))
+    return results
+
+def download_years(years: Iterable[int], data_dir: Path, **kwargs) -> Dict[int, Union[Path, Exception]]:
+    """
+    Synchronous entry point for download_years_async.
+    """
+    return asyncio.run(download_years_async(years, data_dir, **kwargs))
+
+def download_year(year: int, data_dir: Path) -> Path:
+    """
+    Downloads the NSF awards ZIP for a given year if not already present.
+    """
+    result = download_years([year], data_dir, concurrency=1)[year]
+    if isinstance(result, Exception):
+        raise result
+    return result
@@ -1,38 +1,74 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import json
 import csv
 from pathlib import Path
+from typing import Dict, List
 from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
+from src.sources import AwardPath, award_year, find_sources, iter_award_paths
+from src.decode import EXPORT_FIELDS, make_decoder
+
 # Input & output locations
 DATA_DIR   = Path("data/awards")
 OUTPUT_DIR = Path("outputs")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-# Gather all award JSON files
-AWARD_FILES = list(DATA_DIR.rglob("*.json"))
 OUT_PATH    = OUTPUT_DIR / "awards.csv"
 
+# award list field → item keys kept per item, unjoined and unsanitized, for
+# exports that store lists as child rows (src/export_sqlite.py); they ride
+# along in a flattened row under CHILDREN, which the CSV / Parquet exports skip
+CHILD_LISTS = {
+    "pgm_ele":  ("pgm_ele_code", "pgm_ele_name"),
+    "pgm_ref":  ("pgm_ref_code", "pgm_ref_txt"),
+    "pi":       ("pi_full_name", "pi_role"),
+    "app_fund": ("fund_code", "fund_name"),
+    "oblg_fy":  ("fund_oblg_fiscal_yr", "fund_oblg_amt"),
+}
+CHILDREN = "_children"
+
+# institution sub-documents, flattened into one column per key
+INSTITUTIONS = ("inst", "perf_inst")
+
+def inst_column(prefix: str, key: str) -> str:
+    """
+    Column name of an institution sub-document key in a flattened row.
+    """
+    return f"{prefix}_{key}"
+
 def sanitize(s: str) -> str:
     """
     Remove newlines and collapse whitespace.
     """
     return " ".join(s.replace("\r", " ").replace("\n", " ").split())
 
-def flatten_award_file(json_path: Path) -> dict:
+def flatten_award_file(json_path: AwardPath) -> dict:
     """
-    Read one award JSON file and return a flat dict of values,
-    including a 'year' field from the parent folder name.
+    Read one award JSON (a file or a member of a year ZIP) and return a flat
+    dict of values, including a 'year' field from the folder or archive name.
     """
-    # 0) Year from folder
-    try:
-        year = int(json_path.parent.name)
-    except ValueError:
+    # 0) Year from folder / archive
+    year = award_year(json_path)
+    if year is None:
         year = ""
 
-    data = json.loads(json_path.read_text())
+    return flatten_award(make_decoder(EXPORT_FIELDS)(json_path.read_bytes()), year)
+
+def award_children(data: dict) -> Dict[str, List[tuple]]:
+    """
+    The raw (item key, ...) values of every CHILD_LISTS list in an award.
+    """
+    return {
+        field: [tuple(item.get(k) for k in keys) for item in data.get(field) or [] if isinstance(item, dict)]
+        for field, keys in CHILD_LISTS.items()
+    }
+
+def flatten_award(data: dict, year, children: bool = False) -> dict:
+    """
+    Flatten one decoded award document into a dict of CSV values
+    (plus the raw child lists under CHILDREN when children is set).
+    """
     out = {"year": year}
 
     # 1) Core award fields
@@ -73,11 +109,11 @@ def flatten_award_file(json_path: Path) -> dict:
     out["pi_roles"] = sanitize(";".join(proles))
 
     # 6) Institutions
-    for prefix in ("inst", "perf_inst"):
+    for prefix in INSTITUTIONS:
         sub = data.get(prefix) or {}
         for subk, subv in sub.items():
             val = subv or ""
-            out[f"{prefix}_{subk}"] = sanitize(str(val))
+            out[inst_column(prefix, subk)] = sanitize(str(val))
 
     # 7) Application funding
     afs = data.get("app_fund") or []
@@ -93,37 +129,67 @@ def flatten_award_file(json_path: Path) -> dict:
     out["oblg_fy_years"] = sanitize(";".join(years))
     out["oblg_fy_amts"]  = sanitize(";".join(amts))
 
+    if children:
+        out[CHILDREN] = award_children(data)
     return out
 
-def main():
-    if not AWARD_FILES:
-        print("No award JSON files found under data/awards/. Run extraction first.")
+class AwardCsvWriter:
+    """
+    Sequential awards.csv writer fed batches of flattened rows.
+    The header is taken from the first row written.
+    """
+
+    def __init__(self, out_path: Path = OUT_PATH):
+        self.out_path = out_path
+        self.rows     = 0
+        self._file    = None
+        self._writer  = None
+
+    def add(self, rows: list):
+        for row in rows:
+            if self._writer is None:
+                self.out_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.out_path.open("w", newline="", encoding="utf-8")
+                # Write CSV with all fields quoted
+                self._writer = csv.DictWriter(
+                    self._file,
+                    fieldnames=[k for k in row if k != CHILDREN],
+                    extrasaction="ignore",
+                    quoting=csv.QUOTE_ALL
+                )
+                self._writer.writeheader()
+            self._writer.writerow(row)
+            self.rows += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            print(f"✔ Wrote award‐level file to {self.out_path}")
+        else:
+            print("No awards found to export.")
+
+def flatten_source(source: Path) -> list:
+    """
+    Flatten every award in one year source (ZIP or extracted folder).
+    """
+    return [flatten_award_file(award) for award in iter_award_paths(source)]
+
+def main(data_dir: Path = DATA_DIR, out_path: Path = OUT_PATH):
+    sources = find_sources(data_dir)
+    if not sources:
+        print(f"No award JSON files or year ZIPs found under {data_dir}/.")
         return
 
-    # Build header from a sample
-    sample = flatten_award_file(AWARD_FILES[0])
-    fieldnames = list(sample.keys())
-
-    # Write CSV with all fields quoted
-    with OUT_PATH.open("w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(
-            csvfile,
-            fieldnames=fieldnames,
-            extrasaction="ignore",
-            quoting=csv.QUOTE_ALL
-        )
-        writer.writeheader()
-
-        # Parallel flatten + sequential write
-        with ProcessPoolExecutor() as exe:
-            for flat in tqdm(
-                exe.map(flatten_award_file, AWARD_FILES),
-                total=len(AWARD_FILES),
-                desc="Exporting awards"
-            ):
-                writer.writerow(flat)
-
-    print(f"✔ Wrote award‐level file to {OUT_PATH}")
+    # Parallel flatten (one year per task) + sequential write
+    writer = AwardCsvWriter(out_path)
+    with ProcessPoolExecutor() as exe:
+        for rows in tqdm(
+            exe.map(flatten_source, sources),
+            total=len(sources),
+            desc="Exporting awards"
+        ):
+            writer.add(rows)
+    writer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from src.export_awards import CHILDREN, inst_column
+
+# outputs/awards_parquet/
+#   year=2020/part-0.parquet   one file per year, split into row groups
+#   _common_metadata           union schema across every year
+OUT_DIR        = Path("outputs/awards_parquet")
+ROW_GROUP_SIZE = 64 * 1024
+
+AMOUNT_COLUMNS = {"tot_intn_awd_amt", "awd_amount", "awd_arra_amount"}
+DATE_COLUMNS   = {"awd_eff_date", "awd_exp_date", "awd_min_amd_letter_date", "awd_max_amd_letter_date"}
+# free text / near-unique values: plain strings; every other column is
+# low-cardinality and gets dictionary-encoded
+TEXT_COLUMNS   = {
+    "awd_id", "awd_titl_txt", "awd_abstract_narration", "po_phone", "po_email",
+    "pi_names", "pgm_ref_txts", "oblg_fy_years", "oblg_fy_amts",
+    *(inst_column("inst", k) for k in ("inst_street_address", "inst_street_address_2", "inst_zip_code", "inst_phone_num")),
+    *(inst_column("perf_inst", k) for k in ("perf_str_addr", "perf_zip_code")),
+}
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The Parquet export requires `pip install pyarrow`.")
+    return pyarrow
+
+def _to_amount(v) -> Optional[float]:
+    if v in ("", None):
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+def _to_date(v) -> Optional[date]:
+    if not v:
+        return None
+    v = str(v)
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(v[:10], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def _to_text(v) -> Optional[str]:
+    if v in ("", None):
+        return None
+    return v if isinstance(v, str) else str(v)
+
+def column_type(pa, name: str):
+    """
+    Arrow type for an awards.csv column name.
+    """
+    if name in AMOUNT_COLUMNS:
+        return pa.float64()
+    if name in DATE_COLUMNS:
+        return pa.date32()
+    if name in TEXT_COLUMNS:
+        return pa.string()
+    return pa.dictionary(pa.int32(), pa.string())
+
+class AwardParquetWriter:
+    """
+    Columnar counterpart of AwardCsvWriter, fed the same flattened rows.
+
+    Each add() batch is split by year and written as year=YYYY/part-N.parquet
+    with typed amounts / dates and dictionary-encoded categorical strings.
+    A file's columns are the union of the keys of its rows, and close()
+    records the union over all years in _common_metadata, so no column is
+    dropped just because the first award lacked it. Files are written into
+    a temporary directory that replaces out_dir on close.
+    """
+
+    def __init__(self, out_dir: Path = OUT_DIR, row_group_size: int = ROW_GROUP_SIZE):
+        self.pa             = _import_pyarrow()
+        self.out_dir        = Path(out_dir)
+        self.row_group_size = row_group_size
+        self.rows           = 0
+        self._tmp           = self.out_dir.with_name(self.out_dir.name + ".tmp")
+        self._schemas: List = []
+        self._parts: Dict[int, int] = {}
+        if self._tmp.exists():
+            shutil.rmtree(self._tmp)
+
+    def _table(self, rows: Sequence[dict]):
+        pa = self.pa
+        columns: Dict[str, None] = {}
+        for row in rows:
+            for k in row:
+                if k not in ("year", CHILDREN):
+                    columns.setdefault(k)
+
+        arrays, fields = [], []
+        for name in columns:
+            values = [row.get(name) for row in rows]
+            typ = column_type(pa, name)
+            if name in AMOUNT_COLUMNS:
+                arr = pa.array([_to_amount(v) for v in values], type=typ)
+            elif name in DATE_COLUMNS:
+                arr = pa.array([_to_date(v) for v in values], type=typ)
+            elif name in TEXT_COLUMNS:
+                arr = pa.array([_to_text(v) for v in values], type=typ)
+            else:
+                arr = pa.array([_to_text(v) for v in values], type=pa.string()).dictionary_encode()
+            arrays.append(arr)
+            fields.append(pa.field(name, typ))
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+    def add(self, rows: list):
+        by_year: Dict[int, List[dict]] = {}
+        for row in rows:
+            by_year.setdefault(int(row["year"]), []).append(row)
+
+        for year, year_rows in by_year.items():
+            table = self._table(year_rows)
+            n     = self._parts.get(year, 0)
+            self._parts[year] = n + 1
+            part_dir = self._tmp / f"year={year}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            self.pa.parquet.write_table(
+                table, part_dir / f"part-{n}.parquet",
+                row_group_size=self.row_group_size,
+                compression="zstd",
+            )
+            self._schemas.append(table.schema)
+            self.rows += len(year_rows)
+
+    def close(self):
+        if not self._schemas:
+            print("No awards found to export.")
+            return
+        pa = self.pa
+        union = pa.unify_schemas(self._schemas)
+        union = pa.schema([pa.field("year", pa.int16())] + list(union))
+        unknown = TEXT_COLUMNS - set(union.names)
+        if unknown:
+            print(f"[Warning] TEXT_COLUMNS not found in any exported row: {', '.join(sorted(unknown))}")
+        pa.parquet.write_metadata(union, self._tmp / "_common_metadata")
+
+        if self.out_dir.exists():
+            old = self.out_dir.with_name(self.out_dir.name + ".old")
+            if old.exists():
+                shutil.rmtree(old)
+            os.replace(self.out_dir, old)
+            os.replace(self._tmp, self.out_dir)
+            shutil.rmtree(old)
+        else:
+            os.replace(self._tmp, self.out_dir)
+        print(f"✔ Wrote {self.rows} awards ({len(union) - 1} columns) to {self.out_dir}/")
+
+def read_awards(out_dir: Path = OUT_DIR, columns: Optional[List[str]] = None, years: Optional[Sequence[int]] = None):
+    """
+    Load the partitioned export as one Arrow table against the union
+    schema, reading only the requested columns and year partitions.
+    """
+    pa = _import_pyarrow()
+    import pyarrow.dataset as ds
+
+    out_dir = Path(out_dir)
+    schema  = pa.parquet.read_schema(out_dir / "_common_metadata")
+    dataset = ds.dataset(
+        out_dir, schema=schema, format="parquet",
+        partitioning=ds.partitioning(pa.schema([schema.field("year")]), flavor="hive"),
+    )
+    filt = ds.field("year").isin(list(years)) if years is not None else None
+    return dataset.to_table(columns=columns, filter=filt)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from src.export_awards import CHILDREN
+from src.export_parquet import AMOUNT_COLUMNS, DATE_COLUMNS, _to_amount, _to_date
+
+# outputs/awards.sqlite
+#   awards              one row per award: id, year and every scalar awards.csv column
+#   program_elements    (award, pos, code, name)          ← pgm_ele  (pgm_ele_code, pgm_ele_name)
+#   program_references  (award, pos, code, text)          ← pgm_ref  (pgm_ref_code, pgm_ref_txt)
+#   pis                 (award, pos, name, role)          ← pi       (pi_full_name, pi_role)
+#   app_funds           (award, pos, code, name)          ← app_fund (fund_code, fund_name)
+#   obligations         (award, pos, fiscal_year, amount) ← oblg_fy  (fund_oblg_fiscal_yr, fund_oblg_amt)
+# Child rows point at awards.id; pos keeps the order of the award's list.
+# They are built from the raw lists (export_awards.CHILD_LISTS), not from
+# the sanitized ";"-joined awards.csv columns, which stay out of awards.
+OUT_PATH = Path("outputs/awards.sqlite")
+
+# child table → (award list field, ((column, SQL type), ...)); columns follow CHILD_LISTS' item keys
+CHILD_TABLES = {
+    "program_elements":   ("pgm_ele",  (("code", "TEXT"),           ("name", "TEXT"))),
+    "program_references": ("pgm_ref",  (("code", "TEXT"),           ("text", "TEXT"))),
+    "pis":                ("pi",       (("name", "TEXT"),           ("role", "TEXT"))),
+    "app_funds":          ("app_fund", (("code", "TEXT"),           ("name", "TEXT"))),
+    "obligations":        ("oblg_fy",  (("fiscal_year", "INTEGER"), ("amount", "REAL"))),
+}
+CHILD_SOURCES = {
+    "pgm_ele_codes", "pgm_ele_names", "pgm_ref_codes", "pgm_ref_txts", "pi_names", "pi_roles",
+    "app_fund_codes", "app_fund_names", "oblg_fy_years", "oblg_fy_amts", CHILDREN,
+}
+
+# built after the bulk load, which is much faster than maintaining them per insert;
+# name → (table, (column [COLLATE ...], ...)), skipped when a column never appeared
+INDEXES = {
+    "awards_year":            ("awards", ("year",)),
+    "awards_awd_id":          ("awards", ("awd_id",)),
+    "awards_dir":             ("awards", ("dir_abbr", "year")),
+    "awards_div":             ("awards", ("div_abbr", "year")),
+    "awards_inst":            ("awards", ("inst_inst_name COLLATE NOCASE", "year")),
+    "awards_state":           ("awards", ("inst_inst_state_code", "year")),
+    "program_elements_code":  ("program_elements", ("code", "award")),
+    "pis_name":               ("pis", ("name COLLATE NOCASE",)),
+    "obligations_year":       ("obligations", ("fiscal_year",)),
+    **{f"{t}_award": (t, ("award",)) for t in CHILD_TABLES},
+}
+
+def quote(name: str) -> str:
+    """
+    A column name as an SQLite identifier. Award keys come from the source
+    documents, so they are quoted rather than trusted.
+    """
+    if not isinstance(name, str) or not name or "\x00" in name:
+        raise ValueError(f"Unusable column name {name!r}")
+    return '"' + name.replace('"', '""') + '"'
+
+def _sql_type(name: str) -> str:
+    return "REAL" if name in AMOUNT_COLUMNS else "TEXT"
+
+def _scalar(name: str, v):
+    if v in ("", None):
+        return None
+    if name in AMOUNT_COLUMNS:
+        return _to_amount(v)
+    if name in DATE_COLUMNS:
+        d = _to_date(v)
+        return d.isoformat() if d else str(v)
+    return v if isinstance(v, (str, int, float)) else str(v)
+
+def _child_value(sql_type: str, v):
+    if v in ("", None):
+        return None
+    if sql_type == "INTEGER":
+        try:
+            return int(float(v))
+        except (TypeError, ValueError, OverflowError):
+            return None
+    if sql_type == "REAL":
+        return _to_amount(v)
+    return v if isinstance(v, str) else str(v)
+
+def split_children(row: dict) -> Dict[str, List[tuple]]:
+    """
+    (pos, value, value) tuples per child table from the row's raw child
+    lists (flatten_award(..., children=True)), one per list item.
+    """
+    lists = row.get(CHILDREN) or {}
+    out = {}
+    for table, (field, cols) in CHILD_TABLES.items():
+        out[table] = [(pos, *(_child_value(typ, v) for v, (_, typ) in zip(item, cols)))
+                      for pos, item in enumerate(lists.get(field) or [])]
+    return out
+
+class AwardSqliteWriter:
+    """
+    SQLite counterpart of AwardCsvWriter, fed the same flattened rows.
+
+    Each add() batch is one transaction of executemany() inserts into a
+    WAL-mode database written to a temporary file. New scalar columns are
+    added as they first appear (the union of all rows' keys, as in the
+    Parquet export). close() builds the B-tree indexes, runs ANALYZE and
+    moves the file over out_path. wants_children asks ingest for the raw
+    child lists with each row.
+    """
+    wants_children = True
+
+    def __init__(self, out_path: Path = OUT_PATH):
+        self.out_path = Path(out_path)
+        self.rows     = 0
+        self._tmp     = self.out_path.with_name(self.out_path.name + ".tmp")
+        self._columns: List[str] = []
+        self._next_id = 1
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        for p in (self._tmp, Path(f"{self._tmp}-wal"), Path(f"{self._tmp}-shm")):
+            p.unlink(missing_ok=True)
+
+        self.db = sqlite3.connect(self._tmp)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=OFF")  # a crashed load is thrown away anyway
+        self.db.execute("PRAGMA temp_store=MEMORY")
+        self.db.execute("PRAGMA cache_size=-262144")  # 256 MiB
+        self.db.execute("CREATE TABLE awards (id INTEGER PRIMARY KEY, year INTEGER)")
+        for table, cols in CHILD_TABLES.items():
+            defs = ", ".join(f"{name} {typ}" for name, typ in cols[1])
+            self.db.execute(f"CREATE TABLE {table} (award INTEGER NOT NULL REFERENCES awards(id), pos INTEGER, {defs})")
+
+    def _add_columns(self, rows: Sequence[dict]):
+        # SQLite column names are case-insensitive; a key differing from a
+        # known column only by case (or unusable as a name) is left out
+        known = {c.lower() for c in self._columns} | {"id", "year"} | {c.lower() for c in CHILD_SOURCES}
+        for row in rows:
+            for k in row:
+                if k in CHILD_SOURCES or not isinstance(k, str) or k.lower() in known:
+                    continue
+                try:
+                    name = quote(k)
+                except ValueError:
+                    continue
+                self.db.execute(f"ALTER TABLE awards ADD COLUMN {name} {_sql_type(k)}")
+                self._columns.append(k)
+                known.add(k.lower())
+
+    def add(self, rows: list):
+        if not rows:
+            return
+        with self.db:
+            self._add_columns(rows)
+            cols     = self._columns
+            awards   = []
+            children = {t: [] for t in CHILD_TABLES}
+            for row in rows:
+                award_id = self._next_id
+                self._next_id += 1
+                year = row.get("year")
+                awards.append((award_id, int(year) if year not in ("", None) else None,
+                               *(_scalar(c, row.get(c)) for c in cols)))
+                for table, items in split_children(row).items():
+                    children[table].extend((award_id, *item) for item in items)
+
+            names = ", ".join(["id", "year"] + [quote(c) for c in cols])
+            marks = ", ".join("?" * (len(cols) + 2))
+            self.db.executemany(f"INSERT INTO awards ({names}) VALUES ({marks})", awards)
+            for table, items in children.items():
+                marks = ", ".join("?" * (len(CHILD_TABLES[table][1]) + 2))
+                self.db.executemany(f"INSERT INTO {table} VALUES ({marks})", items)
+        self.rows += len(rows)
+
+    def close(self):
+        if not self.rows:
+            self.db.close()
+            self._tmp.unlink(missing_ok=True)
+            print("No awards found to export.")
+            return
+        with self.db:
+            for name, (table, cols) in INDEXES.items():
+                have = {r[1].lower() for r in self.db.execute(f"PRAGMA table_info({table})")}
+                if any(c.split()[0].lower() not in have for c in cols):
+                    continue  # e.g. no award had an inst_inst_state_code
+                defs = ", ".join(" ".join([quote(c.split()[0])] + c.split()[1:]) for c in cols)
+                self.db.execute(f"CREATE INDEX {name} ON {table} ({defs})")
+        self.db.execute("ANALYZE")
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.db.close()
+        for suffix in ("-wal", "-shm"):
+            Path(f"{self.out_path}{suffix}").unlink(missing_ok=True)
+        os.replace(self._tmp, self.out_path)
+        print(f"✔ Wrote {self.rows} awards ({len(self._columns) + 1} columns, {len(CHILD_TABLES)} child tables) to {self.out_path}")
+
+def connect(db_path: Path = OUT_PATH) -> sqlite3.Connection:
+    """
+    Read-only connection to a built catalog.
+    """
+    db = sqlite3.connect(f"file:{Path(db_path)}?mode=ro", uri=True)
+    db.row_factory = sqlite3.Row
+    return db
+
+def find_awards(
+    db: sqlite3.Connection,
+    institution: Optional[str] = None,
+    program: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    state: Optional[str] = None,
+    directorate: Optional[str] = None,
+    division: Optional[str] = None,
+    limit: Optional[int] = 100,
+) -> List[sqlite3.Row]:
+    """
+    Awards matching every given filter, newest first. Each filter maps to
+    one of the catalog's indexes; institution matching ignores case.
+    """
+    where, params = [], []
+    if institution:
+        where.append("a.inst_inst_name = ? COLLATE NOCASE")
+        params.append(institution)
+    if program:
+        where.append("a.id IN (SELECT award FROM program_elements WHERE code = ?)")
+        params.append(program)
+    if since is not None:
+        where.append("a.year >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("a.year <= ?")
+        params.append(until)
+    if state:
+        where.append("a.inst_inst_state_code = ?")
+        params.append(state)
+    if directorate:
+        where.append("a.dir_abbr = ?")
+        params.append(directorate)
+    if division:
+        where.append("a.div_abbr = ?")
+        params.append(division)
+
+    sql = "SELECT a.year, a.awd_id, a.awd_titl_txt, a.awd_amount, a.dir_abbr, a.div_abbr, " \
+          "a.inst_inst_name, a.inst_inst_state_code FROM awards a"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY a.year DESC, a.awd_id"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return db.execute(sql, params).fetchall()
+
+def main():
+    p = argparse.ArgumentParser(description="Query the award catalog built by --export-format sqlite")
+    p.add_argument("--db", default=str(OUT_PATH))
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    f = sub.add_parser("find", help="awards by institution / program code / years / state / directorate / division")
+    f.add_argument("--institution")
+    f.add_argument("--program",     help="pgm_ele_code, e.g. 1253")
+    f.add_argument("--since",       type=int)
+    f.add_argument("--until",       type=int)
+    f.add_argument("--state",       help="institution state code, e.g. CA")
+    f.add_argument("--directorate", help="dir_abbr, e.g. GEO")
+    f.add_argument("--division",    help="div_abbr, e.g. OCE")
+    f.add_argument("--limit",       type=int, default=50)
+
+    s = sub.add_parser("sql", help="run a read-only SQL statement")
+    s.add_argument("statement")
+    args = p.parse_args()
+
+    db = connect(Path(args.db))
+    t0 = time.perf_counter()
+    if args.cmd == "find":
+        rows = find_awards(db, args.institution, args.program, args.since, args.until,
+                           args.state, args.directorate, args.division, args.limit)
+    else:
+        rows = db.execute(args.statement).fetchall()
+    ms = (time.perf_counter() - t0) * 1000
+    if rows:
+        print("\t".join(rows[0].keys()))
+    for r in rows:
+        print("\t".join("" if v is None else str(v) for v in r))
+    print(f"{len(rows)} rows in {ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "ai-scientific-index/1.0 (+https://github.com/ZizoBahnasy/ai-scientific-index)"
+TIMEOUT    = (10, 60)  # (connect, read) seconds
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def make_session(pool_size: int = 8) -> requests.Session:
+    """
+    A requests.Session whose connection pool is large enough for pool_size
+    concurrent requests to the same host, so keep-alive connections are
+    reused instead of opening a fresh one per request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0, retry_after: Optional[str] = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based): the server's
+    Retry-After if it sent one, else exponential backoff with full jitter.
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), cap)
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class RetryableStatus(Exception):
+    """
+    An HTTP status from RETRY_STATUSES, carrying Retry-After if present.
+    """
+
+    def __init__(self, status: int, retry_after: Optional[str] = None):
+        super().__init__(f"HTTP {status}")
+        self.status      = status
+        self.retry_after = retry_after
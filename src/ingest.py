@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from tqdm import tqdm
+
+import numpy as np
+
+from src.sources import award_fingerprint, find_sources, iter_award_paths, source_year
+from src.parse_cache import load_year_cache, save_year_cache
+from src.parser import parse_award_data
+from src.decode import fields_for, make_decoder
+from src.records import RecordStore
+from src.export_awards import flatten_award
+
+def ingest_source(
+    source: Path,
+    with_records: bool = True,
+    with_rows: bool = True,
+    cache_dir: Optional[Path] = None,
+    with_children: bool = False,
+) -> Tuple[RecordStore, List[dict], Dict[str, int]]:
+    """
+    Decode every award in one year source exactly once and return
+    (parse records as a RecordStore, flattened CSV rows, cache stats).
+    with_children adds each award's raw child lists to its row (see
+    export_awards.flatten_award).
+
+    With a cache_dir, awards whose fingerprint matches the year's parse
+    cache take their records from the cache and are only decoded (for the
+    export fields alone) when CSV rows are wanted; the cache is rewritten
+    whenever anything changed.
+    """
+    year = source_year(source)
+    use_cache = cache_dir is not None and with_records
+    cached = load_year_cache(cache_dir, year) if use_cache else None
+
+    fresh = RecordStore()
+    rows: List[dict] = []
+    members: List[str] = []
+    offsets = [0]
+    take: List[np.ndarray] = []  # row indices into (cached rows ++ fresh rows)
+    base = len(cached.store) if cached else 0
+    hits = misses = 0
+    errors = skipped = 0  # undecodable awards + malformed obligations / awards yielding no records
+    parse_stats: Dict[str, int] = {}
+    # decode only the fields the requested outputs read
+    decode = make_decoder(fields_for(with_records, with_rows))
+    decode_row = make_decoder(fields_for(False, True))  # cache hits only need the export
+
+    for award in iter_award_paths(source):
+        key = award_fingerprint(award) if use_cache else None
+        hit = cached.lookup(key) if cached else None
+        if hit is not None:
+            start, end = hit
+            take.append(np.arange(start, end))
+            hits += 1
+            if with_rows:
+                try:
+                    rows.append(flatten_award(decode_row(award.read_bytes()), year, with_children))
+                except Exception:
+                    errors += 1
+        else:
+            before = len(fresh)
+            try:
+                data = decode(award.read_bytes())
+            except Exception:
+                data = None
+            if data is not None:
+                if with_records:
+                    recs = parse_award_data(data, year, parse_stats)
+                    if recs:
+                        fresh.extend(recs)
+                if with_rows:
+                    rows.append(flatten_award(data, year, with_children))
+            else:
+                errors += 1
+            take.append(np.arange(base + before, base + len(fresh)))
+            misses += 1
+        if with_records and not len(take[-1]):
+            skipped += 1
+        if use_cache:
+            members.append(key)
+            offsets.append(offsets[-1] + len(take[-1]))
+
+    if cached is None:
+        records = fresh
+    elif not misses and members == cached.members:
+        records = cached.store
+    else:
+        combined = cached.store.take(np.arange(base))
+        combined.merge(fresh)
+        records = combined.take(np.concatenate(take) if take else np.zeros(0, dtype=np.int64))
+
+    if use_cache and (misses or cached is None or members != cached.members):
+        save_year_cache(cache_dir, year, records, members, offsets)
+
+    stats = {
+        "hits":    hits,
+        "misses":  misses if use_cache else 0,
+        "awards":  len(take),
+        "errors":  errors + parse_stats.get("bad_obligations", 0),
+        "skipped": skipped,
+        "bytes":   source.stat().st_size if source.is_file() else sum(
+            f.stat().st_size for f in source.rglob("*.json")),
+    }
+    return records, rows, stats
+
+def aggregate_source(
+    source: Path,
+    sink_types: Sequence[type],
+    with_rows: bool = True,
+    cache_dir: Optional[Path] = None,
+    with_children: bool = False,
+) -> Tuple[list, List[dict], Dict[str, int]]:
+    """
+    Map-side variant of ingest_source: feed the year's records into fresh
+    sinks of the given types inside the worker and return those partial
+    sinks (small per-(node, year) tables and abbreviation maps) instead of
+    the records themselves.
+    """
+    records, rows, stats = ingest_source(source, True, with_rows, cache_dir, with_children)
+    partials = []
+    for sink_type in sink_types:
+        part = sink_type()
+        part.add(records)
+        partials.append(part)
+    stats["records"] = len(records)
+    return partials, rows, stats
+
+def profiled_call(fn, profile_dir: Path, item):
+    """
+    Run fn(item) under cProfile inside a worker and dump the stats to
+    profile_dir/{pid}-{n}.prof, so worker time shows up in --profile runs.
+    """
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(item)
+    finally:
+        profiler.disable()
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        n = len(list(profile_dir.glob(f"{os.getpid()}-*.prof")))
+        profiler.dump_stats(profile_dir / f"{os.getpid()}-{n}.prof")
+
+def merge_profiles(profile_dir: Path, out_prefix: Path):
+    """
+    Combine every worker .prof under profile_dir into {out_prefix}.prof
+    and a top-40 cumulative {out_prefix}.txt, then drop the parts.
+    """
+    import io
+    import pstats
+    parts = sorted(profile_dir.glob("*.prof"))
+    if not parts:
+        return
+    stats = pstats.Stats(str(parts[0]))
+    for part in parts[1:]:
+        stats.add(str(part))
+    stats.dump_stats(out_prefix.with_suffix(".prof"))
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(40)
+    out_prefix.with_suffix(".txt").write_text(out.getvalue())
+    for part in parts:
+        part.unlink()
+    profile_dir.rmdir()
+
+def bounded_map(exe, fn, items: Sequence, max_pending: int):
+    """
+    Like exe.map, but keeps at most max_pending tasks in flight so finished
+    results never pile up faster than the caller consumes them.
+    """
+    pending = deque()
+    it = iter(items)
+    for item in it:
+        pending.append(exe.submit(fn, item))
+        if len(pending) >= max_pending:
+            break
+    while pending:
+        yield pending.popleft().result()
+        for item in it:
+            pending.append(exe.submit(fn, item))
+            break
+
+def ingest(
+    data_dir: Path,
+    record_sinks: Sequence = (),
+    row_sinks: Sequence = (),
+    max_workers: int = None,
+    cache_dir: Optional[Path] = None,
+    map_side: bool = True,
+    report: Optional[Dict[str, int]] = None,
+    profile_dir: Optional[Path] = None,
+    on_partials: Optional[Callable[[Path, list], None]] = None,
+) -> int:
+    """
+    Single streaming pass over every year source under data_dir.
+    Each award is decoded once in a worker; per-year RecordStores of parse
+    records go to every record sink (e.g. MapBuilder, HierarchyBuilder)
+    and flattened rows to every row sink (e.g. AwardCsvWriter) via .add().
+    At most ~2 years per worker are held in memory at a time.
+    With a cache_dir, unchanged awards are served from the parse cache
+    (see src/parse_cache.py) and hit/miss counts are reported.
+    With map_side (the default) and sinks that support merge(), each worker
+    aggregates its year into partial sinks and only those small partials
+    cross the process boundary; the parent just merges them.
+    If a report dict is given it is filled with per-run counters (awards,
+    records, undecodable awards, awards without records, bytes read,
+    cache hits / misses) for the run report. With a profile_dir, every
+    worker task runs under cProfile and the merged stats are written to
+    {profile_dir}/ingest_workers.prof / .txt. In map-side mode,
+    on_partials(source, partial sinks) is called for every year before the
+    partials are merged (e.g. to save per-year snapshots).
+    Returns the number of parse records seen.
+    """
+    sources = find_sources(data_dir)
+    print(f"Found {len(sources)} award years to ingest.")
+
+    map_side = map_side and bool(record_sinks) and all(hasattr(s, "merge") for s in record_sinks)
+    with_children = any(getattr(s, "wants_children", False) for s in row_sinks)
+    if map_side:
+        work = partial(
+            aggregate_source,
+            sink_types=[type(s) for s in record_sinks],
+            with_rows=bool(row_sinks),
+            cache_dir=cache_dir,
+            with_children=with_children,
+        )
+    else:
+        work = partial(
+            ingest_source,
+            with_records=bool(record_sinks),
+            with_rows=bool(row_sinks),
+            cache_dir=cache_dir,
+            with_children=with_children,
+        )
+    if profile_dir is not None:
+        parts_dir = profile_dir / "ingest_workers.parts"
+        work = partial(profiled_call, work, parts_dir)
+    max_pending = 2 * (max_workers or os.cpu_count() or 1)
+    n_records = 0
+    totals = {"hits": 0, "misses": 0, "awards": 0, "errors": 0, "skipped": 0, "bytes": 0}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as exe:
+        for source, (payload, rows, stats) in zip(sources, tqdm(
+            bounded_map(exe, work, sources, max_pending),
+            total=len(sources),
+            desc="Ingesting awards"
+        )):
+            for k in totals:
+                totals[k] += stats[k]
+            if map_side:
+                n_records += stats["records"]
+                if on_partials is not None:
+                    on_partials(source, payload)
+                for sink, part in zip(record_sinks, payload):
+                    sink.merge(part)
+            else:
+                n_records += len(payload)
+                for sink in record_sinks:
+                    sink.add(payload)
+            for sink in row_sinks:
+                sink.add(rows)
+
+    print(f"Ingested {n_records} award‐level records.")
+    if profile_dir is not None:
+        merge_profiles(parts_dir, profile_dir / "ingest_workers")
+    if cache_dir is not None and record_sinks:
+        print(f"Parse cache: {totals['hits']} hits, {totals['misses']} misses ({cache_dir})")
+    if totals["errors"]:
+        print(f"[Warning] {totals['errors']} award files could not be decoded or had malformed obligations")
+    if report is not None:
+        report.update({
+            "items":        totals["awards"],
+            "records":      n_records,
+            "errors":       totals["errors"],
+            "skipped":      totals["skipped"],
+            "bytes_read":   totals["bytes"],
+            "cache_hits":   totals["hits"],
+            "cache_misses": totals["misses"],
+            "workers":      max_workers or os.cpu_count(),
+        })
+    return n_records
@@ -4,9 +4,108 @@
 import json
 import csv
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any
 from tqdm import tqdm
 
+from src.records import RecordStore
+
+# Office of the Director combos, injected so mission scraping works uniformly
+SPECIAL_OD = [
+    ("OD", "EOD"),  # Executive Office of the Director
+    ("OD", "OCR"),  # Office of Civil Rights
+    ("OD", "OIA"),  # Office of Integrative Activities
+    ("OD", "OISE"), # Office of International Science and Engineering
+    ("OD", "OLPA"), # Office of Legislative and Public Affairs
+    ("OD", "OGC"),  # Office of the General Counsel
+    ("OD", "CRSP")  # Office of the Chief of Research Security Strategy and Policy
+]
+
+class MapBuilder:
+    """
+    Incremental version of build_maps: feed it batches of parsed records
+    with add(), then write() the maps and URL list once at the end.
+    """
+
+    def __init__(self):
+        self.dir_map: Dict[str,str] = {}
+        self.div_map: Dict[str,str] = {}
+        self.prog_map: Dict[str,str] = {}
+        self.combos = set()  # (dir_abbr, div_abbr)
+
+    def add(self, records: Iterable[Dict[str, Any]]):
+        if isinstance(records, RecordStore):
+            self._add_store(records)
+            return
+
+        # 1) Gather maps & raw combos
+        for r in records:
+            raw_d = r["dir_abbr"].strip()
+            d_abbr = raw_d.replace("/", "")  # clean O/D→OD
+            d_long = r["directorate"].strip()
+            v_abbr = r["div_abbr"].strip()
+            v_long = r["division"].strip()
+            p_name = r["program"].strip()
+            p_code = r["pgm_code"].strip()
+
+            self.dir_map[d_long]  = d_abbr
+            self.div_map[v_long]  = v_abbr
+            self.prog_map[p_name] = p_code
+
+            # only keep combos where dir_abbr != div_abbr
+            if d_abbr != v_abbr:
+                self.combos.add((d_abbr, v_abbr))
+
+    def _add_store(self, store: RecordStore):
+        """
+        Same result as add() over every record, but computed per distinct
+        value: the last record seen decides each map entry.
+        """
+        for d_long, raw_d in store.last_values("directorate", "dir_abbr").items():
+            self.dir_map[d_long.strip()] = raw_d.strip().replace("/", "")
+        for v_long, v_abbr in store.last_values("division", "div_abbr").items():
+            self.div_map[v_long.strip()] = v_abbr.strip()
+        for p_name, p_code in store.last_values("program", "pgm_code").items():
+            self.prog_map[p_name.strip()] = p_code.strip()
+
+        for raw_d, v_abbr in store.distinct(("dir_abbr", "div_abbr")):
+            d_abbr, v_abbr = raw_d.strip().replace("/", ""), v_abbr.strip()
+            if d_abbr != v_abbr:
+                self.combos.add((d_abbr, v_abbr))
+
+    def merge(self, other: "MapBuilder"):
+        """
+        Fold in a partial builder; later partials win, as later records do.
+        """
+        self.dir_map.update(other.dir_map)
+        self.div_map.update(other.div_map)
+        self.prog_map.update(other.prog_map)
+        self.combos |= other.combos
+
+    def write(self, output_dir: str = "outputs"):
+        out = Path(output_dir); out.mkdir(parents=True, exist_ok=True)
+
+        # 2) Override OD combos: remove any previously added OD combos
+        #    and add our canonical OD list
+        combos = {(d,v) for (d,v) in self.combos if d != "OD"}
+        combos.update(SPECIAL_OD)
+
+        # 3) Write maps
+        for fname, mp in [
+            ("directorate_map.json", self.dir_map),
+            ("division_map.json",    self.div_map),
+            ("program_map.json",     self.prog_map),
+        ]:
+            with (out / fname).open("w") as f:
+                json.dump(mp, f, indent=2)
+            print(f"✔ Wrote {fname}")
+
+        # 4) Write URLs
+        url_file = out / "division_urls.txt"
+        with url_file.open("w") as f:
+            for d_abbr, v_abbr in sorted(combos):
+                f.write(f"https://www.nsf.gov/{d_abbr}/{v_abbr}\n")
+        print(f"✔ Wrote division_urls.txt")
+
 def build_maps(records: List[Dict[str, Any]], output_dir: str = "outputs"):
     """
     From parsed records (with dir_abbr, directorate, div_abbr, division,
@@ -20,59 +119,9 @@ def build_maps(records: List[Dict[str, Any]], output_dir: str = "outputs"):
       * skips abbr==abbr combos
       * uses hard-coded OD divisions
     """
-    out = Path(output_dir); out.mkdir(parents=True, exist_ok=True)
-
-    dir_map: Dict[str,str] = {}
-    div_map: Dict[str,str] = {}
-    prog_map: Dict[str,str] = {}
-    combos = set()  # (dir_abbr, div_abbr)
-
-    # 1) Gather maps & raw combos
-    for r in tqdm(records, desc="Building abbreviation maps"):
-        raw_d = r["dir_abbr"].strip()
-        d_abbr = raw_d.replace("/", "")  # clean O/D→OD
-        d_long = r["directorate"].strip()
-        v_abbr = r["div_abbr"].strip()
-        v_long = r["division"].strip()
-        p_name = r["program"].strip()
-        p_code = r["pgm_code"].strip()
-
-        dir_map[d_long]  = d_abbr
-        div_map[v_long]  = v_abbr
-        prog_map[p_name] = p_code
-
-        # only keep combos where dir_abbr != div_abbr
-        if d_abbr != v_abbr:
-            combos.add((d_abbr, v_abbr))
-
-    # 2) Override OD combos
-    special_od = [
-        ("OD", "EOD"),  # Executive Office of the Director
-        ("OD", "OCR"),  # Office of Civil Rights
-        ("OD", "OIA"),  # Office of Integrative Activities
-        ("OD", "OISE"), # Office of International Science and Engineering
-        ("OD", "OLPA"), # Office of Legislative and Public Affairs
-        ("OD", "OGC"),  # Office of the General Counsel
-        ("OD", "CRSP")  # Office of the Chief of Research Security Strategy and Policy
-    ]
-    # remove any previously added OD combos
-    combos = {(d,v) for (d,v) in combos if d != "OD"}
-    # add our canonical OD list
-    combos.update(special_od)
-
-    # 3) Write maps
-    for fname, mp in [
-        ("directorate_map.json", dir_map),
-        ("division_map.json",    div_map),
-        ("program_map.json",     prog_map),
-    ]:
-        with (out / fname).open("w") as f:
-            json.dump(mp, f, indent=2)
-        print(f"✔ Wrote {fname}")
-
-    # 4) Write URLs
-    url_file = out / "division_urls.txt"
-    with url_file.open("w") as f:
-        for d_abbr, v_abbr in sorted(combos):
-            f.write(f"https://www.nsf.gov/{d_abbr}/{v_abbr}\n")
-    print(f"✔ Wrote division_urls.txt")
+    builder = MapBuilder()
+    if isinstance(records, RecordStore):
+        builder.add(records)
+    else:
+        builder.add(tqdm(records, desc="Building abbreviation maps"))
+    builder.write(output_dir)
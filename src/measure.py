@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_bytes() -> int:
+    """
+    Current resident set size of this process. Reads /proc/self/statm on
+    Linux; elsewhere falls back to the lifetime peak from getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return max_rss_bytes()
+
+def max_rss_bytes(who: int = resource.RUSAGE_SELF) -> int:
+    """
+    Lifetime peak RSS from getrusage (KiB on Linux, bytes on macOS).
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def cpu_seconds() -> float:
+    """
+    User + system CPU of this process and of its reaped children
+    (worker pools count once they have shut down).
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + kids.ru_utime + kids.ru_stime
+
+class Measure:
+    """
+    Context manager recording wall time, CPU time and peak RSS of a block.
+
+    Peak RSS is sampled by a background thread every `interval` seconds,
+    so it is the peak *during* the block rather than the process lifetime
+    peak that getrusage reports.
+
+        with Measure() as m:
+            work()
+        m.result()  # {"wall_s": ..., "cpu_s": ..., "peak_rss_mb": ..., ...}
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.wall     = 0.0
+        self.cpu      = 0.0
+        self.rss0     = 0
+        self.peak     = 0
+        self._stop    = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self) -> "Measure":
+        self.rss0 = self.peak = rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._cpu0  = cpu_seconds()
+        self._wall0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._wall0
+        self.cpu  = cpu_seconds() - self._cpu0
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+        return False
+
+    def result(self) -> Dict[str, float]:
+        return {
+            "wall_s":         round(self.wall, 4),
+            "cpu_s":          round(self.cpu, 4),
+            "peak_rss_mb":    round(self.peak / 2**20, 1),
+            "rss_growth_mb":  round((self.peak - self.rss0) / 2**20, 1),
+        }
@@ -2,12 +2,102 @@
 # -*- coding: utf-8 -*-
 
 import json
+import hashlib
+import argparse
 import requests
 from bs4 import BeautifulSoup
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
 from tqdm import tqdm
 
-def scrape_missions(output_dir: str = "outputs"):
+from src.http_client import make_session
+
+CACHE_DIR   = Path("data/cache/html")
+CONCURRENCY = 8
+
+def parse_mission(html: str) -> Optional[str]:
+    """
+    Extract the mission statement text from a division page, or None.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    div = soup.find("div",
+        class_="clearfix text-formatted field field-org-msn-statement"
+    )
+    if not div:
+        return None
+
+    parts = []
+    for el in div.find_all(["p", "li"]):
+        text = el.get_text(" ", strip=True)
+        if text:
+            parts.append(text)
+    return " ".join(parts)
+
+class PageCache:
+    """
+    On-disk HTML cache: {sha1(url)}.html plus a .json sidecar with the
+    URL, its ETag / Last-Modified validators and the mission parsed from
+    that body (so a 304 needs no re-parse).
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.dir = cache_dir
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return self.dir / f"{key}.html", self.dir / f"{key}.json"
+
+    def get(self, url: str) -> Tuple[Optional[str], Dict]:
+        html_path, meta_path = self._paths(url)
+        if not html_path.exists() or not meta_path.exists():
+            return None, {}
+        try:
+            return html_path.read_text(encoding="utf-8"), json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None, {}
+
+    def put(self, url: str, html: Optional[str], meta: Dict):
+        html_path, meta_path = self._paths(url)
+        if html is not None:
+            html_path.write_text(html, encoding="utf-8")
+        meta_path.write_text(json.dumps(dict(meta, url=url)))
+
+def fetch(session: requests.Session, cache: PageCache, url: str) -> Tuple[Optional[str], Dict, bool]:
+    """
+    Conditional GET for one URL. Returns (html, meta, changed):
+    a 304 yields the cached body with changed=False; failures yield
+    the cached body if there is one, else html=None.
+    """
+    cached_html, meta = cache.get(url)
+    headers = {}
+    if cached_html is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        res = session.get(url, headers=headers, timeout=10)
+        if res.status_code == 304 and cached_html is not None:
+            return cached_html, meta, False
+        res.raise_for_status()
+    except Exception:
+        return cached_html, meta, False
+
+    meta = {
+        "etag":          res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+    }
+    return res.text, meta, True
+
+def scrape_missions(
+    output_dir: str = "outputs",
+    cache_dir: Path = CACHE_DIR,
+    concurrency: int = CONCURRENCY,
+    parse_workers: int = None,
+):
     out = Path(output_dir)
     div_map_path = out / "division_map.json"
     url_path     = out / "division_urls.txt"
@@ -31,27 +121,36 @@ def scrape_missions(output_dir: str = "outputs"):
         raise FileNotFoundError(f"{url_path} not found: run mappings first.")
     urls = [u.strip() for u in url_path.read_text().splitlines() if u.strip()]
 
-    missions = {}
-    for url in tqdm(urls, desc="Scraping missions"):
-        try:
-            res = requests.get(url, timeout=10)
-            res.raise_for_status()
-        except Exception:
-            continue
+    # 1) Fetch concurrently over one pooled session; unchanged pages cost a 304
+    cache = PageCache(Path(cache_dir))
+    with make_session(pool_size=concurrency) as session, \
+         ThreadPoolExecutor(max_workers=concurrency) as exe:
+        pages = list(tqdm(
+            exe.map(lambda u: fetch(session, cache, u), urls),
+            total=len(urls),
+            desc="Scraping missions"
+        ))
 
-        soup = BeautifulSoup(res.text, "html.parser")
-        div = soup.find("div",
-            class_="clearfix text-formatted field field-org-msn-statement"
-        )
-        if not div:
-            continue
+    # 2) Parse only new / changed bodies, in a worker pool
+    changed = [
+        i for i, (html, meta, fresh) in enumerate(pages)
+        if html is not None and (fresh or "mission" not in meta)
+    ]
+    if changed:
+        with ProcessPoolExecutor(max_workers=parse_workers) as exe:
+            parsed = list(exe.map(parse_mission, [pages[i][0] for i in changed]))
+        for i, mission in zip(changed, parsed):
+            html, meta, _ = pages[i]
+            meta = dict(meta, mission=mission)
+            cache.put(urls[i], html, meta)
+            pages[i] = (html, meta, True)
+    print(f"Mission pages: {len(urls) - len(changed)} unchanged, {len(changed)} parsed")
 
-        parts = []
-        for el in div.find_all(["p", "li"]):
-            text = el.get_text(" ", strip=True)
-            if text:
-                parts.append(text)
-        mission = " ".join(parts)
+    missions = {}
+    for url, (html, meta, _) in zip(urls, pages):
+        mission = meta.get("mission")
+        if html is None or not mission:
+            continue
 
         # Extract division abbr from URL
         parts = url.rstrip("/").split("/")
@@ -77,5 +176,20 @@ def scrape_missions(output_dir: str = "outputs"):
         json.dump(new_map, f, indent=2)
     print("✔ Updated division_map.json with mission statements")
 
+    return {
+        "items":   len(urls),
+        "parsed":  len(changed),
+        "errors":  sum(1 for html, _, _ in pages if html is None),
+        "workers": concurrency,
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="Scrape NSF division mission statements")
+    p.add_argument("--output-dir",  default="outputs")
+    p.add_argument("--cache-dir",   default=str(CACHE_DIR))
+    p.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = p.parse_args()
+    scrape_missions(args.output_dir, Path(args.cache_dir), args.concurrency)
+
 if __name__ == "__main__":
-    scrape_missions()
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src import decode, parser, records
+from src.records import RecordStore
+
+# Bump when the on-disk layout below changes
+CACHE_FORMAT = "parse-cache-v1"
+
+@lru_cache(maxsize=None)
+def parser_fingerprint() -> str:
+    """
+    Hash of the cache format and the decoder / parser / record-store source code,
+    so any change to parsing logic invalidates every cached year.
+    """
+    h = hashlib.sha256(CACHE_FORMAT.encode())
+    for mod in (decode, parser, records):
+        h.update(Path(mod.__file__).read_bytes())
+    return h.hexdigest()
+
+class YearCache:
+    """
+    Parse results for one year: a RecordStore plus, for every award member,
+    its fingerprint and the slice of store rows it produced.
+    """
+
+    def __init__(self, store: RecordStore, members: List[str], offsets: np.ndarray):
+        self.store   = store
+        self.members = members
+        self.offsets = offsets
+        self._slots  = {key: i for i, key in enumerate(members)}
+
+    def lookup(self, key: str) -> Optional[Tuple[int, int]]:
+        """
+        (start, end) rows for an award fingerprint, or None on a miss.
+        """
+        i = self._slots.get(key)
+        if i is None:
+            return None
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+def cache_path(cache_dir: Path, year: int) -> Path:
+    return cache_dir / f"{year}.npz"
+
+def load_year_cache(cache_dir: Path, year: int) -> Optional[YearCache]:
+    """
+    Load the cached parse results for a year, or None if absent,
+    unreadable or written by different parser code.
+    """
+    path = cache_path(cache_dir, year)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as npz:
+            meta = json.loads(npz["meta"].tobytes())
+            if meta.get("parser") != parser_fingerprint():
+                return None
+            store   = RecordStore.from_arrays(meta["vocab"], npz)
+            offsets = npz["offsets"].copy()
+    except Exception:
+        return None
+    return YearCache(store, meta["members"], offsets)
+
+def save_year_cache(cache_dir: Path, year: int, store: RecordStore, members: List[str], offsets: List[int]):
+    """
+    Atomically write one year's parse results as an uncompressed .npz:
+    the store columns, per-member row offsets and a small JSON header
+    with the vocabularies, member fingerprints and parser fingerprint.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "parser":  parser_fingerprint(),
+        "vocab":   store.vocab,
+        "members": members,
+    }
+    arrays: Dict[str, np.ndarray] = store.to_arrays()
+    arrays["offsets"] = np.asarray(offsets, dtype=np.int64)
+    arrays["meta"]    = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+
+    path = cache_path(cache_dir, year)
+    tmp  = path.with_suffix(".npz.tmp")
+    with tmp.open("wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
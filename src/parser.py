@@ -1,28 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 from pathlib import Path
 from typing import List, Dict, Optional
 from tqdm import tqdm
 from concurrent.futures import ProcessPoolExecutor
 
-def parse_award(json_path: Path) -> Optional[List[Dict]]:
-    """
-    Read one award JSON and return flat records:
-      { year, dir_abbr, directorate, div_abbr, division, program, pgm_code, amount }
-    """
-    try:
-        data = json.loads(json_path.read_text())
-    except Exception:
-        return None
+from src.sources import AwardPath, award_year, find_sources, iter_award_paths
+from src.records import RecordStore
+from src.decode import PARSE_FIELDS, make_decoder
 
-    # infer year from parent folder name
-    try:
-        year = int(json_path.parent.name)
-    except ValueError:
-        return None
+# RecordStore keeps fiscal years as uint16
+MAX_FISCAL_YEAR = 0xFFFF
 
+def parse_award_data(data: Dict, year: int, stats: Optional[Dict[str, int]] = None) -> Optional[List[Dict]]:
+    """
+    Turn one decoded award document into flat records:
+      { year, dir_abbr, directorate, div_abbr, division, program, pgm_code, amount,
+        share, obligations }
+    where obligations are the award's (fiscal year, amount) pairs from
+    oblg_fy (or [(year, amount)] when it has none) and share is
+    1 / the number of records, for apportioning across program elements.
+    Malformed oblg_fy entries (missing or non-numeric values, a fiscal year
+    outside 0..MAX_FISCAL_YEAR) are left out and counted in
+    stats["bad_obligations"] when a stats dict is given.
+    """
     dir_name = data.get("org_dir_long_name")
     div_name = data.get("org_div_long_name")
     amt      = data.get("tot_intn_awd_amt")
@@ -31,6 +33,19 @@ def parse_award(json_path: Path) -> Optional[List[Dict]]:
     if not dir_name or not div_name or not pgm_list or amt is None:
         return None
 
+    obligations = []
+    for f in data.get("oblg_fy") or []:
+        try:
+            fy, oblg_amt = int(f["fund_oblg_fiscal_yr"]), float(f["fund_oblg_amt"])
+        except (KeyError, TypeError, ValueError, OverflowError):
+            fy = None
+        if fy is None or not 0 <= fy <= MAX_FISCAL_YEAR:
+            if stats is not None:
+                stats["bad_obligations"] = stats.get("bad_obligations", 0) + 1
+            continue
+        obligations.append((fy, oblg_amt))
+    obligations = obligations or [(year, float(amt))]
+
     records = []
     for pgm in pgm_list:
         p_name = pgm.get("pgm_ele_name")
@@ -45,27 +60,58 @@ def parse_award(json_path: Path) -> Optional[List[Dict]]:
                 "program":      p_name.strip(),
                 "pgm_code":     p_code.strip(),
                 "amount":       float(amt),
+                "obligations":  obligations,
             })
+    for r in records:
+        r["share"] = 1.0 / len(records)
     return records if records else None
 
-def parse_all(data_dir: Path, max_workers: int = None) -> List[Dict]:
+def parse_award(json_path: AwardPath) -> Optional[List[Dict]]:
+    """
+    Read one award JSON (a file or a member of a year ZIP) and return its
+    flat records (see parse_award_data).
+    """
+    try:
+        data = make_decoder(PARSE_FIELDS)(json_path.read_bytes())
+    except Exception:
+        return None
+
+    # infer year from parent folder name (or archive name for ZIP members)
+    year = award_year(json_path)
+    if year is None:
+        return None
+
+    return parse_award_data(data, year)
+
+def parse_source(source: Path) -> RecordStore:
+    """
+    Parse every award in one year source (ZIP or extracted folder)
+    into a compact RecordStore.
+    """
+    store = RecordStore()
+    for award in iter_award_paths(source):
+        recs = parse_award(award)
+        if recs:
+            store.extend(recs)
+    return store
+
+def parse_all(data_dir: Path, max_workers: int = None) -> RecordStore:
     """
-    Find all award JSON files under data_dir, parse them in parallel,
-    and return a flat list of all records.
+    Find all year sources under data_dir, parse them in parallel (one year
+    per task), and return every record in a single RecordStore.
     Shows a tqdm progress bar.
     """
-    json_files = list(data_dir.rglob("*.json"))
-    print(f"Found {len(json_files)} award JSON files to parse.")
-    records: List[Dict] = []
+    sources = find_sources(data_dir)
+    print(f"Found {len(sources)} award years to parse.")
+    records = RecordStore()
 
     with ProcessPoolExecutor(max_workers=max_workers) as exe:
-        for recs in tqdm(
-            exe.map(parse_award, json_files),
-            total=len(json_files),
+        for store in tqdm(
+            exe.map(parse_source, sources),
+            total=len(sources),
             desc="Parsing awards"
         ):
-            if recs:
-                records.extend(recs)
+            records.merge(store)
 
     print(f"Parsed {len(records)} award‐level records.")
     return records
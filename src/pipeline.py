@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cProfile
+import hashlib
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from src.measure import Measure
+
+# Files up to this size are fingerprinted by content, larger ones by size + mtime
+HASH_LIMIT = 32 * 1024 * 1024
+
+def path_fingerprint(path: Path) -> str:
+    """
+    Fingerprint one input path:
+      * missing          → "missing"
+      * small file       → content hash
+      * large file       → size + mtime
+      * directory        → name, size and mtime of every top-level entry
+                           (year ZIPs / year folders for data/awards)
+    """
+    if not path.exists():
+        return "missing"
+    if path.is_dir():
+        h = hashlib.blake2b(digest_size=16)
+        for entry in sorted(os.scandir(path), key=lambda e: e.name):
+            st = entry.stat()
+            h.update(f"{entry.name}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+        return h.hexdigest()
+    st = path.stat()
+    if st.st_size > HASH_LIMIT:
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+def newest_mtime(path: Path) -> int:
+    """
+    mtime (ns) of a file, or of the newest top-level entry of a directory
+    (the same entries path_fingerprint looks at); 0 when missing.
+    """
+    if not path.exists():
+        return 0
+    if path.is_dir():
+        return max((e.stat().st_mtime_ns for e in os.scandir(path)), default=path.stat().st_mtime_ns)
+    return path.stat().st_mtime_ns
+
+def output_bytes(paths: Sequence[Path], since: float) -> int:
+    """
+    Total size of the files among paths (or directly inside them, for
+    directories) modified at or after `since` (a time.time() stamp).
+    """
+    total = 0
+    for path in paths:
+        entries = list(path.iterdir()) if path.is_dir() else [path]
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if entry.is_file() and st.st_mtime >= since:
+                total += st.st_size
+    return total
+
+class Stage:
+    """
+    One pipeline step.
+      run          callable doing the work; may return a dict of counters
+                   for the run report (items, errors, skipped, bytes_read,
+                   bytes_written, workers, ...)
+      inputs       paths whose fingerprints decide whether to rerun
+                   (data, upstream outputs and the stage's own source files)
+      outputs      paths that must exist for the stage to count as up to date
+      params       JSON-able settings that also feed the fingerprint
+      after        names of stages that must finish first
+      always       rerun every time (e.g. download, which is a no-op per
+                   year that is already present)
+      main_thread  must run on the main thread (matplotlib windows)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], None],
+        inputs: Sequence[Path] = (),
+        outputs: Sequence[Path] = (),
+        params: Optional[Dict] = None,
+        after: Sequence[str] = (),
+        always: bool = False,
+        main_thread: bool = False,
+    ):
+        self.name        = name
+        self.run         = run
+        self.inputs      = [Path(p) for p in inputs]
+        self.outputs     = [Path(p) for p in outputs]
+        self.params      = params or {}
+        self.after       = list(after)
+        self.always      = always
+        self.main_thread = main_thread
+
+    def input_fingerprint(self, known: Optional[Dict[Path, str]] = None) -> str:
+        """
+        Hash of the input fingerprints; inputs in `known` use the
+        fingerprint given there instead of the one on disk now.
+        """
+        known = known or {}
+        h = hashlib.blake2b(digest_size=16)
+        for p in self.inputs:
+            h.update(f"{p}={known[p] if p in known else path_fingerprint(p)}\n".encode())
+        return h.hexdigest()
+
+    def fingerprint(self, known: Optional[Dict[Path, str]] = None) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        h.update(self.input_fingerprint(known).encode())
+        return h.hexdigest()
+
+class Pipeline:
+    """
+    Stage DAG with incremental reruns. Each stage's input fingerprint is
+    recorded in state_path after it succeeds; on the next run a stage is
+    skipped when that fingerprint is unchanged and its outputs exist.
+    Stages whose dependencies are done run concurrently on a thread pool.
+    """
+
+    def __init__(self, state_path: Path, profile_dir: Optional[Path] = None):
+        self.state_path  = state_path
+        self.profile_dir = profile_dir
+        self.stages: Dict[str, Stage] = {}
+        self.state: Dict[str, str] = {}
+        self.report: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if state_path.exists():
+            try:
+                self.state = json.loads(state_path.read_text())
+            except ValueError:
+                self.state = {}
+
+    def add(self, stage: Stage):
+        self.stages[stage.name] = stage
+
+    def _save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2, sort_keys=True))
+        os.replace(tmp, self.state_path)
+
+    def _order(self) -> List[str]:
+        """
+        Topological order (depth-first), keeping registration order among peers.
+        """
+        order, seen, visiting = [], set(), set()
+
+        def visit(name: str):
+            if name in seen:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline cycle at stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].after:
+                if dep in self.stages:
+                    visit(dep)
+            visiting.discard(name)
+            seen.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _is_fresh(self, stage: Stage) -> bool:
+        if stage.always:
+            return False
+        if any(not p.exists() for p in stage.outputs):
+            return False
+        return self.state.get(stage.name) == stage.fingerprint()
+
+    def _outputs_stale(self, stage: Stage) -> bool:
+        """
+        For a skipped stage: True when an output is missing, or the inputs
+        changed since the stage last ran (any output older than the newest
+        input, if it never ran under this state file).
+        """
+        if stage.always or not stage.outputs:
+            return False
+        if any(not p.exists() for p in stage.outputs):
+            return True
+        recorded = self.state.get(f"{stage.name}:inputs")
+        if recorded is not None:
+            return recorded != stage.input_fingerprint()
+        newest = max((newest_mtime(p) for p in stage.inputs), default=0)
+        return any(p.stat().st_mtime_ns < newest for p in stage.outputs)
+
+    def _dump_profile(self, name: str, profiler: cProfile.Profile) -> str:
+        """
+        Write {name}.prof (for snakeviz / pstats) and a top-40 cumulative
+        summary {name}.txt; returns the .prof path.
+        """
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        prof = self.profile_dir / f"{name}.prof"
+        profiler.dump_stats(prof)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        (self.profile_dir / f"{name}.txt").write_text(out.getvalue())
+        return str(prof)
+
+    def inputs_before(self, name: str) -> Dict[Path, str]:
+        """
+        Fingerprints of a stage's inputs, taken before it runs so an input
+        changed while the stage was reading it still counts as changed next
+        time. The stage's own outputs (mission scraping rewrites
+        division_map.json) are left to record(), after the run, so they do
+        not make it stale.
+        """
+        stage = self.stages[name]
+        return {p: path_fingerprint(p) for p in stage.inputs if p not in stage.outputs}
+
+    def record(self, name: str, before: Dict[Path, str]):
+        """
+        Store a stage's fingerprints as of `before` (see inputs_before).
+        """
+        stage = self.stages[name]
+        fp, inputs_fp = stage.fingerprint(before), stage.input_fingerprint(before)
+        with self._lock:
+            self.state[stage.name] = fp
+            self.state[f"{stage.name}:inputs"] = inputs_fp
+            self._save()
+
+    def _execute(self, stage: Stage):
+        """
+        Run one stage under measurement (and cProfile with a profile_dir),
+        then record its fingerprint and its run-report entry.
+        """
+        before   = self.inputs_before(stage.name)
+        started  = time.time()
+        profiler = cProfile.Profile() if self.profile_dir else None
+        counters, error = {}, None
+        with Measure() as m:
+            try:
+                if profiler:
+                    profiler.enable()
+                counters = stage.run() or {}
+            except Exception as e:
+                error = e
+            finally:
+                if profiler:
+                    profiler.disable()
+
+        entry = dict(m.result(), status="failed" if error else "ran", **counters)
+        entry.setdefault("bytes_written", output_bytes(stage.outputs, started))
+        if entry.get("items") and m.wall:
+            entry["items_per_s"] = round(entry["items"] / m.wall, 1)
+        if entry.get("workers") and m.wall:
+            # CPU of worker pools counts once they have shut down; with
+            # stages overlapping this is an approximation
+            entry["worker_utilization"] = round(m.cpu / (m.wall * entry["workers"]), 3)
+        if error:
+            entry["error"] = repr(error)
+        if profiler:
+            entry["profile"] = self._dump_profile(stage.name, profiler)
+        with self._lock:
+            self.report[stage.name] = entry
+        if error:
+            raise error
+
+        self.record(stage.name, before)
+
+    def write_report(self, path: Path, status: Dict[str, str], wall: float):
+        """
+        Machine-readable run report: one entry per stage with its status
+        and, for stages that ran, timings, peak RSS and counters.
+        """
+        stages = {}
+        for name in self._order():
+            stages[name] = self.report.get(name, {"status": status.get(name, "not-run")})
+            stages[name]["status"] = status.get(name, stages[name]["status"])
+        report = {
+            "finished": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "wall_s":   round(wall, 3),
+            "stages":   stages,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2))
+
+    def run(self, skip: Iterable[str] = (), force: Iterable[str] = (), max_workers: int = 3) -> Dict[str, str]:
+        """
+        Run every stage that is stale (or forced), respecting dependencies.
+        Skipped stages are treated as done, so downstream stages use
+        whatever outputs already exist, unless those outputs are missing or
+        older than the skipped stage's inputs: then its dependents are
+        blocked rather than run on stale data. With a profile_dir, stages
+        run one at a time regardless of max_workers. Returns {stage: status},
+        status in ran / up-to-date / skipped / failed / blocked.
+        """
+        skip, force = set(skip), set(force)
+        if self.profile_dir:
+            # only one cProfile profiler can be active at a time (Python 3.12+),
+            # so profiled stages run one after another on this thread
+            max_workers = 1
+        order   = self._order()
+        status: Dict[str, str] = {}
+        running = {}
+        stale: set = set()  # skipped stages whose outputs are out of date
+        needed = {dep for stage in self.stages.values() for dep in stage.after}
+
+        def ready(name: str) -> bool:
+            return all(status.get(dep) in ("ran", "up-to-date", "skipped")
+                       for dep in self.stages[name].after if dep in self.stages)
+
+        def blocked(name: str) -> bool:
+            return any(status.get(dep) in ("failed", "blocked") or dep in stale
+                       for dep in self.stages[name].after if dep in self.stages)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as exe:
+            while len(status) < len(order):
+                main_thread_ready = []
+                progressed = False
+                for name in order:
+                    if name in status or name in running.values():
+                        continue
+                    stage = self.stages[name]
+                    if name in skip:
+                        status[name] = "skipped"
+                        print(f"Skipping {name}.")
+                        if name in needed and self._outputs_stale(stage):
+                            stale.add(name)
+                            print(f"[pipeline] {name}: outputs are missing or out of date with its inputs")
+                        progressed = True
+                    elif blocked(name):
+                        status[name] = "blocked"
+                        deps = [d for d in stage.after if d in stale]
+                        if deps:
+                            print(f"[pipeline] {name}: blocked, skipped {', '.join(deps)} has out-of-date "
+                                  f"outputs (rerun without skipping it)")
+                        else:
+                            print(f"[pipeline] {name}: blocked by a failed dependency")
+                        progressed = True
+                    elif not ready(name):
+                        continue
+                    elif name not in force and self._is_fresh(stage):
+                        status[name] = "up-to-date"
+                        print(f"[pipeline] {name}: up to date")
+                        progressed = True
+                    elif stage.main_thread or self.profile_dir:
+                        main_thread_ready.append(name)
+                    else:
+                        running[exe.submit(self._execute, stage)] = name
+
+                if progressed:
+                    continue
+
+                for name in main_thread_ready:
+                    try:
+                        self._execute(self.stages[name])
+                        status[name] = "ran"
+                    except Exception as e:
+                        status[name] = "failed"
+                        print(f"[pipeline] {name} failed: {e!r}")
+                if main_thread_ready:
+                    continue
+
+                if not running:
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    try:
+                        fut.result()
+                        status[name] = "ran"
+                    except Exception as e:
+                        status[name] = "failed"
+                        print(f"[pipeline] {name} failed: {e!r}")
+        return status
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.cube import CUBE_DIR, FundingCube, load_cube
+
+LEVELS  = {"directorate": 1, "division": 2, "program": 3}
+METRICS = ("amount", "count")
+
+class FundingQuery:
+    """
+    Year-range queries over a FundingCube.
+
+    Per-node cumulative-by-year sums are computed once, so the total of
+    any node over any [start, end] range is two lookups and a subtraction;
+    top-k uses argpartition over the candidate rows instead of sorting
+    (or rebuilding) the whole hierarchy.
+    """
+
+    def __init__(self, cube: FundingCube, aliases: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.cube = cube
+        n = len(cube)
+
+        # cum[:, j] = sum of columns < j  (leading zero column)
+        self.cum = {
+            "amount": np.zeros((n, len(cube.years) + 1), dtype=np.float64),
+            "count":  np.zeros((n, len(cube.years) + 1), dtype=np.int64),
+        }
+        np.cumsum(cube.amounts, axis=1, out=self.cum["amount"][:, 1:])
+        np.cumsum(cube.counts,  axis=1, out=self.cum["count"][:, 1:])
+
+        # rows are depth-first, so a subtree is [row, end[row])
+        self.end = np.full(n, n, dtype=np.int64)
+        stack: List[int] = []
+        for row, depth in enumerate(cube.depth.tolist()):
+            while stack and cube.depth[stack[-1]] >= depth:
+                self.end[stack.pop()] = row
+            stack.append(row)
+
+        self.aliases = aliases or {}
+
+    def _cols(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        years = self.cube.years
+        lo = 0 if start is None else int(np.searchsorted(years, start, side="left"))
+        hi = len(years) if end is None else int(np.searchsorted(years, end, side="right"))
+        return lo, max(lo, hi)
+
+    def resolve(self, node) -> int:
+        """
+        Row of a node given as a path tuple, a "Dir / Division / Program"
+        string, a full name, or an abbreviation from the *_map.json files.
+        """
+        if isinstance(node, (int, np.integer)):
+            return int(node)
+        if isinstance(node, str):
+            # names may contain "/" themselves ("INDUSTRY/UNIV COOP RESEAR"),
+            # so only fall back to splitting on " / " when nothing matches
+            matches = [p for p in self.cube.paths if p[-1] == node]
+            if node in self.aliases:
+                path = self.aliases[node]
+            elif len(matches) == 1:
+                path = matches[0]
+            elif " / " in node:
+                path = tuple(p.strip() for p in node.split(" / "))
+            else:
+                raise KeyError(f"unknown or ambiguous node: {node!r}")
+        else:
+            path = tuple(node)
+        try:
+            return self.cube.row(path)
+        except KeyError:
+            raise KeyError(f"unknown node: {' / '.join(path)!r}")
+
+    def totals(self, rows, start: Optional[int] = None, end: Optional[int] = None, metric: str = "amount") -> np.ndarray:
+        """
+        Range totals for an array of rows over [start, end], both inclusive.
+        """
+        lo, hi = self._cols(start, end)
+        cum = self.cum[metric]
+        return cum[rows, hi] - cum[rows, lo]
+
+    def total(self, node, start: Optional[int] = None, end: Optional[int] = None, metric: str = "amount"):
+        row = self.resolve(node)
+        return self.totals(np.array([row]), start, end, metric)[0].item()
+
+    def candidates(self, level: Optional[str] = None, within=None) -> np.ndarray:
+        """
+        Rows to rank: nodes at `level` inside `within` (default: its direct
+        children, or all directorates when neither is given).
+        """
+        depth = self.cube.depth
+        if within is None:
+            return np.flatnonzero(depth == (LEVELS[level] if level else 1))
+        row = self.resolve(within)
+        want = LEVELS[level] if level else depth[row] + 1
+        sub = np.arange(row + 1, self.end[row])
+        return sub[depth[sub] == want]
+
+    def top(
+        self,
+        k: Optional[int] = 10,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        level: Optional[str] = None,
+        within=None,
+        by: str = "amount",
+    ) -> List[Dict]:
+        """
+        Top-k nodes by `by` over [start, end]; k=None (or 0) ranks them all.
+        """
+        rows = self.candidates(level, within)
+        key  = self.totals(rows, start, end, by)
+        if k and k < len(rows):
+            part = np.argpartition(-key, k - 1)[:k]
+            rows, key = rows[part], key[part]
+        order = np.argsort(-key, kind="stable")
+        rows  = rows[order]
+
+        amounts = self.totals(rows, start, end, "amount").tolist()
+        counts  = self.totals(rows, start, end, "count").tolist()
+        return [
+            {"path": list(self.cube.paths[r]), "amount": a, "count": c}
+            for r, a, c in zip(rows.tolist(), amounts, counts)
+        ]
+
+    def run(self, q: Dict) -> List[Dict]:
+        """
+        Answer one query dict, e.g. {"k": 20, "start": 2015, "end": 2024,
+        "level": "program", "within": "GEO"}. Used by batch mode.
+        """
+        if "node" in q:
+            row = self.resolve(q["node"])
+            return [{
+                "path":   list(self.cube.paths[row]),
+                "amount": self.total(row, q.get("start"), q.get("end"), "amount"),
+                "count":  self.total(row, q.get("start"), q.get("end"), "count"),
+            }]
+        return self.top(
+            k=q.get("k", 10), start=q.get("start"), end=q.get("end"),
+            level=q.get("level"), within=q.get("within"), by=q.get("by", "amount"),
+        )
+
+def load_aliases(output_dir: Path, cube: FundingCube) -> Dict[str, Tuple[str, ...]]:
+    """
+    abbreviation → node path, from directorate_map.json / division_map.json
+    when they exist (e.g. "GEO" → ("Directorate for Geosciences",)).
+    """
+    aliases: Dict[str, Tuple[str, ...]] = {}
+    by_name: Dict[Tuple[int, str], List[Tuple[str, ...]]] = {}
+    for p in cube.paths:
+        by_name.setdefault((len(p), p[-1]), []).append(p)
+
+    for depth, name in ((1, "directorate_map.json"), (2, "division_map.json")):
+        path = Path(output_dir) / name
+        if not path.exists():
+            continue
+        for longn, val in json.loads(path.read_text()).items():
+            abbr  = val.get("abbr") if isinstance(val, dict) else val
+            paths = by_name.get((depth, longn), [])
+            if abbr and len(paths) == 1:
+                aliases.setdefault(abbr, paths[0])
+    return aliases
+
+def open_query(cube_dir: Path = CUBE_DIR, output_dir: Optional[Path] = None) -> FundingQuery:
+    """
+    Memory-map the cube and build its prefix sums.
+    """
+    cube = load_cube(Path(cube_dir))
+    output_dir = Path(output_dir) if output_dir else Path(cube_dir).parent
+    return FundingQuery(cube, load_aliases(output_dir, cube))
+
+def format_rows(rows: Sequence[Dict]) -> str:
+    lines = []
+    for i, r in enumerate(rows, 1):
+        lines.append(f"{i:>4}  {r['amount']:>18,.2f}  {r['count']:>8,}  {' / '.join(r['path'])}")
+    return "\n".join(lines)
+
+def main():
+    p = argparse.ArgumentParser(description="Year-range queries over the NSF funding cube")
+    p.add_argument("--cube", default=str(CUBE_DIR), help="funding cube directory (default: outputs/cube)")
+    p.add_argument("--json", action="store_true", help="print results as JSON")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    top = sub.add_parser("top", help="rank nodes by funding over a year range")
+    top.add_argument("-k",       type=int, default=10, help="how many to return (0 = all)")
+    top.add_argument("--start",  type=int, default=None, help="first year (inclusive)")
+    top.add_argument("--end",    type=int, default=None, help="last year (inclusive)")
+    top.add_argument("--level",  choices=list(LEVELS), default=None,
+                     help="rank directorates, divisions or programs (default: children of --within)")
+    top.add_argument("--within", default=None,
+                     help='restrict to a subtree: abbreviation ("GEO"), name, or "Dir / Division" path')
+    top.add_argument("--by",     choices=METRICS, default="amount")
+
+    node = sub.add_parser("node", help="totals for one node over a year range")
+    node.add_argument("node", help='abbreviation, name, or "Dir / Division / Program" path')
+    node.add_argument("--start", type=int, default=None)
+    node.add_argument("--end",   type=int, default=None)
+
+    batch = sub.add_parser("batch", help="answer a JSON list of query dicts")
+    batch.add_argument("queries", help="JSON file: [{\"k\": 20, \"start\": 2015, \"level\": \"program\", ...}, ...]")
+    batch.add_argument("--out",   default=None, help="write results here instead of stdout")
+
+    args = p.parse_args()
+    fq = open_query(Path(args.cube))
+
+    if args.cmd == "batch":
+        queries = json.loads(Path(args.queries).read_text())
+        results = []
+        for q in queries:
+            try:
+                results.append({"query": q, "rows": fq.run(q)})
+            except KeyError as e:
+                results.append({"query": q, "error": str(e.args[0])})
+        text = json.dumps(results, indent=2)
+        if args.out:
+            Path(args.out).write_text(text)
+            print(f"✔ Wrote {len(results)} query results to {args.out}")
+        else:
+            print(text)
+        return
+
+    try:
+        if args.cmd == "top":
+            rows = fq.top(args.k or None, args.start, args.end, args.level, args.within, args.by)
+        else:
+            rows = fq.run({"node": args.node, "start": args.start, "end": args.end})
+    except KeyError as e:
+        p.error(str(e.args[0]))
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+# String fields of a parse record; each is dictionary-encoded to int codes
+DIMENSIONS = ("dir_abbr", "directorate", "div_abbr", "division", "program", "pgm_code")
+
+class RecordStore:
+    """
+    Columnar container for parse records.
+
+    Each string dimension keeps a vocabulary (codes assigned in first-seen
+    order) and an array('i') of codes; year and amount live in typed arrays.
+    A record costs ~34 bytes and pickles as a few flat buffers, instead of
+    an eight-key dict with its own copies of the long names.
+    Iterating yields the same record dicts parse_award produces.
+
+    Each record also carries its award's obligation schedule, stored
+    ragged: oblg_n[i] (fiscal year, amount) pairs per record, laid out
+    back to back in oblg_year / oblg_amount. share is 1 / the number of
+    program records the award produced, for apportioning.
+    """
+
+    def __init__(self):
+        self.vocab: Dict[str, List[str]] = {dim: [] for dim in DIMENSIONS}
+        self.codes: Dict[str, array]     = {dim: array("i") for dim in DIMENSIONS}
+        self.year        = array("H")
+        self.amount      = array("d")
+        self.share       = array("d")
+        self.oblg_n      = array("I")
+        self.oblg_year   = array("H")
+        self.oblg_amount = array("d")
+        self._index: Dict[str, Dict[str, int]] = {dim: {} for dim in DIMENSIONS}
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+    def __getstate__(self):
+        # the reverse index is rebuilt on load; no need to ship it over IPC
+        return (self.vocab, self.codes, self.year, self.amount,
+                self.share, self.oblg_n, self.oblg_year, self.oblg_amount)
+
+    def __setstate__(self, state):
+        (self.vocab, self.codes, self.year, self.amount,
+         self.share, self.oblg_n, self.oblg_year, self.oblg_amount) = state
+        self._index = {dim: {s: i for i, s in enumerate(self.vocab[dim])} for dim in DIMENSIONS}
+
+    def encode(self, dim: str, value: str) -> int:
+        """
+        Code for value in dimension dim, adding it to the vocabulary if new.
+        """
+        index = self._index[dim]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(self.vocab[dim])
+            self.vocab[dim].append(value)
+        return code
+
+    def append(self, record: Dict):
+        for dim in DIMENSIONS:
+            self.codes[dim].append(self.encode(dim, record[dim]))
+        self.year.append(record["year"])
+        self.amount.append(record["amount"])
+        self.share.append(record.get("share", 1.0))
+        obligations = record.get("obligations") or [(record["year"], record["amount"])]
+        self.oblg_n.append(len(obligations))
+        for fy, amt in obligations:
+            self.oblg_year.append(fy)
+            self.oblg_amount.append(amt)
+
+    def extend(self, records: Iterable[Dict]):
+        if isinstance(records, RecordStore):
+            self.merge(records)
+            return
+        for r in records:
+            self.append(r)
+
+    def merge(self, other: "RecordStore"):
+        """
+        Append another store, re-coding its dimensions into this vocabulary.
+        """
+        for dim in DIMENSIONS:
+            remap = np.array([self.encode(dim, s) for s in other.vocab[dim]], dtype=np.intc)
+            if np.array_equal(remap, np.arange(len(remap))):
+                self.codes[dim].extend(other.codes[dim])
+            else:
+                self.codes[dim].frombytes(remap[other.column(dim)].tobytes())
+        self.year.extend(other.year)
+        self.amount.extend(other.amount)
+        self.share.extend(other.share)
+        self.oblg_n.extend(other.oblg_n)
+        self.oblg_year.extend(other.oblg_year)
+        self.oblg_amount.extend(other.oblg_amount)
+
+    def take(self, rows: np.ndarray) -> "RecordStore":
+        """
+        New store holding the given rows (in that order), sharing this
+        store's vocabularies.
+        """
+        out = RecordStore()
+        out.vocab  = {dim: list(v) for dim, v in self.vocab.items()}
+        out._index = {dim: dict(i) for dim, i in self._index.items()}
+        for dim in DIMENSIONS:
+            out.codes[dim].frombytes(self.column(dim)[rows].tobytes())
+        out.year.frombytes(np.array(self.year, dtype=np.uint16)[rows].tobytes())
+        out.amount.frombytes(self.column("amount")[rows].tobytes())
+        out.share.frombytes(self.column("share")[rows].tobytes())
+
+        n      = np.array(self.oblg_n, dtype=np.int64)
+        starts = np.cumsum(n) - n
+        lens   = n[rows]
+        # obligation rows of each taken record, in the taken order
+        idx    = np.repeat(starts[rows] - (np.cumsum(lens) - lens), lens) + np.arange(lens.sum())
+        out.oblg_n.frombytes(lens.astype(np.uint32).tobytes())
+        out.oblg_year.frombytes(np.array(self.oblg_year, dtype=np.uint16)[idx].tobytes())
+        out.oblg_amount.frombytes(np.array(self.oblg_amount, dtype=np.float64)[idx].tobytes())
+        return out
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Plain NumPy columns (vocabularies excluded), e.g. for np.savez.
+        """
+        arrays = {f"codes_{dim}": self.column(dim) for dim in DIMENSIONS}
+        arrays["year"]        = np.array(self.year, dtype=np.uint16)
+        arrays["amount"]      = self.column("amount")
+        arrays["share"]       = self.column("share")
+        arrays["oblg_n"]      = np.array(self.oblg_n, dtype=np.uint32)
+        arrays["oblg_year"]   = np.array(self.oblg_year, dtype=np.uint16)
+        arrays["oblg_amount"] = np.array(self.oblg_amount, dtype=np.float64)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, vocab: Dict[str, List[str]], arrays) -> "RecordStore":
+        """
+        Inverse of to_arrays, given the matching vocabularies.
+        """
+        store = cls()
+        store.__setstate__((
+            {dim: list(vocab[dim]) for dim in DIMENSIONS},
+            {dim: array("i", np.asarray(arrays[f"codes_{dim}"], dtype=np.intc).tobytes()) for dim in DIMENSIONS},
+            array("H", np.asarray(arrays["year"], dtype=np.uint16).tobytes()),
+            array("d", np.asarray(arrays["amount"], dtype=np.float64).tobytes()),
+            array("d", np.asarray(arrays["share"], dtype=np.float64).tobytes()),
+            array("I", np.asarray(arrays["oblg_n"], dtype=np.uint32).tobytes()),
+            array("H", np.asarray(arrays["oblg_year"], dtype=np.uint16).tobytes()),
+            array("d", np.asarray(arrays["oblg_amount"], dtype=np.float64).tobytes()),
+        ))
+        return store
+
+    def column(self, dim: str) -> np.ndarray:
+        """
+        Copy of a dimension's codes (or "year" / "amount" / "share") as a NumPy array.
+        """
+        if dim == "year":
+            return np.array(self.year, dtype=np.int64)
+        if dim == "amount":
+            return np.array(self.amount, dtype=np.float64)
+        if dim == "share":
+            return np.array(self.share, dtype=np.float64)
+        return np.array(self.codes[dim], dtype=np.intc)
+
+    def __iter__(self) -> Iterator[Dict]:
+        cols = [(dim, self.vocab[dim], self.codes[dim]) for dim in DIMENSIONS]
+        pos  = 0
+        for i in range(len(self)):
+            r = {"year": self.year[i]}
+            for dim, vocab, codes in cols:
+                r[dim] = vocab[codes[i]]
+            r["amount"] = self.amount[i]
+            r["share"]  = self.share[i]
+            n = self.oblg_n[i]
+            r["obligations"] = list(zip(self.oblg_year[pos:pos + n], self.oblg_amount[pos:pos + n]))
+            pos += n
+            yield r
+
+    def group_by(self, dims: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Group records by (dims..., year). Returns
+          keys   (groups × len(dims) codes),
+          years  (groups,),
+          counts (groups,),
+          sums   (groups,) of amount,
+        with groups in order of first appearance.
+        """
+        rows = np.arange(len(self))
+        keys, years, group, n_groups = self._group(dims, rows, self.column("year"))
+        counts = np.bincount(group, minlength=n_groups)
+        sums   = np.bincount(group, weights=self.column("amount"), minlength=n_groups)
+        return keys, years, counts, sums
+
+    def group_obligations(self, dims: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Group the obligation rows by (dims..., fiscal year). Returns
+          keys, years (fiscal), counts (records with an obligation that
+          year), sums of obligated amount, and shares: the same amounts
+          scaled by each record's share, i.e. apportioned across the
+          award's program elements,
+        with groups in order of first appearance.
+        """
+        n    = np.array(self.oblg_n, dtype=np.int64)
+        rows = np.repeat(np.arange(len(self)), n)
+        fy   = np.array(self.oblg_year, dtype=np.int64)
+        amt  = np.array(self.oblg_amount, dtype=np.float64)
+        keys, years, group, n_groups = self._group(dims, rows, fy)
+
+        # a record with several obligations in one fiscal year counts once
+        _, first = np.unique(rows * 65536 + fy, return_index=True)
+        once = np.zeros(len(rows))
+        once[first] = 1
+        counts = np.bincount(group, weights=once, minlength=n_groups).astype(np.int64)
+        sums   = np.bincount(group, weights=amt, minlength=n_groups)
+        shares = np.bincount(group, weights=amt * self.column("share")[rows], minlength=n_groups)
+        return keys, years, counts, sums, shares
+
+    def _group(self, dims: Sequence[str], rows: np.ndarray, years: np.ndarray):
+        """
+        Group ids for (dims of record rows[i], years[i]): returns the
+        groups' keys and years, a group id per input and the group count.
+        """
+        if not len(rows):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty.reshape(0, len(dims)), empty, empty, 0
+
+        # mixed-radix key over (dims..., year)
+        key = np.zeros(len(rows), dtype=np.int64)
+        for dim in dims:
+            key = key * max(len(self.vocab[dim]), 1) + self.column(dim)[rows]
+        key = key * 65536 + years
+
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        order  = np.argsort(first, kind="stable")
+        rank   = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        group  = rank[inverse]
+
+        firsts = first[order]
+        keys   = np.stack([self.column(dim)[rows[firsts]] for dim in dims], axis=1)
+        return keys, years[firsts], group, len(order)
+
+    def last_values(self, key_dim: str, val_dim: str) -> Dict[str, str]:
+        """
+        For every distinct key_dim value, the val_dim value on its last
+        record — the result of assigning d[key] = val record by record.
+        """
+        keys = self.column(key_dim)
+        vals = self.column(val_dim)
+        uniq, rev_first = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - rev_first
+        kv, vv = self.vocab[key_dim], self.vocab[val_dim]
+        return {kv[k]: vv[vals[i]] for k, i in zip(uniq.tolist(), last.tolist())}
+
+    def distinct(self, dims: Sequence[str]) -> List[Tuple[str, ...]]:
+        """
+        Distinct combinations of dims, in order of first appearance.
+        """
+        if not len(self):
+            return []
+        stacked = np.stack([self.column(dim) for dim in dims], axis=1)
+        _, first = np.unique(stacked, axis=0, return_index=True)
+        first.sort()
+        return [tuple(self.vocab[dim][c] for dim, c in zip(dims, stacked[i].tolist())) for i in first]
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional
+from tqdm import tqdm
+
+import numpy as np
+
+from src.decode import make_decoder
+from src.sources import find_sources, iter_award_paths, read_award, shard_index_path, source_year
+
+BLOCK_SIZE = 4 * 1024 * 1024  # uncompressed bytes per independently compressed block
+ZSTD_LEVEL = 12
+GZIP_LEVEL = 6
+
+# data/awards/{year}.jsonl.zst (or .jsonl.gz without `zstandard`):
+#   concatenated blocks, each a complete zstd frame / gzip member of
+#   ~BLOCK_SIZE bytes of minified award JSON, one award per line
+# data/awards/{year}.idx.npz, one row per award in shard order:
+#   awd_id / crc / length     award id, CRC-32 and length of its line
+#   block / start             block number and offset inside the decompressed block
+#   order                     argsort of awd_id, for binary search by id
+#   block_offset / block_size compressed position of each block in the shard
+#   shard_size                shard length, so a stale index is detected
+
+def default_codec() -> str:
+    """
+    "zst" when `zstandard` is installed, otherwise "gz".
+    """
+    try:
+        import zstandard  # noqa: F401
+        return "zst"
+    except ImportError:
+        return "gz"
+
+def _compressor(codec: str):
+    if codec == "gz":
+        return partial(gzip.compress, compresslevel=GZIP_LEVEL, mtime=0)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Writing .jsonl.zst award shards requires `pip install zstandard` (or use codec gz).")
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+
+def shard_path(data_dir: Path, year: int, codec: str) -> Path:
+    return data_dir / f"{year}.jsonl.{codec}"
+
+def repack_source(source: Path, codec: str = "zst", keep: bool = False) -> Dict[str, int]:
+    """
+    Rewrite one year folder / ZIP as a block-compressed JSONL shard plus its
+    offset index, then delete the input unless keep. Awards are minified on
+    the way; undecodable ones are counted and left out of the shard, and
+    the input is then kept regardless so they are not lost.
+    """
+    year     = source_year(source)
+    shard    = shard_path(source.parent, year, codec)
+    idx_path = shard_index_path(shard)
+    tmp      = shard.with_name(shard.name + ".tmp")
+    tmp_idx  = idx_path.with_name(f"{year}.tmp.idx.npz")
+    compress = _compressor(codec)
+    decode   = make_decoder()
+
+    ids: List[str] = []
+    crcs, blocks, starts, lengths = [], [], [], []
+    block_offset, block_size = [], []
+    pending: List[bytes] = []
+    pending_bytes = errors = bytes_read = 0
+
+    with open(tmp, "wb") as out:
+        def flush():
+            nonlocal pending, pending_bytes
+            data = compress(b"".join(pending))
+            block_offset.append(out.tell())
+            block_size.append(len(data))
+            out.write(data)
+            pending, pending_bytes = [], 0
+
+        for award in iter_award_paths(source):
+            raw = award.read_bytes()
+            bytes_read += len(raw)
+            try:
+                doc = decode(raw)
+            except Exception:
+                errors += 1
+                continue
+            line = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            ids.append(str(doc.get("awd_id") or Path(award.name).stem))
+            crcs.append(zlib.crc32(line))
+            blocks.append(len(block_offset))
+            starts.append(pending_bytes)
+            lengths.append(len(line))
+            pending.append(line + b"\n")
+            pending_bytes += len(line) + 1
+            if pending_bytes >= BLOCK_SIZE:
+                flush()
+        if pending:
+            flush()
+
+    awd_id = np.array(ids, dtype=str)
+    np.savez(
+        tmp_idx,
+        awd_id=awd_id,
+        crc=np.array(crcs, dtype=np.uint32),
+        block=np.array(blocks, dtype=np.int32),
+        start=np.array(starts, dtype=np.int64),
+        length=np.array(lengths, dtype=np.int64),
+        order=np.argsort(awd_id, kind="stable"),
+        block_offset=np.array(block_offset, dtype=np.int64),
+        block_size=np.array(block_size, dtype=np.int64),
+        shard_size=np.int64(tmp.stat().st_size),
+    )
+    os.replace(tmp, shard)
+    os.replace(tmp_idx, idx_path)
+
+    for other in ("zst", "gz"):
+        if other != codec:
+            shard_path(source.parent, year, other).unlink(missing_ok=True)
+    if not keep and not errors:
+        if source.is_dir():
+            shutil.rmtree(source)
+        else:
+            source.unlink()
+    return {"awards": len(ids), "errors": errors, "bytes_read": bytes_read, "bytes_written": shard.stat().st_size}
+
+def _is_current(source: Path, codec: str) -> bool:
+    shard = shard_path(source.parent, source_year(source), codec)
+    return (shard.exists() and shard_index_path(shard).exists()
+            and shard.stat().st_mtime_ns >= source.stat().st_mtime_ns)
+
+def repack_all(
+    data_dir: Path,
+    years: Optional[List[int]] = None,
+    codec: Optional[str] = None,
+    keep: bool = False,
+    max_workers: int = None,
+) -> Dict[str, int]:
+    """
+    Repack every year folder / ZIP under data_dir that has no shard newer
+    than itself, one worker process per year.
+    """
+    codec   = codec or default_codec()
+    sources = [s for s in find_sources(data_dir, shards=False) if years is None or source_year(s) in years]
+    todo    = [s for s in sources if not _is_current(s, codec)]
+    totals  = {"awards": 0, "errors": 0, "bytes_read": 0, "bytes_written": 0}
+    kept: List[str] = []  # inputs not deleted because some awards failed to decode
+    with ProcessPoolExecutor(max_workers=max_workers) as exe:
+        work = partial(repack_source, codec=codec, keep=keep)
+        for source, stats in zip(todo, tqdm(exe.map(work, todo), total=len(todo), desc=f"Repacking (.{codec})")):
+            for k in totals:
+                totals[k] += stats[k]
+            if stats["errors"] and not keep:
+                kept.append(source.name)
+    if todo:
+        ratio = totals["bytes_written"] / totals["bytes_read"] if totals["bytes_read"] else 0
+        print(f"✔ Repacked {len(todo)} years: {totals['awards']:,} awards, "
+              f"{totals['bytes_read'] / 2**20:.1f} MiB of JSON → {totals['bytes_written'] / 2**20:.1f} MiB ({ratio:.1%})")
+    if totals["errors"]:
+        print(f"[Warning] {totals['errors']} awards could not be decoded and are not in the shards"
+              + (f"; kept {', '.join(kept)} so they are not lost" if kept else ""))
+    return {
+        "items":         totals["awards"],
+        "errors":        totals["errors"],
+        "skipped":       len(sources) - len(todo),
+        "bytes_read":    totals["bytes_read"],
+        "bytes_written": totals["bytes_written"],
+        "workers":       max_workers or os.cpu_count(),
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="Repack award years into block-compressed JSONL shards with an awd_id index")
+    p.add_argument("--data-dir", default="data/awards")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("repack", help="repack year folders / ZIPs into {year}.jsonl.zst + {year}.idx.npz")
+    r.add_argument("--years",   type=int, nargs="*", default=None)
+    r.add_argument("--codec",   choices=["zst", "gz"], default=None, help="default: zst if zstandard is installed, else gz")
+    r.add_argument("--keep",    action="store_true", help="keep the input folder / ZIP")
+    r.add_argument("--workers", type=int, default=None)
+
+    g = sub.add_parser("get", help="print one award's JSON by awd_id")
+    g.add_argument("year",   type=int)
+    g.add_argument("awd_id")
+    args = p.parse_args()
+
+    data_dir = Path(args.data_dir)
+    if args.cmd == "repack":
+        repack_all(data_dir, args.years, args.codec, args.keep, args.workers)
+    else:
+        shard = next((s for s in (shard_path(data_dir, args.year, c) for c in ("zst", "gz")) if s.exists()), None)
+        if shard is None:
+            raise SystemExit(f"No shard for {args.year} under {data_dir}")
+        print(read_award(shard, args.awd_id).decode("utf-8"))
+
+if __name__ == "__main__":
+    main()
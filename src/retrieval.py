@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import math
+import random
+import argparse
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.text_index import INDEX_DIR, Segment, tokenize
+
+LEVELS    = ("directorate", "division", "program")
+DEFAULT_K = {"directorate": 3, "division": 5, "program": 20}
+
+# BM25 parameters
+K1 = 1.2
+B  = 0.75
+
+# Field weights: a node's own name counts most, descendants' names and
+# division missions less. Abstract terms enter as occurrences per award.
+NAME_WEIGHT     = 3.0
+CHILD_WEIGHT    = 1.0
+MISSION_WEIGHT  = 1.0
+ABSTRACT_WEIGHT = 0.5
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being between
+both but by can could did do does doing down during each few for from further had has have having
+he her here hers him his how i if in into is it its itself just me more most my no nor not of off
+on once only or other our out over own same she should so some such than that the their them then
+there these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours program programs division directorate office
+nsf research award project support
+""".split())
+
+def stem(tok: str) -> str:
+    """
+    Crude plural folding (particles → particle, studies → study) so
+    conversation wording meets NSF's singular program names.
+    """
+    if len(tok) > 4 and tok.endswith("ies"):
+        return tok[:-3] + "y"
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith(("ss", "us", "is")):
+        return tok[:-1]
+    return tok
+
+def analyze(text: Optional[str]) -> List[str]:
+    return [stem(t) for t in tokenize(text) if t not in STOPWORDS and len(t) > 1]
+
+def load_taxonomy(outputs_dir: Path) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[str, str]]:
+    """
+    taxonomy.json (directorate → division → [program]) and the division
+    missions merged into division_map.json by the mission scraper.
+    """
+    taxonomy = json.loads((outputs_dir / "taxonomy.json").read_text())
+    missions = {}
+    div_map_path = outputs_dir / "division_map.json"
+    if div_map_path.exists():
+        for name, entry in json.loads(div_map_path.read_text()).items():
+            if isinstance(entry, dict) and entry.get("mission"):
+                missions[name] = entry["mission"]
+    return taxonomy, missions
+
+def abstract_profiles(index_dir: Path, nodes: Dict[Tuple, int], vocab: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Abstract term counts per program from the text index, without reading
+    any award: each posting (term, award, tf) is expanded to the programs
+    its award rolls up to and summed.
+
+    Returns (node, term, tf) triplets plus awards per node; programs and
+    terms not in `nodes` / `vocab` are dropped (vocab grows with new terms).
+    """
+    meta  = json.loads((index_dir / "index.json").read_text())
+    parts = []
+    awards = np.zeros(max(nodes.values(), default=-1) + 1, dtype=np.float64)
+    for year in meta["segments"]:
+        seg     = Segment(index_dir / str(year))
+        n_terms = len(seg.term_str) - 1
+        blob    = seg.terms.tobytes().decode()
+        bounds  = seg.term_str.tolist()
+        term_map = np.full(n_terms, -1, dtype=np.int64)
+        for i in range(n_terms):
+            tok = blob[bounds[i]:bounds[i + 1]]
+            if tok in STOPWORDS or len(tok) < 2:
+                continue
+            term_map[i] = vocab.setdefault(stem(tok), len(vocab))
+        prog_map = np.array([nodes.get(tuple(p[:3]), -1) for p in seg.meta["programs"]] + [-1], dtype=np.int64)
+
+        # expand postings to (posting, program row) pairs through the doc → programs CSR
+        post_term = np.repeat(term_map, np.diff(seg.term_post))
+        docs  = np.asarray(seg.post_doc, dtype=np.int64)
+        off   = np.asarray(seg.doc_prog_off, dtype=np.int64)
+        per   = (off[1:] - off[:-1])[docs]
+        rep   = np.repeat(np.arange(len(docs)), per)
+        first = np.repeat(np.cumsum(per) - per, per)
+        rows  = np.asarray(seg.doc_prog)[off[docs][rep] + np.arange(len(rep)) - first]
+
+        node = prog_map[rows]
+        term = post_term[rep]
+        ok   = (node >= 0) & (term >= 0)
+        parts.append((node[ok], term[ok], np.asarray(seg.post_tf, dtype=np.float64)[rep][ok]))
+
+        award_nodes = prog_map[np.asarray(seg.doc_prog)]
+        np.add.at(awards, award_nodes[award_nodes >= 0], 1)
+
+    if not parts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), awards
+    node = np.concatenate([p[0] for p in parts])
+    term = np.concatenate([p[1] for p in parts])
+    tf   = np.concatenate([p[2] for p in parts])
+    keys, inv = np.unique(node * len(vocab) + term, return_inverse=True)
+    return keys // len(vocab), keys % len(vocab), np.bincount(inv, weights=tf), awards
+
+class Retriever:
+    """
+    BM25 over one pseudo-document per taxonomy node, scored level by
+    level (each level is its own collection for idf / length norms).
+
+      directorate  name + its divisions' names / missions + program names
+      division     name + mission + its program names
+      program      name (+ abstract terms of its awards, per award)
+
+    Postings are CSR arrays (term → nodes, precomputed BM25 weights), so a
+    query is one np.bincount over the postings of its terms.
+    """
+
+    def __init__(self, paths: List[Tuple[str, ...]], term_ids: Dict[str, int],
+                 node: np.ndarray, term: np.ndarray, tf: np.ndarray):
+        self.paths    = paths
+        self.term_ids = term_ids
+        self.level    = np.array([len(p) - 1 for p in paths], dtype=np.int8)
+        self._pos     = {p: i for i, p in enumerate(paths)}
+
+        # merge duplicate (node, term) entries, then order by term
+        n = len(paths)
+        keys, inv = np.unique(term * n + node, return_inverse=True)
+        tf   = np.bincount(inv, weights=tf)
+        term = keys // n
+        node = keys % n
+
+        doc_len = np.bincount(node, weights=tf, minlength=n)
+        weight  = np.zeros(len(tf))
+        for lvl in range(len(LEVELS)):
+            in_lvl = self.level == lvl
+            n_docs = int(in_lvl.sum())
+            if not n_docs:
+                continue
+            avg = doc_len[in_lvl].mean() or 1.0
+            sel = in_lvl[node]
+            df  = np.bincount(term[sel], minlength=len(term_ids))
+            idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = K1 * (1 - B + B * doc_len[node[sel]] / avg)
+            weight[sel] = idf[term[sel]] * tf[sel] * (K1 + 1) / (tf[sel] + norm)
+
+        self.offsets = np.searchsorted(term, np.arange(len(term_ids) + 1))
+        self.node    = node.astype(np.int32)
+        self.weight  = weight.astype(np.float32)
+
+    @classmethod
+    def from_outputs(cls, outputs_dir: Path = Path("outputs"), abstracts: bool = False,
+                     index_dir: Path = INDEX_DIR) -> "Retriever":
+        taxonomy, missions = load_taxonomy(Path(outputs_dir))
+        paths: List[Tuple[str, ...]] = []
+        for d, divisions in taxonomy.items():
+            paths.append((d,))
+            for v, programs in divisions.items():
+                paths.append((d, v))
+                paths.extend((d, v, p) for p in programs)
+        pos = {p: i for i, p in enumerate(paths)}
+
+        term_ids: Dict[str, int] = {}
+        node, term, tf = [], [], []
+
+        def add(path: Tuple[str, ...], text: Optional[str], w: float):
+            # a node's text also counts for each ancestor, at child weight
+            toks = Counter(analyze(text))
+            for depth in range(len(path), 0, -1):
+                i = pos[path[:depth]]
+                scale = w if depth == len(path) else CHILD_WEIGHT * w / NAME_WEIGHT
+                for t, c in toks.items():
+                    node.append(i)
+                    term.append(term_ids.setdefault(t, len(term_ids)))
+                    tf.append(c * scale)
+
+        for p in paths:
+            add(p, p[-1], NAME_WEIGHT)
+            if len(p) == 2 and p[1] in missions:
+                add(p, missions[p[1]], MISSION_WEIGHT)
+
+        node_a = np.array(node, dtype=np.int64)
+        term_a = np.array(term, dtype=np.int64)
+        tf_a   = np.array(tf, dtype=np.float64)
+
+        if abstracts:
+            programs = {p: i for p, i in pos.items() if len(p) == 3}
+            a_node, a_term, a_tf, awards = abstract_profiles(Path(index_dir), programs, term_ids)
+            # per-award rates, rolled up to divisions / directorates by their award totals
+            prog = np.array(list(programs.values()), dtype=np.int64)
+            for depth in (3, 2, 1):
+                ancestor = np.array([pos[p[:depth]] if len(p) >= depth else -1 for p in paths], dtype=np.int64)
+                totals   = np.bincount(ancestor[prog], weights=awards[prog], minlength=len(paths))
+                targets  = ancestor[a_node]
+                node_a = np.concatenate([node_a, targets])
+                term_a = np.concatenate([term_a, a_term])
+                tf_a   = np.concatenate([tf_a, ABSTRACT_WEIGHT * a_tf / np.maximum(totals[targets], 1)])
+
+        return cls(paths, term_ids, node_a, term_a, tf_a)
+
+    def scores(self, text: str) -> np.ndarray:
+        """
+        BM25 score of every node for `text` (query terms weighted 1 + log tf).
+        """
+        q = Counter(t for t in analyze(text) if t in self.term_ids)
+        if not q:
+            return np.zeros(len(self.paths))
+        idx, qw = [], []
+        for t, c in q.items():
+            tid = self.term_ids[t]
+            a, b = self.offsets[tid], self.offsets[tid + 1]
+            idx.append(np.arange(a, b))
+            qw.append(np.full(b - a, 1 + math.log(c)))
+        idx = np.concatenate(idx)
+        return np.bincount(self.node[idx], weights=self.weight[idx] * np.concatenate(qw), minlength=len(self.paths))
+
+    def shortlist(self, text: str, level: str = "program", k: Optional[int] = None,
+                  within: Optional[Iterable[str]] = None, scores: Optional[np.ndarray] = None) -> List[Tuple[Tuple[str, ...], float]]:
+        """
+        Top-k (path, score) at one level, optionally under a parent path.
+        Ties (including unmatched nodes) keep taxonomy order, which is
+        funding order, so the shortlist is always k long when possible.
+        """
+        scores = self.scores(text) if scores is None else scores
+        k      = DEFAULT_K[level] if k is None else k
+        cand   = np.flatnonzero(self.level == LEVELS.index(level))
+        if within:
+            prefix = tuple(within)
+            cand = cand[[self.paths[i][:len(prefix)] == prefix for i in cand.tolist()]] if len(cand) else cand
+        top = cand[np.argsort(-scores[cand], kind="stable")[:k]]
+        return [(self.paths[i], float(scores[i])) for i in top.tolist()]
+
+    def shortlist_all(self, text: str, k: Dict[str, int] = DEFAULT_K) -> Dict[str, List[Tuple[Tuple[str, ...], float]]]:
+        scores = self.scores(text)
+        return {lvl: self.shortlist(text, lvl, k.get(lvl, DEFAULT_K[lvl]), scores=scores) for lvl in LEVELS}
+
+    def children(self, within: Tuple[str, ...]) -> List[Tuple[str, ...]]:
+        depth = len(within) + 1
+        return [p for p in self.paths if len(p) == depth and p[:len(within)] == tuple(within)]
+
+def load_labels(path: Path) -> List[Dict]:
+    """
+    Labeled conversations, one JSON object per line:
+      {"text": "...", "directorate": "...", "division": "...", "program": "..."}
+    ("conversation" is accepted for "text"; division / program are optional).
+    """
+    out = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                ex = json.loads(line)
+                ex.setdefault("text", ex.get("conversation", ""))
+                out.append(ex)
+    return out
+
+def labels_from_awards(data_dir: Path, sample: int = 500, seed: int = 0) -> List[Dict]:
+    """
+    A labeled set from awards themselves: title + abstract as the text and
+    the award's first program as the label. When the retriever also uses
+    abstracts, sample years the index was not built from. A reservoir
+    sample, so memory is bounded by `sample`, not by the number of awards.
+    """
+    from src.decode import INDEX_FIELDS, make_decoder
+    from src.sources import find_sources, iter_award_paths
+
+    decode = make_decoder(INDEX_FIELDS)
+    rng    = random.Random(seed)
+    chosen: List[Dict] = []
+    seen   = 0  # eligible awards so far
+    for source in find_sources(Path(data_dir)):
+        for award in iter_award_paths(source):
+            try:
+                data = decode(award.read_bytes())
+            except Exception:
+                continue
+            pgms = [p for p in data.get("pgm_ele") or [] if (p.get("pgm_ele_name") or "").strip()]
+            d, v = (data.get("org_dir_long_name") or "").strip(), (data.get("org_div_long_name") or "").strip()
+            if not (d and v and pgms):
+                continue
+            seen += 1
+            slot = len(chosen) if len(chosen) < sample else rng.randrange(seen)
+            if slot >= sample:
+                continue
+            example = {
+                "text":        f"{data.get('awd_titl_txt') or ''}\n{data.get('awd_abstract_narration') or ''}",
+                "directorate": d,
+                "division":    v,
+                "program":     pgms[0]["pgm_ele_name"].strip(),
+            }
+            if slot == len(chosen):
+                chosen.append(example)
+            else:
+                chosen[slot] = example
+    rng.shuffle(chosen)
+    return chosen
+
+def evaluate(retriever: Retriever, examples: List[Dict], k: Dict[str, int] = DEFAULT_K) -> Dict[str, Dict]:
+    """
+    Recall@k per level, both over the whole level ("recall") and among the
+    true parent's children ("recall_in_parent", what the iterative prompt
+    sees once the parent is chosen), plus the option characters a prompt
+    would carry with and without the shortlist.
+    """
+    out = {}
+    for depth, lvl in enumerate(LEVELS, 1):
+        hits = in_parent = n = 0
+        full_chars = short_chars = 0
+        for ex in examples:
+            label = tuple(ex.get(l) for l in LEVELS[:depth])
+            if None in label or tuple(label) not in retriever._pos:
+                continue
+            n += 1
+            scores = retriever.scores(ex["text"])
+            top = retriever.shortlist(ex["text"], lvl, k[lvl], scores=scores)
+            hits += label in [p for p, _ in top]
+            within = retriever.shortlist(ex["text"], lvl, k[lvl], within=label[:-1], scores=scores)
+            in_parent += label in [p for p, _ in within]
+            full_chars  += sum(len(p[-1]) + 1 for p in retriever.children(label[:-1]))
+            short_chars += sum(len(p[-1]) + 1 for p, _ in within)
+        out[lvl] = {
+            "k":                k[lvl],
+            "examples":         n,
+            "recall":           round(hits / n, 4) if n else None,
+            "recall_in_parent": round(in_parent / n, 4) if n else None,
+            "options_chars":    round(full_chars / n, 1) if n else None,
+            "shortlist_chars":  round(short_chars / n, 1) if n else None,
+        }
+    return out
+
+def main():
+    p = argparse.ArgumentParser(description="BM25 candidate shortlists for hierarchical classification")
+    p.add_argument("--outputs",   default="outputs", help="directory with taxonomy.json / division_map.json")
+    p.add_argument("--abstracts", action="store_true", help="add award abstract terms from the text index")
+    p.add_argument("--index-dir", default=str(INDEX_DIR))
+    for lvl in LEVELS:
+        p.add_argument(f"--k-{lvl}", type=int, default=DEFAULT_K[lvl])
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("shortlist", help="shortlist for one conversation")
+    s.add_argument("text", help="conversation text, or @path to read it from a file")
+
+    e = sub.add_parser("eval", help="recall@k on a labeled set")
+    g = e.add_mutually_exclusive_group(required=True)
+    g.add_argument("--labels",      help="JSONL of {text, directorate, division, program}")
+    g.add_argument("--from-awards", help="label awards from a data dir by their first program")
+    e.add_argument("--sample", type=int, default=500)
+    e.add_argument("--json",   action="store_true")
+    args = p.parse_args()
+
+    k = {lvl: getattr(args, f"k_{lvl}") for lvl in LEVELS}
+    retriever = Retriever.from_outputs(Path(args.outputs), args.abstracts, Path(args.index_dir))
+
+    if args.cmd == "shortlist":
+        text = Path(args.text[1:]).read_text() if args.text.startswith("@") else args.text
+        for lvl, rows in retriever.shortlist_all(text, k).items():
+            print(f"{lvl}:")
+            for path, score in rows:
+                print(f"  {score:7.2f}  {' / '.join(path)}")
+        return
+
+    examples = load_labels(Path(args.labels)) if args.labels else labels_from_awards(Path(args.from_awards), args.sample)
+    result = evaluate(retriever, examples, k)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for lvl, r in result.items():
+        if not r["examples"]:
+            print(f"  {lvl:<12} no labeled examples")
+            continue
+        print(f"  {lvl:<12} recall@{r['k']:<3} {r['recall']:.3f}  in parent {r['recall_in_parent']:.3f}  "
+              f"options {r['options_chars']:.0f} → {r['shortlist_chars']:.0f} chars  (n={r['examples']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, IO, Iterator, Tuple
+
+# research*.json trees: nested dicts whose non-dict values are metrics.
+# The output format follows the file name:
+#   *.json            pretty, byte-identical to json.dumps(tree, indent=2)
+#   *.min.json        minified
+#   *.ndjson          one node per line: {"path": [...], "metrics": {...}}
+# each optionally compressed with a .gz or .zst suffix.
+
+def _compression(path: Path) -> str:
+    return path.suffix if path.suffix in (".gz", ".zst") else ""
+
+def _format(path: Path) -> str:
+    name = path.name
+    if _compression(path):
+        name = name[: -len(path.suffix)]
+    if name.endswith(".ndjson"):
+        return "ndjson"
+    if name.endswith(".min.json"):
+        return "min"
+    return "json"
+
+def open_text(path: Path, mode: str = "r") -> IO[str]:
+    """
+    Open path as UTF-8 text, transparently (de)compressing .gz / .zst.
+    zstd needs the optional `zstandard` package.
+    """
+    path = Path(path)
+    comp = _compression(path)
+    if comp == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    if comp == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Writing or reading .zst outputs requires `pip install zstandard`.")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8", buffering=1024 * 1024)
+
+def _is_leaf(node: Dict) -> bool:
+    return not any(isinstance(v, dict) for v in node.values())
+
+def _write_pretty(node: Dict, f: IO[str], level: int):
+    """
+    Emit node exactly as json.dumps(indent=2) would at this nesting level,
+    one subtree at a time; leaf nodes go through json.dumps directly.
+    """
+    if _is_leaf(node):
+        f.write(json.dumps(node, indent=2).replace("\n", "\n" + "  " * level))
+        return
+    pad = "  " * (level + 1)
+    f.write("{")
+    first = True
+    for k, v in node.items():
+        f.write(("\n" if first else ",\n") + pad + json.dumps(k) + ": ")
+        first = False
+        if isinstance(v, dict):
+            _write_pretty(v, f, level + 1)
+        else:
+            f.write(json.dumps(v))
+    f.write("\n" + "  " * level + "}")
+
+def _write_min(tree: Dict, f: IO[str]):
+    """
+    Minified JSON, encoded one top-level subtree at a time with the C encoder.
+    """
+    f.write("{")
+    for i, (k, v) in enumerate(tree.items()):
+        if i:
+            f.write(",")
+        f.write(json.dumps(k) + ":" + json.dumps(v, separators=(",", ":")))
+    f.write("}")
+
+def _write_ndjson(node: Dict, f: IO[str], path: Tuple[str, ...] = ()):
+    for k, v in node.items():
+        if isinstance(v, dict):
+            metrics = {mk: mv for mk, mv in v.items() if not isinstance(mv, dict)}
+            f.write(json.dumps({"path": list(path + (k,)), "metrics": metrics}, separators=(",", ":")))
+            f.write("\n")
+            _write_ndjson(v, f, path + (k,))
+
+def write_tree(tree: Dict, path: Path):
+    """
+    Stream a research tree to path in the format its name selects,
+    without ever building the whole document as one string.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fmt = _format(path)
+    with open_text(path, "w") as f:
+        if fmt == "ndjson":
+            _write_ndjson(tree, f)
+        elif fmt == "min":
+            _write_min(tree, f)
+        else:
+            _write_pretty(tree, f, 0)
+
+def _walk(node: Dict, path: Tuple[str, ...]) -> Iterator[Tuple[Tuple[str, ...], Dict]]:
+    for k, v in node.items():
+        if isinstance(v, dict):
+            yield path + (k,), {mk: mv for mk, mv in v.items() if not isinstance(mv, dict)}
+            yield from _walk(v, path + (k,))
+
+def iter_nodes(path: Path) -> Iterator[Tuple[Tuple[str, ...], Dict]]:
+    """
+    Yield (path, metrics) for every node in depth-first order, e.g.
+    (("Directorate for Geosciences", "Division Of Ocean Sciences"), {...}).
+    NDJSON files are streamed line by line; JSON files are loaded first.
+    """
+    path = Path(path)
+    with open_text(path) as f:
+        if _format(path) == "ndjson":
+            for line in f:
+                if line.strip():
+                    obj = json.loads(line)
+                    yield tuple(obj["path"]), obj["metrics"]
+            return
+        tree = json.load(f, object_pairs_hook=OrderedDict)
+    yield from _walk(tree, ())
+
+def load_tree(path: Path) -> Dict:
+    """
+    Read a research tree written in any supported format.
+    """
+    tree: Dict = OrderedDict()
+    for node_path, metrics in iter_nodes(path):
+        parent = tree
+        for key in node_path[:-1]:
+            parent = parent[key]
+        parent[node_path[-1]] = OrderedDict(metrics)
+    return tree
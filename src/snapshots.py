@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+from tqdm import tqdm
+
+import numpy as np
+
+from src import aggregator, mappings
+from src.aggregator import LEVEL_DIMS, HierarchyBuilder
+from src.ingest import aggregate_source
+from src.mappings import MapBuilder
+from src.parse_cache import parser_fingerprint
+from src.sources import find_sources, source_stamp, source_year
+
+SNAPSHOT_DIR = Path("data/cache/snapshots")
+
+TABLE_NAMES      = ("keys", "years", "counts", "sums")
+OBLIGATION_NAMES = TABLE_NAMES + ("shares",)
+
+# Bump when the on-disk layout below changes
+SNAPSHOT_FORMAT = "year-snapshot-v2"
+
+# data/cache/snapshots/{year}.npz, one per award year:
+#   h{depth}_keys / _years / _counts / _sums   the year's HierarchyBuilder tables
+#                                              (depth 1..3, codes into vocab)
+#   o{depth}_keys / ... / _shares              its obligation-year tables
+#   meta   JSON: format, year, fingerprint, vocab, abbreviation maps + combos
+#
+# A snapshot is the partial (MapBuilder, HierarchyBuilder) pair a parse
+# worker returns for its year. Merging every year's snapshot in year order
+# is exactly what a full ingest does, so the outputs come out identical.
+
+@lru_cache(maxsize=None)
+def _code_fingerprint() -> str:
+    h = hashlib.sha256(SNAPSHOT_FORMAT.encode())
+    h.update(parser_fingerprint().encode())
+    for mod in (aggregator, mappings):
+        h.update(Path(mod.__file__).read_bytes())
+    return h.hexdigest()[:16]
+
+def source_fingerprint(source: Path) -> str:
+    """
+    Snapshot validity key: parse / aggregation code plus the source's
+    size and mtime (summed over award files for an extracted folder).
+    """
+    return f"{_code_fingerprint()}:{source.name}:{source_stamp(source)}"
+
+def snapshot_path(snapshot_dir: Path, year: int) -> Path:
+    return snapshot_dir / f"{year}.npz"
+
+def save_snapshot(snapshot_dir: Path, source: Path, partials: Sequence):
+    """
+    Store one year's partial sinks (as returned by aggregate_source);
+    written to a temp file and renamed so a crash never leaves half a snapshot.
+    """
+    hier = next((p for p in partials if isinstance(p, HierarchyBuilder)), None)
+    maps = next((p for p in partials if isinstance(p, MapBuilder)), None)
+    if hier is None or maps is None:
+        return
+    year = source_year(source)
+    vocab, parts, oparts = hier.__getstate__()
+    arrays = {}
+    for prefix, tables_by_depth, names in (("h", parts, TABLE_NAMES), ("o", oparts, OBLIGATION_NAMES)):
+        for depth in (1, 2, 3):
+            tables = tables_by_depth[depth] or [(np.zeros((0, depth), dtype=np.int64), np.zeros(0, dtype=np.int64),
+                                                 np.zeros(0, dtype=np.int64)) + (np.zeros(0),) * (len(names) - 3)]
+            for i, name in enumerate(names):
+                arrays[f"{prefix}{depth}_{name}"] = np.concatenate([t[i] for t in tables])
+    meta = {
+        "format":      SNAPSHOT_FORMAT,
+        "year":        year,
+        "fingerprint": source_fingerprint(source),
+        "vocab":       vocab,
+        "maps": {
+            "dir_map":  maps.dir_map,
+            "div_map":  maps.div_map,
+            "prog_map": maps.prog_map,
+            "combos":   sorted(maps.combos),
+        },
+    }
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(snapshot_dir, year)
+    tmp  = path.with_name(f"{year}.tmp.npz")
+    np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+
+def load_snapshot(snapshot_dir: Path, year: int) -> Tuple[dict, HierarchyBuilder, MapBuilder]:
+    """
+    (meta, HierarchyBuilder, MapBuilder) for one year.
+    """
+    with np.load(snapshot_path(snapshot_dir, year), allow_pickle=False) as z:
+        meta  = json.loads(str(z["meta"]))
+        parts, oparts = {}, {}
+        for prefix, out, names in (("h", parts, TABLE_NAMES), ("o", oparts, OBLIGATION_NAMES)):
+            for depth in (1, 2, 3):
+                table = tuple(z[f"{prefix}{depth}_{name}"] for name in names)
+                out[depth] = [table] if len(table[1]) else []
+
+    hier = HierarchyBuilder()
+    hier.__setstate__(({dim: meta["vocab"][dim] for dim in LEVEL_DIMS}, parts, oparts))
+    maps = MapBuilder()
+    maps.dir_map  = meta["maps"]["dir_map"]
+    maps.div_map  = meta["maps"]["div_map"]
+    maps.prog_map = meta["maps"]["prog_map"]
+    maps.combos   = {tuple(c) for c in meta["maps"]["combos"]}
+    return meta, hier, maps
+
+def is_current(snapshot_dir: Path, source: Path) -> bool:
+    path = snapshot_path(snapshot_dir, source_year(source))
+    if not path.exists():
+        return False
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            return json.loads(str(z["meta"])).get("fingerprint") == source_fingerprint(source)
+    except (OSError, ValueError, KeyError):
+        return False
+
+def refresh_snapshots(
+    data_dir: Path,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    years: Optional[Iterable[int]] = None,
+    force: Iterable[int] = (),
+    cache_dir: Optional[Path] = None,
+    max_workers: int = None,
+) -> Tuple[MapBuilder, HierarchyBuilder, dict]:
+    """
+    Re-parse the `force` years plus any year in `years` whose snapshot is
+    missing or stale, save their snapshots, then merge every year's
+    snapshot (in year order) into one MapBuilder / HierarchyBuilder.
+    """
+    wanted  = set(years) if years is not None else None
+    force   = set(force)
+    if wanted is not None and force - wanted:
+        span = f"{min(wanted)}..{max(wanted)}" if wanted else "an empty range"
+        raise ValueError(f"Refresh years {sorted(force - wanted)} are outside {span}")
+    sources = [s for s in find_sources(data_dir) if wanted is None or source_year(s) in wanted]
+    missing = force - {source_year(s) for s in sources}
+    if missing:
+        raise FileNotFoundError(f"No award source for {sorted(missing)} under {data_dir}")
+    todo = [s for s in sources if source_year(s) in force or not is_current(snapshot_dir, s)]
+
+    counters = {"items": 0, "records": 0, "errors": 0, "skipped": 0, "parsed_years": [source_year(s) for s in todo]}
+    if todo:
+        work = partial(aggregate_source, sink_types=[MapBuilder, HierarchyBuilder],
+                       with_rows=False, cache_dir=cache_dir)
+        with ProcessPoolExecutor(max_workers=max_workers) as exe:
+            for source, (partials, _, stats) in zip(
+                todo, tqdm(exe.map(work, todo), total=len(todo), desc="Parsing years")
+            ):
+                save_snapshot(snapshot_dir, source, partials)
+                counters["items"]   += stats["awards"]
+                counters["records"] += stats["records"]
+                counters["errors"]  += stats["errors"]
+                counters["skipped"] += stats["skipped"]
+
+    maps, hier = MapBuilder(), HierarchyBuilder()
+    for source in sources:
+        _, h, m = load_snapshot(snapshot_dir, source_year(source))
+        maps.merge(m)
+        hier.merge(h)
+    counters["years"] = len(sources)
+    print(f"Merged {len(sources)} year snapshots ({len(todo)} re-parsed: {counters['parsed_years']})")
+    return maps, hier, counters
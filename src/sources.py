@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import zipfile
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+
+SHARD_SUFFIXES = (".jsonl.zst", ".jsonl.gz")
+READ_BUFFER    = 4 * 1024 * 1024
+
+class ShardAward:
+    """
+    One award line of a repacked year shard (see src/repack.py), already
+    decompressed; quacks like a Path for .name / .read_bytes() / .read_text().
+    """
+    __slots__ = ("name", "year", "crc", "_data")
+
+    def __init__(self, name: str, year: int, crc: int, data: bytes):
+        self.name  = name
+        self.year  = year
+        self.crc   = crc
+        self._data = data
+
+    def read_bytes(self) -> bytes:
+        return self._data
+
+    def read_text(self, encoding: str = "utf-8") -> str:
+        return self._data.decode(encoding)
+
+# An award document is a file on disk, a member inside a year ZIP or a line
+# of a year shard; all expose .name, .read_bytes() and .read_text().
+AwardPath = Union[Path, zipfile.Path, ShardAward]
+
+def source_year(source: Path) -> Optional[int]:
+    """
+    Infer the award year from a source name:
+      data/awards/2025.zip        → 2025
+      data/awards/2025/           → 2025
+      data/awards/2025.jsonl.zst  → 2025
+    """
+    try:
+        return int(source.name.split(".", 1)[0])
+    except ValueError:
+        return None
+
+def award_year(award: AwardPath) -> Optional[int]:
+    """
+    Year for a single award document: the archive name for ZIP members,
+    the parent folder name for extracted files.
+    """
+    if isinstance(award, ShardAward):
+        return award.year
+    if isinstance(award, zipfile.Path):
+        return source_year(Path(award.root.filename))
+    try:
+        return int(award.parent.name)
+    except ValueError:
+        return None
+
+def award_fingerprint(award: AwardPath) -> str:
+    """
+    Cheap change-detection key for one award document: name, CRC-32 and
+    size from the ZIP central directory for archive members (no
+    decompression), name, size and mtime for extracted files, name, CRC-32
+    and length from the shard index for shard lines.
+    """
+    if isinstance(award, ShardAward):
+        return f"{award.name}:{award.crc:08x}:{len(award.read_bytes())}"
+    if isinstance(award, zipfile.Path):
+        info = award.root.getinfo(award.at)
+        return f"{info.filename}:{info.CRC:08x}:{info.file_size}"
+    st = award.stat()
+    return f"{award.name}:{st.st_size}:{st.st_mtime_ns}"
+
+def source_stamp(source: Path) -> str:
+    """
+    Cheap change-detection key for a whole year source: size and mtime of
+    a ZIP / shard, or the award file count, total size and newest mtime of
+    an extracted folder (whose own mtime does not change when a file in it
+    is edited).
+    """
+    if source.is_dir():
+        files = list(source.rglob("*.json"))
+        size  = sum(f.stat().st_size for f in files)
+        mtime = max((f.stat().st_mtime_ns for f in files), default=0)
+        return f"{len(files)}:{size}:{mtime}"
+    st = source.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def is_shard(source: Path) -> bool:
+    return source.name.endswith(SHARD_SUFFIXES)
+
+def shard_index_path(shard: Path) -> Path:
+    return shard.with_name(f"{source_year(shard)}.idx.npz")
+
+def find_sources(data_dir: Path, shards: bool = True) -> List[Path]:
+    """
+    Return one award source per year under data_dir, sorted by year:
+    a repacked shard data_dir/{year}.jsonl.zst (or .gz), an extracted
+    folder data_dir/{year}/ or an archive data_dir/{year}.zip, preferred
+    in that order when a year has several (a shard only while nothing
+    newer sits next to it). shards=False ignores shards
+    (the inputs src/repack.py works from).
+    """
+    by_year = {}
+    for zp in data_dir.glob("*.zip"):
+        year = source_year(zp)
+        if year is not None:
+            by_year[year] = zp
+    for d in data_dir.iterdir() if data_dir.exists() else []:
+        year = source_year(d)
+        if d.is_dir() and year is not None:
+            by_year[year] = d
+    for suffix in reversed(SHARD_SUFFIXES) if shards else ():
+        for shard in data_dir.glob(f"*{suffix}"):
+            year  = source_year(shard)
+            other = by_year.get(year)
+            if year is None or not shard_index_path(shard).exists():
+                continue
+            # a folder / ZIP newer than the shard (e.g. a fresh download) wins until repacked
+            if other is None or other.stat().st_mtime_ns <= shard.stat().st_mtime_ns:
+                by_year[year] = shard
+    return [by_year[y] for y in sorted(by_year)]
+
+def _decompress(shard: Path, block: bytes) -> bytes:
+    """
+    Decompress one independently compressed shard block
+    (a zstd frame or a gzip member). zstd needs `zstandard`.
+    """
+    if shard.name.endswith(".gz"):
+        return gzip.decompress(block)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading .jsonl.zst award shards requires `pip install zstandard`.")
+    return zstandard.ZstdDecompressor().decompress(block)
+
+def load_shard_index(shard: Path) -> dict:
+    """
+    The shard's offset index as arrays (see src/repack.py for the layout),
+    checked against the shard's size so a stale index is never trusted.
+    """
+    with np.load(shard_index_path(shard), allow_pickle=False) as z:
+        index = {k: z[k] for k in z.files}
+    if int(index["shard_size"]) != shard.stat().st_size:
+        raise ValueError(f"{shard_index_path(shard).name} does not match {shard.name}; repack the year again")
+    return index
+
+def iter_shard(shard: Path) -> Iterator[ShardAward]:
+    """
+    Stream a shard front to back: each compressed block is one large
+    sequential read, decompressed and split into award lines.
+    """
+    index = load_shard_index(shard)
+    year  = source_year(shard)
+    ids, crcs, starts, lengths = index["awd_id"], index["crc"], index["start"], index["length"]
+    bounds = np.searchsorted(index["block"], np.arange(len(index["block_size"]) + 1))
+    with open(shard, "rb", buffering=READ_BUFFER) as f:
+        for b, size in enumerate(index["block_size"].tolist()):
+            data = _decompress(shard, f.read(size))
+            for i in range(bounds[b], bounds[b + 1]):
+                s = int(starts[i])
+                yield ShardAward(f"{ids[i]}.json", year, int(crcs[i]), data[s:s + int(lengths[i])])
+
+def read_award(shard: Path, awd_id: str) -> bytes:
+    """
+    Random access to one award's JSON by awd_id: a binary search in the
+    index, then a single block read and decompress.
+    """
+    index = load_shard_index(shard)
+    order = index["order"]
+    pos   = np.searchsorted(index["awd_id"][order], awd_id)
+    if pos == len(order) or index["awd_id"][order[pos]] != awd_id:
+        raise KeyError(awd_id)
+    i = order[pos]
+    b = int(index["block"][i])
+    with open(shard, "rb") as f:
+        f.seek(int(index["block_offset"][b]))
+        data = _decompress(shard, f.read(int(index["block_size"][b])))
+    s = int(index["start"][i])
+    return data[s:s + int(index["length"][i])]
+
+def iter_award_paths(source: Path) -> Iterator[AwardPath]:
+    """
+    Yield every award JSON in a source. ZIP members are read in place
+    through zipfile.Path, so nothing is unpacked to disk; shards are
+    streamed block by block.
+    """
+    if is_shard(source):
+        yield from iter_shard(source)
+        return
+    if source.is_dir():
+        yield from sorted(source.rglob("*.json"))
+        return
+
+    with zipfile.ZipFile(source) as zf:
+        for name in zf.namelist():
+            if name.endswith(".json"):
+                yield zipfile.Path(zf, at=name)
+
+def count_awards(source: Path) -> int:
+    """
+    Number of award JSONs in a source, read from the ZIP central directory
+    (or the shard index) rather than by decompressing anything.
+    """
+    if is_shard(source):
+        with np.load(shard_index_path(source), allow_pickle=False) as z:
+            return len(z["awd_id"])
+    if source.is_dir():
+        return sum(1 for _ in source.rglob("*.json"))
+    with zipfile.ZipFile(source) as zf:
+        return sum(1 for n in zf.namelist() if n.endswith(".json"))
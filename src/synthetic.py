@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import random
+import zipfile
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from tqdm import tqdm
+
+# (dir_abbr, directorate, [(div_abbr, division, [(pgm_code, program), ...]), ...])
+# Long names keep NSF's own spelling and truncation quirks.
+TAXONOMY = [
+    ("GEO", "Directorate for Geosciences", [
+        ("AGS", "Division of Atmospheric and Geospace Sciences", [
+            ("1525", "Climate & Large-Scale Dynamics"), ("1521", "Atmospheric Chemistry"),
+            ("1523", "Magnetospheric Physics"), ("5740", "Paleo Perspectives on Climate")]),
+        ("OCE", "Division Of Ocean Sciences", [
+            ("1610", "Physical Oceanography"), ("1650", "Biological Oceanography"),
+            ("1670", "Chemical Oceanography"), ("1620", "Marine Geology and Geophysics")]),
+        ("EAR", "Division Of Earth Sciences", [
+            ("1574", "Geophysics"), ("1571", "Petrology and Geochemistry"), ("7459", "Hydrologic Sciences")]),
+    ]),
+    ("MPS", "Direct For Mathematical & Physical Scien", [
+        ("DMS", "Division Of Mathematical Sciences", [
+            ("1281", "ANALYSIS PROGRAM"), ("1267", "TOPOLOGY"), ("1264", "ALGEBRA,NUMBER THEORY,AND COM"),
+            ("1269", "STATISTICS")]),
+        ("PHY", "Division Of Physics", [
+            ("1221", "ELEMENTARY PARTICLE THEORY"), ("1286", "ELEMENTARY PARTICLE"), ("1241", "ATOMIC MOLECULAR & OPTICAL")]),
+        ("CHE", "Division Of Chemistry", [
+            ("6878", "Chemical Synthesis"), ("6881", "Chemical Theory, Models and Comput."), ("6880", "Chemical Measurement & Imaging")]),
+        ("DMR", "Division Of Materials Research", [
+            ("1710", "CONDENSED MATTER PHYSICS"), ("1773", "POLYMERS"), ("1762", "CERAMICS")]),
+    ]),
+    ("CSE", "Direct For Computer & Info Scie & Enginr", [
+        ("IIS", "Div Of Information & Intelligent Systems", [
+            ("7495", "Robust Intelligence"), ("7367", "HCC-Human-Centered Computing"), ("7364", "Info Integration & Informatics")]),
+        ("CCF", "Division of Computing and Communication Foundations", [
+            ("7796", "Algorithmic Foundations"), ("7798", "Software & Hardware Foundation"), ("7797", "Comm & Information Foundations")]),
+        ("CNS", "Division Of Computer and Network Systems", [
+            ("7354", "CSR-Computer Systems Research"), ("8060", "Secure &Trustworthy Cyberspace")]),
+    ]),
+    ("BIO", "Directorate for Biological Sciences", [
+        ("DEB", "Division Of Environmental Biology", [
+            ("1181", "ECOSYSTEM STUDIES"), ("1127", "Systematics & Biodiversity Sci"), ("7378", "EVOLUTIONARY ECOLOGY")]),
+        ("MCB", "Div Of Molecular and Cellular Bioscience", [
+            ("1112", "Genetic Mechanisms"), ("1144", "Molecular Biophysics")]),
+        ("IOS", "Division Of Integrative Organismal Systems", [
+            ("7658", "Physiol Mechs & Biomechanics"), ("1329", "Plant Genome Research Project")]),
+    ]),
+    ("ENG", "Directorate For Engineering", [
+        ("CMMI", "Div Of Civil, Mechanical, & Manufact Inn", [
+            ("1630", "Mechanics of Materials and Str"), ("1637", "Dynamics, Control and System D")]),
+        ("ECCS", "Div Of Electrical, Commun & Cyber Sys", [
+            ("7564", "CCSS-Comms Circuits & Sens Sys"), ("1517", "EPMD-ElectrnPhoton&MagnDevices")]),
+        ("IIP", "Div Of Industrial Innovation & Partnersh", [
+            ("5371", "SBIR Phase I"), ("5373", "SBIR Phase II")]),
+    ]),
+    ("SBE", "Direct For Social, Behav & Economic Scie", [
+        ("SES", "Divn Of Social and Economic Sciences", [
+            ("1320", "Economics"), ("1371", "Political Science")]),
+        ("BCS", "Division Of Behavioral and Cognitive Sci", [
+            ("1311", "Linguistics"), ("7252", "Perception, Action & Cognition")]),
+    ]),
+    ("EDU", "Directorate for STEM Education", [
+        ("DUE", "Division Of Undergraduate Education", [
+            ("1536", "S-STEM-Schlr Sci Tech Eng&Math"), ("1998", "IUSE")]),
+        ("DGE", "Division Of Graduate Education", [
+            ("7172", "NSF Research Traineeship (NRT)"), ("8069", "GRADUATE RESEARCH FELLOWSHIPS")]),
+    ]),
+    ("O/D", "Office Of The Director", [
+        ("OIA", "Office of Integrative Activities", [
+            ("7222", "EPSCoR Research Infrastructure"), ("9150", "EPSCoR Co-Funding")]),
+        ("OISE", "Office Of Internatl Science &Engineering", [
+            ("7727", "IRES Track I: IRES Sites (IS)")]),
+    ]),
+]
+
+PGM_REFS = [
+    ("9150", "EXP PROG TO STIM COMP RES"), ("7433", "CyberInfra Frmwrk 21st (CIF21)"),
+    ("1045", "CAREER-Faculty Erly Career Dev"), ("9102", "WOMEN, MINORITY, DISABLED, NEC"),
+    ("8084", "CDS&E"), ("7218", "RET SUPPLEMENTS"), ("9251", "REU SUPP-Res Exp for Ugrd Supp"),
+]
+INSTRUMENTS = ["Standard Grant", "Continuing Grant", "Fellowship Award", "Cooperative Agreement"]
+STATES = [("CA", "California"), ("NY", "New York"), ("TX", "Texas"), ("MA", "Massachusetts"),
+          ("IL", "Illinois"), ("CO", "Colorado"), ("WA", "Washington"), ("GA", "Georgia")]
+INST_WORDS  = ["Northern", "Central", "Pacific", "Atlantic", "Mountain", "River", "Lake", "Valley"]
+FIRST_NAMES = ["Ada", "Alan", "Grace", "Marie", "Niels", "Rosalind", "Emmy", "Carl", "Lise", "Srinivasa"]
+LAST_NAMES  = ["Lovelace", "Turing", "Hopper", "Curie", "Bohr", "Franklin", "Noether", "Sagan", "Meitner", "Ramanujan"]
+WORDS = (
+    "the of and to in a for on with by is that this project will research data model models "
+    "analysis system systems new study understanding approach methods climate ocean quantum "
+    "neural network networks learning graph algorithms materials cells protein dynamics energy "
+    "students training broader impacts community scientific theory experiments measurements "
+    "sediment ice core particle topology algebra survey sensor imaging observations"
+).split()
+
+def _taxonomy_index() -> List[Tuple]:
+    """
+    Flat [(dir_abbr, directorate, div_abbr, division, programs)] list.
+    """
+    return [(da, dl, va, vl, progs) for da, dl, divs in TAXONOMY for va, vl, progs in divs]
+
+def make_award(rng: random.Random, year: int, seq: int, programs: int = 3, abstract_words: int = 250) -> Dict:
+    """
+    One award document with the same shape as NSF's award JSON export:
+    every field parse_award / flatten_award_file read, plus nested PI,
+    institution, program and obligation blocks. Optional fields are
+    occasionally missing, null or empty, as in the real files.
+    """
+    da, dl, va, vl, progs = rng.choice(_taxonomy_index())
+    n_pgm  = rng.randint(1, max(1, min(programs, len(progs))))
+    pgms   = rng.sample(progs, n_pgm)
+    amount = rng.choice([1, 2, 5, 10]) * rng.randint(10, 300) * 1000
+    state, state_name = rng.choice(STATES)
+    inst_name = f"University of {rng.choice(INST_WORDS)} {state_name}"
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    month = rng.randint(1, 12)
+
+    award = {
+        "awd_id":                   f"{year % 100:02d}{seq:05d}",
+        "agcy_id":                  "NSF",
+        "tran_type":                "Grant",
+        "awd_istr_txt":             rng.choice(INSTRUMENTS),
+        "awd_titl_txt":             " ".join(rng.choices(WORDS[12:], k=rng.randint(5, 14))).capitalize(),
+        "fed_awd_id":               None,
+        "cfda_num":                 "47.050",
+        "org_code":                 f"{rng.randint(1000000, 9999999):08d}",
+        "po_phone":                 f"703292{rng.randint(1000, 9999)}",
+        "po_email":                 f"{last.lower()}@nsf.gov",
+        "po_sign_block_name":       f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "awd_eff_date":             f"{year}-{month:02d}-01",
+        "awd_exp_date":             f"{year + rng.randint(1, 5)}-{month:02d}-28",
+        "tot_intn_awd_amt":         amount,
+        "awd_amount":               amount if rng.random() < 0.8 else amount // 2,
+        "awd_min_amd_letter_date":  f"{year}-{month:02d}-{rng.randint(1, 28):02d}",
+        "awd_max_amd_letter_date":  f"{year + rng.randint(0, 3)}-{month:02d}-{rng.randint(1, 28):02d}",
+        "awd_abstract_narration":   " ".join(rng.choices(WORDS, k=abstract_words)),
+        "awd_arra_amount":          "0.00" if rng.random() < 0.95 else f"{amount / 2:.2f}",
+        "dir_abbr":                 da,
+        "org_dir_long_name":        dl,
+        "div_abbr":                 va,
+        "org_div_long_name":        vl,
+        "awd_agcy_code":            "4900",
+        "fund_agcy_code":           "4900",
+        "pi": [
+            {
+                "pi_role":          role,
+                "pi_first_name":    f,
+                "pi_last_name":     l,
+                "pi_mid_init":      None,
+                "pi_sufx_name":     "",
+                "pi_full_name":     f"{f} {l}",
+                "pi_email_addr":    f"{f[0].lower()}{l.lower()}@example.edu",
+                "nsf_id":           f"{rng.randint(0, 999999999):09d}",
+                "pi_start_date":    f"{year}-{month:02d}-01",
+                "pi_end_date":      None,
+            }
+            for role, f, l in [("Principal Investigator", first, last)] + [
+                ("Co-Principal Investigator", rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+                for _ in range(rng.randint(0, 3))
+            ]
+        ],
+        "inst": {
+            "inst_name":            inst_name,
+            "inst_street_address":  f"{rng.randint(1, 999)} College Ave",
+            "inst_city_name":       rng.choice(INST_WORDS) + " City",
+            "inst_state_code":      state,
+            "inst_state_name":      state_name,
+            "inst_phone_num":       f"555{rng.randint(1000000, 9999999)}",
+            "inst_zip_code":        f"{rng.randint(10000, 99999)}{rng.randint(1000, 9999)}",
+            "inst_country_name":    "United States",
+            "cong_dist_code":       f"{rng.randint(1, 40):02d}",
+            "st_cong_dist_code":    f"{state}{rng.randint(1, 40):02d}",
+            "org_lgl_bus_name":     inst_name.upper(),
+            "org_uei_num":          "".join(rng.choices("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789", k=12)),
+        },
+        "perf_inst": {
+            "perf_inst_name":       inst_name,
+            "perf_str_addr":        f"{rng.randint(1, 999)} Research Pkwy",
+            "perf_city_name":       rng.choice(INST_WORDS) + " City",
+            "perf_st_code":         state,
+            "perf_st_name":         state_name,
+            "perf_zip_code":        f"{rng.randint(10000, 99999)}{rng.randint(1000, 9999)}",
+            "perf_ctry_code":       "US",
+            "perf_ctry_name":       "United States",
+        },
+        "pgm_ele": [{"pgm_ele_code": c, "pgm_ele_name": n} for c, n in pgms],
+        "pgm_ref": [{"pgm_ref_code": c, "pgm_ref_txt": t} for c, t in rng.sample(PGM_REFS, rng.randint(0, 3))],
+        "app_fund": [{
+            "app_code":     "0100",
+            "app_name":     "NSF RESEARCH & RELATED ACTIVIT",
+            "app_symb_id":  "040100",
+            "fund_code":    f"01{year % 100:02d}DB",
+            "fund_name":    "NSF RESEARCH & RELATED ACTIVIT",
+            "fund_symb_id": "040100",
+        }],
+        "oblg_fy": [
+            {"fund_oblg_fiscal_yr": year + k, "fund_oblg_amt": amount // (k + 2)}
+            for k in range(rng.randint(1, 4))
+        ],
+        "por": None,
+    }
+
+    # the messiness real files have
+    r = rng.random()
+    if r < 0.02:
+        award["pgm_ele"] = []                        # dropped by the parser
+    elif r < 0.03:
+        award["tot_intn_awd_amt"] = None             # dropped by the parser
+    if rng.random() < 0.10:
+        award["inst"]["inst_street_address_2"] = "Suite " + str(rng.randint(100, 999))
+    if rng.random() < 0.05:
+        del award["perf_inst"]["perf_zip_code"]
+    return award
+
+def write_year(
+    out_dir: Path,
+    year: int,
+    awards: int,
+    programs: int = 3,
+    abstract_words: int = 250,
+    fmt: str = "zip",
+    seed: int = 0,
+) -> Path:
+    """
+    Write one synthetic year as data/awards-style {year}.zip (one JSON per
+    award) or a {year}/ folder. Deterministic for a given seed and year.
+    """
+    rng = random.Random(seed * 100003 + year)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    docs = (make_award(rng, year, i, programs, abstract_words) for i in range(awards))
+
+    if fmt == "dir":
+        dest = out_dir / str(year)
+        dest.mkdir(exist_ok=True)
+        for doc in docs:
+            (dest / f"{doc['awd_id']}.json").write_text(json.dumps(doc))
+        return dest
+
+    dest = out_dir / f"{year}.zip"
+    tmp  = dest.with_suffix(".zip.tmp")
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zf:
+        for doc in docs:
+            zf.writestr(f"{doc['awd_id']}.json", json.dumps(doc))
+    tmp.replace(dest)
+    return dest
+
+def generate(
+    out_dir: Path,
+    years: range,
+    awards: int,
+    programs: int = 3,
+    abstract_words: int = 250,
+    fmt: str = "zip",
+    seed: int = 0,
+    max_workers: int = None,
+) -> List[Path]:
+    """
+    Generate a synthetic corpus, one year per worker process.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as exe:
+        futures = [
+            exe.submit(write_year, Path(out_dir), y, awards, programs, abstract_words, fmt, seed)
+            for y in years
+        ]
+        return [f.result() for f in tqdm(futures, desc="Generating years")]
+
+def main():
+    p = argparse.ArgumentParser(description="Generate a synthetic NSF award corpus")
+    p.add_argument("out_dir",          help="e.g. data/synthetic (use as DATA_DIR)")
+    p.add_argument("start",            type=int, help="first year")
+    p.add_argument("end",              type=int, help="last year")
+    p.add_argument("--awards",         type=int, default=1000, help="awards per year (default: 1000)")
+    p.add_argument("--programs",       type=int, default=3, help="max program elements per award (default: 3)")
+    p.add_argument("--abstract-words", type=int, default=250, help="words per abstract (default: 250)")
+    p.add_argument("--format",         choices=["zip", "dir"], default="zip",
+                   help="{year}.zip archives (default) or extracted {year}/ folders")
+    p.add_argument("--seed",           type=int, default=0)
+    args = p.parse_args()
+
+    paths = generate(Path(args.out_dir), range(args.start, args.end + 1), args.awards,
+                     args.programs, args.abstract_words, args.format, args.seed)
+    print(f"✔ Wrote {len(paths)} synthetic years to {args.out_dir}/")
+
+if __name__ == "__main__":
+    main()
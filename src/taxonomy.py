@@ -6,9 +6,12 @@ import csv
 from pathlib import Path
 from typing import Dict, Any
 
+from src.serialize import iter_nodes
+
 def generate_taxonomy(full_json_path: str, output_dir: str = "outputs") -> None:
     """
-    Reads the full hierarchy JSON and writes:
+    Reads the full hierarchy (research.json, or any format src/serialize.py
+    writes, e.g. research.ndjson.gz) and writes:
       - taxonomy.json: nested directorate → division → [programs]
       - taxonomy.tsv: flat table with columns directorate, division, program
     """
@@ -16,23 +19,16 @@ def generate_taxonomy(full_json_path: str, output_dir: str = "outputs") -> None:
     if not hier_path.exists():
         raise FileNotFoundError(f"{full_json_path} not found. Run main.py first.")
 
-    with hier_path.open() as f:
-        hierarchy: Dict[str, Any] = json.load(f)
-
-    # Build taxonomy
+    # Build taxonomy from the node paths alone (metrics are never kept);
+    # NDJSON hierarchies are streamed node by node
     taxonomy: Dict[str, Dict[str, list]] = {}
-    for directorate, divisions in hierarchy.items():
-        taxonomy[directorate] = {}
-        for division, programs in divisions.items():
-            # skip metric keys
-            if division.startswith(("num_awards_", "amt_awarded_")):
-                continue
-            # collect only program names
-            prog_list = [
-                p for p in programs.keys()
-                if not p.startswith(("num_awards_", "amt_awarded_"))
-            ]
-            taxonomy[directorate][division] = prog_list
+    for path, _ in iter_nodes(hier_path):
+        if len(path) == 1:
+            taxonomy[path[0]] = {}
+        elif len(path) == 2:
+            taxonomy[path[0]][path[1]] = []
+        elif len(path) == 3:
+            taxonomy[path[0]][path[1]].append(path[2])
 
     out_dir = Path(output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
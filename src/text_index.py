@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import argparse
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from tqdm import tqdm
+
+import numpy as np
+
+from src.decode import INDEX_FIELDS, make_decoder
+from src.sources import find_sources, iter_award_paths, source_stamp, source_year
+
+# Bump when the on-disk layout below changes
+INDEX_FORMAT = "text-index-v2"
+INDEX_DIR    = Path("outputs/index")
+
+# outputs/index/
+#   index.json                 format + list of year segments
+#   {year}/meta.json           source fingerprint, award ids, program table
+#   {year}/terms.npy           sorted terms, concatenated UTF-8 (uint8)
+#   {year}/term_str.npy        int64 [n_terms + 1] byte offsets into terms.npy
+#   {year}/term_post.npy       int64 [n_terms + 1] posting range per term
+#   {year}/term_pos.npy        int64 [n_terms + 1] positions range per term
+#   {year}/post_doc.npy        int32 doc per posting (sorted within a term)
+#   {year}/post_tf.npy         uint32 occurrences per posting
+#   {year}/positions.npy       uint16 token positions, per posting in order
+#   {year}/doc_prog.npy        int32 program rows per doc (CSR with doc_prog_off.npy)
+#
+# A doc is one award: its title followed by its abstract, with a one-token
+# gap so no phrase spans the two. Positions past MAX_POSITION are dropped.
+
+TAG_RE       = re.compile(r"<[^>]+>")
+TOKEN_RE     = re.compile(r"[a-z0-9]+")
+MAX_POSITION = 65535
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Lower-cased alphanumeric tokens, with HTML tags / entities (NSF
+    abstracts carry `&lt;br/&gt;`) removed first.
+    """
+    if not text:
+        return []
+    return TOKEN_RE.findall(TAG_RE.sub(" ", html.unescape(text)).lower())
+
+@lru_cache(maxsize=None)
+def index_fingerprint() -> str:
+    h = hashlib.sha256(INDEX_FORMAT.encode())
+    h.update(Path(__file__).read_bytes())
+    return h.hexdigest()[:16]
+
+def _source_fingerprint(source: Path) -> str:
+    return f"{index_fingerprint()}:{source.name}:{source_stamp(source)}"
+
+def build_segment(source: Path, out_dir: Path) -> Dict:
+    """
+    Index one year source into out_dir/{year}/, unless the segment already
+    matches the source's stamp (per award file for a folder) and this
+    module's code.
+    """
+    year    = source_year(source)
+    seg_dir = out_dir / str(year)
+    fp      = _source_fingerprint(source)
+    meta_path = seg_dir / "meta.json"
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("fingerprint") == fp:
+                return {"year": year, "docs": len(meta["awd_ids"]), "rebuilt": False}
+        except ValueError:
+            pass
+
+    decode = make_decoder(INDEX_FIELDS)
+    term_index: Dict[str, int] = {}
+    terms: List[str] = []
+    occ_term, occ_doc, occ_pos = array("i"), array("i"), array("H")
+    awd_ids: List[str] = []
+    prog_index: Dict[Tuple, int] = {}
+    programs: List[List[str]] = []
+    doc_prog, doc_prog_off = array("i"), array("q", [0])
+
+    for award in iter_award_paths(source):
+        try:
+            data = decode(award.read_bytes())
+        except Exception:
+            continue
+        doc = len(awd_ids)
+        awd_ids.append(str(data.get("awd_id") or award.name.rsplit(".", 1)[0]))
+
+        pos = 0
+        for text in (data.get("awd_titl_txt"), data.get("awd_abstract_narration")):
+            for tok in tokenize(text):
+                if pos > MAX_POSITION:
+                    break
+                tid = term_index.get(tok)
+                if tid is None:
+                    tid = term_index[tok] = len(terms)
+                    terms.append(tok)
+                occ_term.append(tid)
+                occ_doc.append(doc)
+                occ_pos.append(pos)
+                pos += 1
+            pos += 1
+
+        directorate = (data.get("org_dir_long_name") or "").strip()
+        division    = (data.get("org_div_long_name") or "").strip()
+        for pgm in data.get("pgm_ele") or []:
+            key = (directorate, division, (pgm.get("pgm_ele_name") or "").strip(),
+                   (pgm.get("pgm_ele_code") or "").strip())
+            row = prog_index.get(key)
+            if row is None:
+                row = prog_index[key] = len(programs)
+                programs.append(list(key))
+            doc_prog.append(row)
+        doc_prog_off.append(len(doc_prog))
+
+    # sort occurrences by term (alphabetically); a stable sort keeps each
+    # term's occurrences in (doc, position) order
+    n_terms = len(terms)
+    rank = np.empty(n_terms, dtype=np.int64)
+    rank[np.argsort(np.array(terms, dtype=object), kind="stable")] = np.arange(n_terms)
+    t = rank[np.frombuffer(occ_term, dtype=np.int32)] if n_terms else np.zeros(0, dtype=np.int64)
+    order = np.argsort(t, kind="stable")
+    t = t[order]
+    d = np.frombuffer(occ_doc, dtype=np.int32)[order]
+    p = np.frombuffer(occ_pos, dtype=np.uint16)[order]
+
+    new = np.ones(len(t), dtype=bool)
+    new[1:] = (t[1:] != t[:-1]) | (d[1:] != d[:-1])
+    starts  = np.flatnonzero(new)
+    post_tf = np.diff(np.append(starts, len(t))).astype(np.uint32)  # up to MAX_POSITION + 1
+
+    sorted_terms = sorted(terms)
+    blob = "".join(sorted_terms).encode()
+    term_str = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in sorted_terms], out=term_str[1:])
+    bounds = np.arange(n_terms + 1)
+
+    arrays = {
+        "terms":        np.frombuffer(blob, dtype=np.uint8),
+        "term_str":     term_str,
+        "term_post":    np.searchsorted(t[starts], bounds).astype(np.int64),
+        "term_pos":     np.searchsorted(t, bounds).astype(np.int64),
+        "post_doc":     d[starts].astype(np.int32),
+        "post_tf":      post_tf,
+        "positions":    p.astype(np.uint16),
+        "doc_prog":     np.frombuffer(doc_prog, dtype=np.int32),
+        "doc_prog_off": np.frombuffer(doc_prog_off, dtype=np.int64),
+    }
+    meta = {"year": year, "fingerprint": fp, "awd_ids": awd_ids, "programs": programs}
+
+    tmp = out_dir / f"{year}.tmp"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", arr)
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    if seg_dir.exists():
+        shutil.rmtree(seg_dir)
+    os.replace(tmp, seg_dir)
+    return {"year": year, "docs": len(awd_ids), "rebuilt": True}
+
+def build_index(data_dir: Path, out_dir: Path = INDEX_DIR, max_workers: int = None) -> Dict:
+    """
+    Build or refresh every year segment (one year per worker), drop
+    segments whose year is gone, and write index.json.
+    """
+    sources = find_sources(data_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers) as exe:
+        summaries = list(tqdm(
+            exe.map(partial(build_segment, out_dir=out_dir), sources),
+            total=len(sources),
+            desc="Indexing abstracts"
+        ))
+
+    years = sorted(s["year"] for s in summaries)
+    for seg in out_dir.iterdir():
+        if seg.is_dir() and seg.name.isdigit() and int(seg.name) not in years:
+            shutil.rmtree(seg)
+    (out_dir / "index.json").write_text(json.dumps({"format": INDEX_FORMAT, "segments": years}))
+
+    rebuilt = sum(s["rebuilt"] for s in summaries)
+    docs    = sum(s["docs"] for s in summaries)
+    print(f"✔ Indexed {docs} awards in {len(years)} segments ({rebuilt} rebuilt) → {out_dir}/")
+    return {"items": docs, "rebuilt": rebuilt, "workers": max_workers or os.cpu_count()}
+
+class Segment:
+    """
+    One year's index, memory-mapped. Term lookup is a binary search over
+    the sorted term blob, so opening a segment parses nothing but meta.json.
+    """
+
+    def __init__(self, seg_dir: Path):
+        self.dir  = seg_dir
+        self.meta = json.loads((seg_dir / "meta.json").read_text())
+        self.year = self.meta["year"]
+        load = lambda name: np.load(seg_dir / f"{name}.npy", mmap_mode="r")
+        self.terms, self.term_str = load("terms"), load("term_str")
+        self.term_post, self.term_pos = load("term_post"), load("term_pos")
+        self.post_doc, self.post_tf, self.positions = load("post_doc"), load("post_tf"), load("positions")
+        self.doc_prog, self.doc_prog_off = load("doc_prog"), load("doc_prog_off")
+
+    def _term(self, i: int) -> bytes:
+        return self.terms[self.term_str[i]:self.term_str[i + 1]].tobytes()
+
+    def lookup(self, term: str) -> Optional[int]:
+        key = term.encode()
+        lo, hi = 0, len(self.term_str) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.term_str) - 1 and self._term(lo) == key:
+            return lo
+        return None
+
+    def docs(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (doc ids, term frequency) for a term.
+        """
+        a, b = self.term_post[tid], self.term_post[tid + 1]
+        return np.asarray(self.post_doc[a:b]), np.asarray(self.post_tf[a:b], dtype=np.int64)
+
+    def occurrences(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (doc, position) of every occurrence of a term.
+        """
+        docs, tfs = self.docs(tid)
+        pos = np.asarray(self.positions[self.term_pos[tid]:self.term_pos[tid + 1]], dtype=np.int64)
+        return np.repeat(docs.astype(np.int64), tfs), pos
+
+    def match(self, clauses: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Docs matching every clause (a clause of one token is a keyword,
+        longer clauses are phrases) and their summed occurrence counts.
+        """
+        result_docs, result_scores = None, None
+        for clause in clauses:
+            tids = [self.lookup(tok) for tok in clause]
+            if any(t is None for t in tids):
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            if len(tids) == 1:
+                docs, counts = self.docs(tids[0])
+                docs = docs.astype(np.int64)
+            else:
+                # phrase: shift each term's positions back by its offset in
+                # the phrase; (doc, start) keys present for all terms match
+                keys = None
+                for i, tid in enumerate(tids):
+                    d, p = self.occurrences(tid)
+                    ok = p >= i
+                    k = (d[ok] << 17) | (p[ok] - i)
+                    keys = k if keys is None else np.intersect1d(keys, k, assume_unique=True)
+                docs, counts = np.unique(keys >> 17, return_counts=True)
+            if result_docs is None:
+                result_docs, result_scores = docs, counts.astype(np.int64)
+            else:
+                both, ia, ib = np.intersect1d(result_docs, docs, assume_unique=True, return_indices=True)
+                result_docs, result_scores = both, result_scores[ia] + counts[ib]
+        return result_docs, result_scores
+
+    def programs(self, doc: int) -> List[List[str]]:
+        rows = self.doc_prog[self.doc_prog_off[doc]:self.doc_prog_off[doc + 1]]
+        return [self.meta["programs"][r] for r in rows.tolist()]
+
+def parse_query(query: str) -> List[List[str]]:
+    """
+    '"error correction" quantum' → [["error", "correction"], ["quantum"]].
+    Quoted text is a phrase; a bare word that tokenizes into several tokens
+    (e.g. "machine-learning") is a phrase as well.
+    """
+    clauses = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', query):
+        toks = tokenize(phrase or word)
+        if toks:
+            clauses.append(toks)
+    return clauses
+
+class TextIndex:
+    """
+    Keyword / phrase search over every year segment. All clauses must match
+    (AND); hits are ranked by total occurrences, then newest year first.
+    """
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        index_dir = Path(index_dir)
+        meta = json.loads((index_dir / "index.json").read_text())
+        if meta.get("format") != INDEX_FORMAT:
+            raise ValueError(f"{index_dir} holds an unsupported index format: {meta.get('format')}")
+        self.segments = [Segment(index_dir / str(y)) for y in meta["segments"]]
+
+    def _matches(self, query: str, years: Optional[Tuple[int, int]] = None):
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        out = []
+        for seg in self.segments:
+            if years and not (years[0] <= seg.year <= years[1]):
+                continue
+            docs, scores = seg.match(clauses)
+            if len(docs):
+                out.append((seg, docs, scores))
+        return out
+
+    def search(self, query: str, limit: int = 20, years: Optional[Tuple[int, int]] = None) -> List[Dict]:
+        """
+        Matching awards: [{"awd_id", "year", "score", "programs": [[dir, div, program, code], ...]}].
+        """
+        cands = []
+        for seg, docs, scores in self._matches(query, years):
+            top = np.argsort(-scores, kind="stable")[:limit]
+            cands.extend((int(scores[i]), seg.year, seg, int(docs[i])) for i in top)
+        cands.sort(key=lambda c: (-c[0], -c[1]))
+        return [
+            {"awd_id": seg.meta["awd_ids"][doc], "year": year, "score": score, "programs": seg.programs(doc)}
+            for score, year, seg, doc in cands[:limit]
+        ]
+
+    def count(self, query: str, years: Optional[Tuple[int, int]] = None) -> int:
+        return sum(len(docs) for _, docs, _ in self._matches(query, years))
+
+    def rollup(self, query: str, limit: int = 20, years: Optional[Tuple[int, int]] = None) -> List[Dict]:
+        """
+        Programs the matching awards roll up to, by number of matching awards.
+        """
+        counts: Counter = Counter()
+        for seg, docs, _ in self._matches(query, years):
+            rows = np.concatenate([
+                np.asarray(seg.doc_prog[seg.doc_prog_off[d]:seg.doc_prog_off[d + 1]]) for d in docs.tolist()
+            ]) if len(docs) else np.zeros(0, dtype=np.int32)
+            for r, c in zip(*np.unique(rows, return_counts=True)):
+                counts[tuple(seg.meta["programs"][r])] += int(c)
+        return [
+            {"directorate": d, "division": v, "program": p, "pgm_code": code, "awards": n}
+            for (d, v, p, code), n in counts.most_common(limit)
+        ]
+
+def main():
+    p = argparse.ArgumentParser(description="Inverted index over NSF award titles and abstracts")
+    p.add_argument("--index-dir", default=str(INDEX_DIR))
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="build / refresh the index from year sources")
+    b.add_argument("--data-dir", default="data/awards")
+
+    s = sub.add_parser("search", help='e.g. search \'"sea ice" albedo\'')
+    s.add_argument("query")
+    s.add_argument("--limit",    type=int, default=20)
+    s.add_argument("--years",    type=int, nargs=2, metavar=("START", "END"), default=None)
+    s.add_argument("--programs", action="store_true", help="show the programs matching awards roll up to")
+    s.add_argument("--json",     action="store_true")
+    args = p.parse_args()
+
+    if args.cmd == "build":
+        build_index(Path(args.data_dir), Path(args.index_dir))
+        return
+
+    idx   = TextIndex(Path(args.index_dir))
+    years = tuple(args.years) if args.years else None
+    rows  = idx.rollup(args.query, args.limit, years) if args.programs else idx.search(args.query, args.limit, years)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{idx.count(args.query, years)} matching awards")
+    for r in rows:
+        if args.programs:
+            print(f"  {r['awards']:>6}  {r['directorate']} / {r['division']} / {r['program']} ({r['pgm_code']})")
+        else:
+            progs = "; ".join(f"{pg[2]} ({pg[3]})" for pg in r["programs"])
+            print(f"  {r['awd_id']}  {r['year']}  score={r['score']}  {progs}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from tqdm import tqdm
+
+import numpy as np
+import pandas as pd
+
+from src.classify import PROMPTS_DIR, load_templates, template_options
+from src.cube import CUBE_DIR, FundingCube, load_cube
+from src.decode import make_decoder
+from src.serialize import write_tree
+
+LEVELS = ("directorate", "division", "program")
+CHUNK  = 100_000  # label lines per vectorized group-by
+
+def facet_values(prompts_dir: Path = PROMPTS_DIR) -> Dict[str, List[str]]:
+    """
+    The answer options of each facet prompt, e.g. research_mode → [AUTONOMOUS_TASK, ...].
+    """
+    templates = load_templates(prompts_dir)
+    return {f: template_options(templates[f]) for f in ("research_mode", "research_action")}
+
+def label_path(r: Dict) -> Tuple[str, ...]:
+    """
+    (directorate[, division[, program]]) of a label, stopping at the
+    first missing level so a label without a division never has its
+    program taken for one.
+    """
+    path = []
+    for level in LEVELS:
+        if not r.get(level):
+            break
+        path.append(r[level])
+    return tuple(path)
+
+class UsageCounts:
+    """
+    Weighted conversation counts per cube node, with a facet mix per node.
+    Each label counts at its deepest node; roll_up() then adds children
+    into parents, so every level is answered from the same arrays.
+
+      total[node]               conversations (or summed "count" weights)
+      facets[f][node, value]    same, split by facet value (last column: missing)
+    """
+
+    def __init__(self, cube: FundingCube, facets: Dict[str, List[str]]):
+        self.cube    = cube
+        self.facets  = facets
+        self.total   = np.zeros(len(cube))
+        self.mix     = {f: np.zeros((len(cube), len(v) + 1)) for f, v in facets.items()}
+        self._codes  = {f: {v: i for i, v in enumerate(vals)} for f, vals in facets.items()}
+        self.stats   = {"labels": 0, "screened_out": 0, "unmatched": 0, "errors": 0}
+
+    def add_chunk(self, rows: List[Dict]):
+        """
+        One vectorized group-by: node / facet codes and weights become
+        arrays, and np.bincount does the summing.
+        """
+        n_nodes = len(self.cube)
+        node    = np.full(len(rows), -1, dtype=np.int64)
+        weight  = np.ones(len(rows))
+        codes   = {f: np.full(len(rows), len(v), dtype=np.int64) for f, v in self.facets.items()}
+        for i, r in enumerate(rows):
+            weight[i] = r.get("count") or 1
+            if "error" in r and not r.get("directorate"):
+                self.stats["errors"] += weight[i]
+                continue
+            if r.get("screened") is False:
+                self.stats["screened_out"] += weight[i]
+                continue
+            try:
+                node[i] = self.cube.row(label_path(r))
+            except KeyError:
+                self.stats["unmatched"] += weight[i]
+                continue
+            for f, table in self._codes.items():
+                codes[f][i] = table.get(r.get(f), len(table))
+
+        ok = node >= 0
+        self.stats["labels"] += len(rows)
+        self.total += np.bincount(node[ok], weights=weight[ok], minlength=n_nodes)
+        for f, mat in self.mix.items():
+            width = mat.shape[1]
+            flat  = node[ok] * width + codes[f][ok]
+            mat  += np.bincount(flat, weights=weight[ok], minlength=n_nodes * width).reshape(n_nodes, width)
+
+    def roll_up(self):
+        """
+        Add every node's counts into its parent, deepest level first.
+        """
+        for depth in range(int(self.cube.depth.max()), 1, -1):
+            rows = self.cube.rows_at(depth)
+            np.add.at(self.total, self.cube.parent[rows], self.total[rows])
+            for mat in self.mix.values():
+                np.add.at(mat, self.cube.parent[rows], mat[rows])
+
+def count_labels(labels_path: Path, cube: FundingCube, facets: Dict[str, List[str]], chunk: int = CHUNK) -> UsageCounts:
+    """
+    Stream a classification results JSONL (src/classify.py output, with
+    "count" weights from src/dedup.py when present) into rolled-up counts.
+    """
+    loads  = make_decoder()
+    counts = UsageCounts(cube, facets)
+    batch: List[Dict] = []
+    with open(labels_path, "rb") as f, tqdm(desc="Labels", unit="conv") as bar:
+        for line in f:
+            if not line.strip():
+                continue
+            batch.append(loads(line))
+            if len(batch) >= chunk:
+                counts.add_chunk(batch)
+                bar.update(len(batch))
+                batch = []
+        if batch:
+            counts.add_chunk(batch)
+            bar.update(len(batch))
+    counts.roll_up()
+    return counts
+
+def usage_table(counts: UsageCounts, start: Optional[int] = None, end: Optional[int] = None,
+                per_year: bool = False) -> pd.DataFrame:
+    """
+    One row per hierarchy node (cube order: depth-first, children in
+    first-seen order):
+
+      conversations, usage_share (of all matched), usage_share_in_parent,
+      funding / awards over [start, end], funding_share,
+      usage_per_musd   conversations per $1M of funding,
+      usage_index      usage_share / funding_share (>1: more AI use than funding suggests),
+      {facet}_{value}  share of the node's conversations,
+      funding_{year} / usage_per_musd_{year} for each year when per_year.
+    """
+    cube  = counts.cube
+    years = cube.years
+    start = int(years.min()) if start is None else start
+    end   = int(years.max()) if end is None else end
+    cols  = np.flatnonzero((years >= start) & (years <= end))
+
+    funding = np.asarray(cube.amounts[:, cols], dtype=np.float64).sum(axis=1)
+    awards  = np.asarray(cube.counts[:, cols], dtype=np.float64).sum(axis=1)
+    conv    = counts.total
+    top     = cube.rows_at(1)
+    all_conv, all_funding = conv[top].sum(), funding[top].sum()
+
+    parent_conv = np.where(cube.parent >= 0, conv[np.maximum(cube.parent, 0)], all_conv)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        usage_share   = conv / all_conv if all_conv else np.zeros_like(conv)
+        funding_share = funding / all_funding if all_funding else np.zeros_like(funding)
+        data = {
+            "level":                 [LEVELS[len(p) - 1] for p in cube.paths],
+            "directorate":           [p[0] for p in cube.paths],
+            "division":              [p[1] if len(p) > 1 else "" for p in cube.paths],
+            "program":               [p[2] if len(p) > 2 else "" for p in cube.paths],
+            "conversations":         conv,
+            "usage_share":           usage_share,
+            "usage_share_in_parent": np.where(parent_conv > 0, conv / parent_conv, 0.0),
+            "funding":               funding,
+            "awards":                awards,
+            "funding_share":         funding_share,
+            "usage_per_musd":        np.where(funding > 0, conv / (funding / 1e6), np.nan),
+            "usage_index":           np.where(funding_share > 0, usage_share / funding_share, np.nan),
+        }
+        for f, mat in counts.mix.items():
+            shares = np.where(conv[:, None] > 0, mat / conv[:, None], 0.0)
+            for i, value in enumerate(counts.facets[f] + ["unknown"]):
+                data[f"{f}_{value}"] = shares[:, i]
+        if per_year:
+            for c in cols.tolist():
+                y = int(years[c])
+                f_y = np.asarray(cube.amounts[:, c], dtype=np.float64)
+                data[f"funding_{y}"]        = f_y
+                data[f"usage_per_musd_{y}"] = np.where(f_y > 0, conv / (f_y / 1e6), np.nan)
+    return pd.DataFrame(data)
+
+def usage_tree(df: pd.DataFrame) -> Dict:
+    """
+    The table as a research.json-shaped tree (metrics + child nodes).
+    """
+    tree: Dict = {}
+    metrics = [c for c in df.columns if c not in ("level", "directorate", "division", "program")]
+    for rec in df.to_dict("records"):
+        path = [rec[l] for l in LEVELS if rec[l]]
+        node = tree
+        for name in path[:-1]:
+            node = node[name]
+        node[path[-1]] = {m: (None if pd.isna(rec[m]) else round(float(rec[m]), 6)) for m in metrics}
+    return tree
+
+def write_usage(df: pd.DataFrame, out_dir: Path) -> Tuple[Path, Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    csv_path, json_path = out_dir / "usage.csv", out_dir / "usage.json"
+    df.to_csv(csv_path, index=False)
+    write_tree(usage_tree(df), json_path)
+    print(f"✔ Wrote {csv_path} and {json_path}")
+    return csv_path, json_path
+
+def run_usage(labels_path: Path, cube_dir: Path = CUBE_DIR, out_dir: Path = Path("outputs"),
+              start: Optional[int] = None, end: Optional[int] = None, per_year: bool = False) -> Dict:
+    cube   = load_cube(cube_dir)
+    counts = count_labels(labels_path, cube, facet_values())
+    df     = usage_table(counts, start, end, per_year)
+    write_usage(df, out_dir)
+    s = counts.stats
+    print(f"  {s['labels']:,} labels: {counts.total[cube.rows_at(1)].sum():,.0f} matched conversations, "
+          f"{s['screened_out']:,.0f} screened out, {s['unmatched']:,.0f} unmatched, {s['errors']:,.0f} errors")
+    return {"items": s["labels"], "errors": int(s["errors"]), "skipped": int(s["unmatched"])}
+
+def main():
+    p = argparse.ArgumentParser(description="Join classification labels onto NSF funding: usage share, usage per dollar, facet mix")
+    p.add_argument("labels",     help="src/classify.py results JSONL")
+    p.add_argument("--cube",     default=str(CUBE_DIR))
+    p.add_argument("--out-dir",  default="outputs")
+    p.add_argument("--start",    type=int, default=None, help="first funding year (default: all)")
+    p.add_argument("--end",      type=int, default=None, help="last funding year (default: all)")
+    p.add_argument("--per-year", action="store_true", help="add funding_{year} / usage_per_musd_{year} columns")
+    args = p.parse_args()
+    run_usage(Path(args.labels), Path(args.cube), Path(args.out_dir), args.start, args.end, args.per_year)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 import argparse
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from src.cube import FundingCube, find_cube, load_cube
+from src.serialize import iter_nodes
+
 def find_json_path(json_path_str: str) -> Path:
     """
     Try the given path; if not found, look relative to project root.
@@ -24,47 +27,55 @@ def find_json_path(json_path_str: str) -> Path:
 
 def load_flattened_data(json_path: Path) -> pd.DataFrame:
     """
-    Read the nested research.json and return a flat DataFrame:
+    Read the nested research.json (or research.ndjson[.gz], streamed node
+    by node) and return a flat DataFrame:
       directorate, division, program, year, amount
     """
-    data = json.loads(json_path.read_text())
     rows = []
 
-    for d, divs in data.items():
-        # divs should be a dict; skip if not
-        if not isinstance(divs, dict):
+    for path, metrics in iter_nodes(json_path):
+        # only program-level nodes
+        if len(path) != 3:
             continue
-
-        for v, progs in divs.items():
-            # skip any metric keys at the division level
-            if not isinstance(progs, dict):
-                continue
-
-            for p, metrics in progs.items():
-                # skip any non‐dict entries at the program level
-                if not isinstance(metrics, dict):
-                    continue
-
-                # metrics is a dict of metric_name → number
-                for k, val in metrics.items():
-                    # only interested in the amount‐by‐year keys
-                    if k.startswith("amt_awarded_"):
-                        suffix = k.split("_")[-1]
-                        if suffix.isdigit():
-                            year = int(suffix)
-                            rows.append({
-                                "directorate": d,
-                                "division":    v,
-                                "program":     p,
-                                "year":        year,
-                                "amount":      val
-                            })
+        d, v, p = path
+
+        # metrics is a dict of metric_name → number
+        for k, val in metrics.items():
+            # only interested in the amount‐by‐year keys
+            if k.startswith("amt_awarded_"):
+                suffix = k.split("_")[-1]
+                if suffix.isdigit():
+                    year = int(suffix)
+                    rows.append({
+                        "directorate": d,
+                        "division":    v,
+                        "program":     p,
+                        "year":        year,
+                        "amount":      val
+                    })
 
     return pd.DataFrame(rows)
 
+def frame_from_cube(cube: FundingCube) -> pd.DataFrame:
+    """
+    Same columns as load_flattened_data, read straight off a (memory-mapped)
+    FundingCube: one row per program and year with at least one award.
+    """
+    programs = cube.rows_at(3)
+    node, col = np.nonzero(cube.counts[programs] > 0)
+    rows  = programs[node]
+    paths = [cube.paths[r] for r in programs]
+    cols = {}
+    for i, dim in enumerate(("directorate", "division", "program")):
+        values = pd.Categorical([p[i] for p in paths])
+        cols[dim] = values.take(node)
+    cols["year"]   = cube.years[col]
+    cols["amount"] = np.asarray(cube.amounts[rows, col])
+    return pd.DataFrame(cols)
+
 def plot_top_divisions(df: pd.DataFrame):
     top = (
-        df.groupby("division")["amount"]
+        df.groupby("division", observed=True)["amount"]
           .sum()
           .sort_values(ascending=False)
           .head(10)
@@ -79,7 +90,7 @@ def plot_top_divisions(df: pd.DataFrame):
 
 def plot_directorate_timeseries(df: pd.DataFrame):
     pivot = (
-        df.groupby(["year", "directorate"])["amount"]
+        df.groupby(["year", "directorate"], observed=True)["amount"]
           .sum()
           .unstack("directorate")
     )
@@ -91,14 +102,16 @@ def plot_directorate_timeseries(df: pd.DataFrame):
     plt.tight_layout()
     plt.show()
 
-def run_visualization(json_path_str: str):
-    try:
-        path = find_json_path(json_path_str)
-    except FileNotFoundError as e:
-        print(f"[visualize] {e}")
-        return
-
-    df = load_flattened_data(path)
+def run_visualization(json_path_str: str, cube_dir: str = None):
+    if cube_dir and find_cube(Path(cube_dir)):
+        df = frame_from_cube(load_cube(Path(cube_dir)))
+    else:
+        try:
+            path = find_json_path(json_path_str)
+        except FileNotFoundError as e:
+            print(f"[visualize] {e}")
+            return
+        df = load_flattened_data(path)
     if df.empty:
         print("[visualize] No data found in research.json.")
         return
@@ -115,8 +128,13 @@ def main():
         default="outputs/research.json",
         help="relative path to research.json (default: outputs/research.json)"
     )
+    p.add_argument(
+        "--cube",
+        default="outputs/cube",
+        help="funding cube directory, used instead of --json when present (default: outputs/cube)"
+    )
     args = p.parse_args()
-    run_visualization(args.json)
+    run_visualization(args.json, cube_dir=args.cube)
 
 if __name__ == "__main__":
     main()